@@ -6,12 +6,14 @@ import simonplot.plottables as plottables
 
 from simonplot.drivers.scatter_2d import scatter_2d
 from simonplot.drivers.plot_histogram import plot_histogram
+from simonplot.drivers.plot_histograms import plot_histograms
 from simonplot.drivers.draw_matrix import draw_matrix
 
 __all__ = [
     "config",
     "scatter_2d",
     "plot_histogram",
+    "plot_histograms",
     "binning",
     "variable",
     "cut",
@@ -10,6 +10,8 @@ import numpy as np
 
 from typing import Any, Union, List
 
+from simonplot.util.quantile_sketch import merge_sketches, snap_to_grid
+
 from .BinningBase import BinningBase
 
 def transform_from_string(str : Union[str, None]) -> Union[hist.axis.transform.AxisTransform, None]:
@@ -38,13 +40,22 @@ class AutoIntCategoryBinning(BinningBase):
                         variables: List[VariableProtocol], 
                         cuts: List[CutProtocol], 
                         datasets: List[Any], 
-                        transform: Union[str, None]=None) -> hist.axis.AxesMixin:
+                        transform: Union[str, None]=None,
+                        weights: Union[List[VariableProtocol], None]=None) -> hist.axis.AxesMixin:
+        '''
+        One category for each value present in any of the datasets, in sorted order.
+        If the weights are given, the datasets count their values with weights in the same pass,
+        so that the following fill_hist() calls with this axis do not read the data again
+        '''
         values = []
-        for var, cut, dataset in zip(variables, cuts, datasets):
-            values.append(dataset.get_unique(var, cut))
+        if weights is None:
+            for var, cut, dataset in zip(variables, cuts, datasets):
+                values.append(dataset.get_unique(var, cut))
+        else:
+            for var, cut, weight, dataset in zip(variables, cuts, weights, datasets):
+                values.append(dataset.prefill_categories(var, cut, weight))
 
-        all_values = ak.to_numpy(ak.flatten(values, axis=None)) 
-        unique_values = np.unique(all_values) 
+        unique_values = np.unique(np.concatenate(values))
 
         return hist.axis.IntCategory(
             unique_values.tolist(),
@@ -78,8 +89,9 @@ class AutoBinning(BinningBase):
                         variables: List[VariableProtocol], 
                         cuts: List[CutProtocol], 
                         datasets: List[BaseDatasetProtocol], 
-                        transform: Union[str, None]=None) -> hist.axis.AxesMixin:
-
+                        transform: Union[str, None]=None,
+                        weights: Union[List[VariableProtocol], None]=None) -> hist.axis.AxesMixin:
+        #the weights are not needed to find the range
         lens = []
         minvals = []
         maxvals = []
@@ -140,6 +152,125 @@ class AutoBinning(BinningBase):
                 transform=transform
             ).build_axis(variables[0])
 
+class QuantileAutoBinning(BinningBase):
+    '''
+    Automatic binning between two quantiles of the data (by default the 0.1% and 99.9% quantiles),
+    so that a few outliers do not stretch the range. Values outside of the range end up in the flow bins.
+    The quantiles come from mergeable streaming sketches, built in one pass over each dataset.
+    Unless nbins is given, the number of bins follows the Freedman-Diaconis rule
+    (in log space for log axes), clipped to [quantile_binning.min_bins, quantile_binning.max_bins]
+    If the weights are given, the histograms are filled in the same pass, on a fine grid which the
+    bin edges are then moved to (see DatasetBase.get_sketch()), and the axis is a Variable axis
+    '''
+    def __init__(self, 
+                 low_quantile : Union[float, None] = None, 
+                 high_quantile : Union[float, None] = None, 
+                 nbins : Union[int, None] = None):
+        cfg = config['quantile_binning']
+        self._low_quantile = cfg['low_quantile'] if low_quantile is None else low_quantile
+        self._high_quantile = cfg['high_quantile'] if high_quantile is None else high_quantile
+        self._nbins = nbins
+
+    @property
+    def has_custom_labels(self) -> bool:
+        return False
+    
+    @property
+    def label_lookup(self) -> dict[str, str]:
+        return {}
+
+    @property
+    def kind(self) -> BinningKind:
+        return BinningKind.AUTO
+
+    @property
+    def low_quantile(self) -> float:
+        return self._low_quantile
+    
+    @property
+    def high_quantile(self) -> float:
+        return self._high_quantile
+
+    def build_auto_axis(self, 
+                        variables: List[VariableProtocol], 
+                        cuts: List[CutProtocol], 
+                        datasets: List[BaseDatasetProtocol], 
+                        transform: Union[str, None]=None,
+                        weights: Union[List[VariableProtocol], None]=None) -> hist.axis.AxesMixin:
+        #with the weights, the datasets also sum them on the fine grid in the same pass,
+        #and the edges are moved onto that grid so that the histograms can be merged from it
+        if weights is None:
+            sketch = merge_sketches([dataset.get_sketch(var, cut) for var, cut, dataset in zip(variables, cuts, datasets)])
+        else:
+            sketch = merge_sketches([dataset.get_sketch(var, cut, weight) for var, cut, weight, dataset in zip(variables, cuts, weights, datasets)])
+        if sketch.count == 0 or sketch.dtype is None:
+            raise RuntimeError("QuantileAutoBinning: No entries to build the binning from!")
+
+        minval, q1, q3, maxval = sketch.quantiles(
+            [self._low_quantile, 0.25, 0.75, self._high_quantile],
+            positive = transform == 'log'
+        )
+        if np.isnan(minval):
+            raise RuntimeError("QuantileAutoBinning: No positive entries for a log binning!")
+
+        if not np.issubdtype(sketch.dtype, np.floating):
+            #one bin for each integer value
+            if transform is not None:
+                raise ValueError("Cannot use transform in QuantileAutoBinning with non-floating point variable")
+            
+            minval = int(np.floor(minval))
+            maxval = int(np.ceil(maxval))
+            if weights is not None:
+                #half-integers are grid points unless the values are huge
+                return ExplicitBinning(
+                    edges=np.arange(minval - 0.5, maxval + 1.0).tolist()
+                ).build_axis(variables[0])
+            return BasicBinning(
+                nbins=maxval - minval + 1,
+                low=minval-0.5,
+                high=maxval+0.5
+            ).build_axis(variables[0])
+
+        if minval == maxval:
+            minval = float(minval) - 0.5
+            maxval = float(maxval) + 0.5
+
+        if self._nbins is not None:
+            nbins = self._nbins
+        else:
+            nbins = self._freedman_diaconis(minval, q1, q3, maxval, sketch.count, transform == 'log')
+
+        if weights is not None:
+            if transform == 'log':
+                edges = np.geomspace(float(minval), float(maxval), nbins+1)
+            else:
+                edges = np.linspace(float(minval), float(maxval), nbins+1)
+            #the grid spacing is far below the bin width, but don't let two edges land on the same grid point
+            edges = np.unique(snap_to_grid(edges))
+            return ExplicitBinning(
+                edges=edges.tolist()
+            ).build_axis(variables[0])
+
+        return BasicBinning(
+            nbins=nbins,
+            low=float(minval),
+            high=float(maxval),
+            transform=transform
+        ).build_axis(variables[0])
+
+    @staticmethod
+    def _freedman_diaconis(minval, q1, q3, maxval, count, log) -> int:
+        cfg = config['quantile_binning']
+        if log:
+            minval, q1, q3, maxval = np.log([minval, q1, q3, maxval])
+
+        width = 2 * (q3 - q1) / np.cbrt(count)
+        if not width > 0:
+            return cfg['max_bins']
+        
+        nbins = int(np.ceil((maxval - minval) / width))
+        return int(np.clip(nbins, cfg['min_bins'], cfg['max_bins']))
+
 class DefaultBinning(BinningBase):
     def __init__(self):
         pass
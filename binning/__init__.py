@@ -1,8 +1,9 @@
-from .Binning import AutoIntCategoryBinning, AutoBinning, DefaultBinning, BasicBinning, ExplicitBinning, PrebinnedBinning
+from .Binning import AutoIntCategoryBinning, AutoBinning, QuantileAutoBinning, DefaultBinning, BasicBinning, ExplicitBinning, PrebinnedBinning
 
 __all__ = [
     'AutoIntCategoryBinning',
     'AutoBinning',
+    'QuantileAutoBinning',
     'DefaultBinning',
     'BasicBinning',
     'ExplicitBinning',
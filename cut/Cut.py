@@ -6,6 +6,8 @@ from typing import Any, List, Sequence, Union
 from numpy._typing._array_like import NDArray
 
 from .CutBase import UnbinnedCutBase
+from simonplot.util.mask_cache import evaluate_cut
+from simonplot.util.evaluation_context import evaluate_variable
 from simonplot.typing.Protocols import CutProtocol, VariableProtocol, UnbinnedDatasetAccessProtocol, UnbinnedDatasetProtocol
 
 class NoCut(UnbinnedCutBase):
@@ -44,7 +46,7 @@ class EqualsCut(UnbinnedCutBase):
 
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)
-        ev = self._variable.evaluate(dataset, NoCut())
+        ev = evaluate_variable(self._variable, dataset, NoCut())
         return ev == self._value
 
     @property
@@ -85,7 +87,7 @@ class TwoSidedCut(UnbinnedCutBase):
 
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)
-        ev = self._variable.evaluate(dataset, NoCut())
+        ev = evaluate_variable(self._variable, dataset, NoCut())
         return np.logical_and(
             ev >= self._low,
             ev < self._high
@@ -116,7 +118,7 @@ class GreaterThanCut(UnbinnedCutBase):
 
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)
-        ev = self._variable.evaluate(dataset, NoCut())
+        ev = evaluate_variable(self._variable, dataset, NoCut())
         return ev >= self._value
 
     @property
@@ -147,7 +149,7 @@ class LessThanCut(UnbinnedCutBase):
 
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)
-        ev = self._variable.evaluate(dataset, NoCut())
+        ev = evaluate_variable(self._variable, dataset, NoCut())
         return ev < self._value
 
     @property
@@ -181,7 +183,7 @@ class NotCut(UnbinnedCutBase):
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)    
 
-        mask = self._cut.evaluate(dataset)
+        mask = evaluate_cut(self._cut, dataset)
         if isinstance(mask, slice):
             mask = np.ones(dataset.num_rows, dtype=bool)[mask]
 
@@ -218,12 +220,12 @@ class AndCuts(UnbinnedCutBase):
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)   
 
-        mask = self._cuts[0].evaluate(dataset)
+        mask = evaluate_cut(self._cuts[0], dataset)
         if isinstance(mask, slice): #ensure mask is a boolean array
             mask = np.ones(dataset.num_rows, dtype=bool)[mask]
 
         for cut in self._cuts[1:]:
-            nextmask = cut.evaluate(dataset)
+            nextmask = evaluate_cut(cut, dataset)
             if isinstance(mask, slice): #ensure mask is a boolean array
                 nextmask = np.ones(dataset.num_rows, dtype=bool)[nextmask]
             
@@ -281,12 +283,12 @@ class OrCuts(UnbinnedCutBase):
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)   
 
-        mask = self._cuts[0].evaluate(dataset)
+        mask = evaluate_cut(self._cuts[0], dataset)
         if isinstance(mask, slice): #ensure mask is a boolean array
             mask = np.ones(dataset.num_rows, dtype=bool)[mask]
 
         for cut in self._cuts[1:]:
-            nextmask = cut.evaluate(dataset)
+            nextmask = evaluate_cut(cut, dataset)
             if isinstance(mask, slice): #ensure mask is a boolean array
                 nextmask = np.ones(dataset.num_rows, dtype=bool)[nextmask]
             
@@ -369,7 +371,7 @@ class ConcatCut(UnbinnedCutBase):
 
     def evaluate(self, dataset):
         dataset = self.ensure_valid_dataset(dataset)   
-        masks = [cut.evaluate(dataset) for cut in self.cuts]
+        masks = [evaluate_cut(cut, dataset) for cut in self.cuts]
         return np.concatenate(masks)
 
     @property
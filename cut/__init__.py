@@ -1,5 +1,6 @@
 from .Cut import NoCut, EqualsCut, TwoSidedCut, GreaterThanCut, LessThanCut, AndCuts, ConcatCut, NotCut, OrCuts
 from .common_cuts import common_cuts
+from .arrow_filter import cut_to_arrow_filter
 from .PrebinnedCut import NoopOperation, SliceOperation, ProjectionOperation, ProjectAndSliceOperation
 
 __all__ = [
@@ -11,6 +12,7 @@ __all__ = [
     'AndCuts',
     'ConcatCut',
     'common_cuts',
+    'cut_to_arrow_filter',
     'NoopOperation',
     'SliceOperation',
     'ProjectionOperation',
@@ -0,0 +1,105 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from typing import Tuple, Union
+
+from simonplot.cut.Cut import EqualsCut, TwoSidedCut, GreaterThanCut, LessThanCut, NotCut, AndCuts, OrCuts
+from simonplot.variable.Variable import BasicVariable
+from simonplot.typing.Protocols import CutProtocol
+
+def _field_for(variable, schema : Union[pa.Schema, None]) -> Union[Tuple[pc.Expression, Union[pa.DataType, None]], None]:
+    # only plain columns can be pushed down into the scan
+    if type(variable) is not BasicVariable:
+        return None
+
+    if len(variable.columns) != 1:
+        return None
+
+    column = variable.columns[0]
+    if schema is None:
+        return pc.field(column), None
+
+    if column not in schema.names:
+        return None
+
+    # comparisons on list columns are not row-level selections
+    dtype = schema.field(column).type
+    if pa.types.is_nested(dtype):
+        return None
+
+    return pc.field(column), dtype
+
+def _translate(cut : CutProtocol, schema : Union[pa.Schema, None]) -> Tuple[Union[pc.Expression, None], bool]:
+    '''
+    Returns (expression, exact)
+
+    expression is None if nothing could be translated
+    exact is False if the expression only selects a superset of the rows selected by the cut
+    (ie some parts of an AndCuts could not be translated)
+    '''
+    if isinstance(cut, (EqualsCut, TwoSidedCut, GreaterThanCut, LessThanCut)):
+        field = _field_for(cut._variable, schema)
+        if field is None:
+            return None, False
+        f, dtype = field
+
+        if dtype is not None and pa.types.is_boolean(dtype):
+            # arrow has no comparison kernels between bool and numbers
+            if isinstance(cut, EqualsCut) and cut._value in (0, 1):
+                return f == pa.scalar(bool(cut._value)), True
+            return None, False
+
+        if isinstance(cut, EqualsCut):
+            return f == cut._value, True
+        elif isinstance(cut, TwoSidedCut):
+            return (f >= cut._low) & (f < cut._high), True
+        elif isinstance(cut, GreaterThanCut):
+            return f >= cut._value, True
+        else:
+            return f < cut._value, True
+
+    elif isinstance(cut, NotCut):
+        expr, exact = _translate(cut._cut, schema)
+        if expr is None or not exact:
+            return None, False
+        # numpy treats missing values (NaN) as failing the inner comparison,
+        # so they pass the NotCut. Arrow propagates nulls instead, so fill them explicitly
+        return ~pc.coalesce(expr, pa.scalar(False)), True
+
+    elif isinstance(cut, AndCuts):
+        result = None
+        all_exact = True
+        for c in cut._cuts:
+            expr, exact = _translate(c, schema)
+            if expr is None:
+                all_exact = False
+                continue
+            all_exact = all_exact and exact
+            result = expr if result is None else result & expr
+        return result, all_exact and result is not None
+
+    elif isinstance(cut, OrCuts):
+        result = None
+        all_exact = True
+        for c in cut._cuts:
+            expr, exact = _translate(c, schema)
+            if expr is None:
+                return None, False
+            all_exact = all_exact and exact
+            result = expr if result is None else result | expr
+        return result, all_exact
+
+    else:
+        # NoCut, ConcatCut, prebinned operations, ...
+        return None, False
+
+def cut_to_arrow_filter(cut : CutProtocol, schema : Union[pa.Schema, None] = None) -> Union[pc.Expression, None]:
+    '''
+    Translate a Cut tree into a pyarrow.compute expression suitable for the filter= of a dataset scan
+
+    The expression is guaranteed to keep (at least) every row the cut would keep,
+    so the cut must still be evaluated on the result.
+    Returns None if no part of the cut can be pushed down into the scan
+    '''
+    expr, _ = _translate(cut, schema)
+    return expr
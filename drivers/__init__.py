@@ -1,9 +1,11 @@
 from .plot_histogram import plot_histogram
+from .plot_histograms import plot_histograms
 from .scatter_2d import scatter_2d
 from .draw_matrix import draw_matrix
 
 __all__ = [
     'plot_histogram',
+    'plot_histograms',
     'scatter_2d',
     'draw_matrix',
 ]
\ No newline at end of file
@@ -17,7 +17,49 @@ import matplotlib.pyplot as plt
 import numpy as np
 import hist
 
-from typing import List, Sequence, Tuple, Union
+from typing import Any, List, Sequence, Tuple, Union
+
+def build_histogram_axis(binning : BaseBinningProtocol,
+                         variable : List[VariableProtocol],
+                         cut : List[CutProtocol],
+                         dataset : List[BaseDatasetProtocol],
+                         logx : Union[bool, None],
+                         weight : Union[List[VariableProtocol], None] = None) -> Tuple[Any, Union[bool, None]]:
+    '''
+    Build the histogram axis for plot_histogram()
+    Returns (axis, logx), with logx resolved if it was None
+    If the weights are given, auto binnings may already fill the histograms while looking at the data
+    '''
+    #resolve auto logx BEFORE building axis for unbinned variables
+    if logx is None and not variable[0].prebinned:
+        logx = check_auto_logx(variable[0].key)
+
+    if isinstance(binning, AutoBinningProtocol):
+        if logx:
+            transform='log'
+        else:
+            transform=None
+
+        axis = binning.build_auto_axis(variable, cut, dataset, transform=transform, weights=weight)
+    elif isinstance(binning, DefaultBinningProtocol):
+        axis = binning.build_default_axis(variable[0])
+    elif isinstance(binning, PrebinnedBinningProtocol):
+        if not isinstance(cut[0], PrebinnedOperationProtocol):
+            raise RuntimeError("When using PrebinnedBinning, cut must be PrebinnedOperation")
+        axis = binning.build_prebinned_axis(dataset[0], cut[0])
+    elif isinstance(binning, BasicBinningProtocol):
+        axis = binning.build_axis(variable[0])
+    else:
+        raise RuntimeError("Binning did not match any known binning protocol!")
+
+    #resolve auto logx AFTER building axis for prebinned variables
+    if logx is None and isinstance(axis, ArbitraryBinning):
+        if axis.Nax == 1:
+            logx = check_auto_logx(axis.axis_names[0])
+        else:
+            logx = False
+
+    return axis, logx
 
 def plot_histogram(variable_: Union[VariableProtocol, List[VariableProtocol]], 
                    cut_: Union[CutProtocol, List[CutProtocol]], 
@@ -32,7 +74,8 @@ def plot_histogram(variable_: Union[VariableProtocol, List[VariableProtocol]],
                    pulls : bool = False,
                    no_ratiopad : bool = False,
                    output_folder: Union[str, None] = None,
-                   output_prefix: Union[str, None] = None):
+                   output_prefix: Union[str, None] = None,
+                   _axis : Any = None):
 
     if labels_ is None or len(labels_) == 1:
         nolegend = True
@@ -45,10 +88,6 @@ def plot_histogram(variable_: Union[VariableProtocol, List[VariableProtocol]],
     bigtuple : Tuple[List[VariableProtocol], List[CutProtocol], List[VariableProtocol], List[BaseDatasetProtocol], List[str]] = ensure_same_length(variable_, cut_, weight_, dataset_, labels_)  # pyright: ignore[reportAssignmentType]
     variable, cut, weight, dataset, labels = bigtuple
 
-    #resolve auto logx BEFORE building axis for unbinned variables
-    if logx is None and not variable[0].prebinned:
-        logx = check_auto_logx(variable[0].key)
-
     if (type(dataset_) is list and (len(dataset_) > 1) or len(dataset) == 1):
         style_from_dset = True
         
@@ -65,30 +104,10 @@ def plot_histogram(variable_: Union[VariableProtocol, List[VariableProtocol]],
     else:
         do_ratiopad = True
 
-    if isinstance(binning, AutoBinningProtocol):
-        if logx:
-            transform='log'
-        else:
-            transform=None
-
-        axis = binning.build_auto_axis(variable, cut, dataset, transform=transform)
-    elif isinstance(binning, DefaultBinningProtocol):
-        axis = binning.build_default_axis(variable[0])
-    elif isinstance(binning, PrebinnedBinningProtocol):
-        if not isinstance(cut[0], PrebinnedOperationProtocol):
-            raise RuntimeError("When using PrebinnedBinning, cut must be PrebinnedOperation")
-        axis = binning.build_prebinned_axis(dataset[0], cut[0])
-    elif isinstance(binning, BasicBinningProtocol):
-        axis = binning.build_axis(variable[0])
+    if _axis is None:
+        axis, logx = build_histogram_axis(binning, variable, cut, dataset, logx, weight)
     else:
-        raise RuntimeError("Binning did not match any known binning protocol!")
-
-    #resolve auto logx AFTER building axis for prebinned variables
-    if logx is None and isinstance(axis, ArbitraryBinning):
-        if axis.Nax == 1:
-            logx = check_auto_logx(axis.axis_names[0])
-        else:
-            logx = False
+        axis = _axis
 
     if isinstance(axis, ArbitraryBinning):
         the_xlabel = label_from_binning(axis)
@@ -0,0 +1,70 @@
+from simonplot.typing.Protocols import CutProtocol, VariableProtocol, BaseDatasetProtocol, BaseBinningProtocol
+from simonplot.drivers.plot_histogram import plot_histogram, build_histogram_axis
+from simonplot.binning import AutoBinning, AutoIntCategoryBinning, QuantileAutoBinning
+
+from simonpy.sanitization import ensure_same_length
+
+from typing import List, Union
+
+def plot_histograms(variables : List[VariableProtocol],
+                    cut : CutProtocol,
+                    weight_ : Union[VariableProtocol, List[VariableProtocol]],
+                    dataset_ : Union[BaseDatasetProtocol, List[BaseDatasetProtocol]],
+                    binning_ : Union[BaseBinningProtocol, List[BaseBinningProtocol]],
+                    logx : Union[bool, None] = None,
+                    **kwargs):
+    '''
+    Make one plot_histogram() plot for each variable in variables,
+    all with the same cut, weight(s), and dataset(s).
+
+    The histograms for all the variables are filled in a single pass over each dataset,
+    evaluating the cut only once, and then drawn one by one.
+    weight_ is either one weight for all datasets, or one weight per dataset.
+    binning_ is either one binning for all variables, or one binning per variable.
+    Any extra keyword arguments are passed on to plot_histogram()
+    '''
+    weights, datasets = ensure_same_length(weight_, dataset_)
+    binnings, _ = ensure_same_length(binning_, variables)
+
+    try:
+        #the auto binnings need the range, quantiles, or distinct values of every variable,
+        #so find each of them for all the variables in one pass
+        for binning_type, prefetch in [(AutoBinning, 'prefetch_ranges'), 
+                                       (QuantileAutoBinning, 'prefetch_sketches'), 
+                                       (AutoIntCategoryBinning, 'prefetch_uniques')]:
+            pairs = [(variable, cut) for variable, binning in zip(variables, binnings) if isinstance(binning, binning_type)]
+            if len(pairs) > 0:
+                for dataset in datasets:
+                    getattr(dataset, prefetch)(pairs)
+
+        axes = []
+        logxs = []
+        for variable, binning in zip(variables, binnings):
+            #no weights: the histograms are all filled by prefill_hists() below anyway,
+            #so the auto binnings should not fill them while looking at the data
+            axis, thelogx = build_histogram_axis(
+                binning,
+                [variable]*len(datasets),
+                [cut]*len(datasets),
+                datasets,
+                logx
+            )
+            axes.append(axis)
+            logxs.append(thelogx)
+
+        for weight, dataset in zip(weights, datasets):
+            dataset.prefill_hists(
+                [(variable, weight, axis) for variable, axis in zip(variables, axes)],
+                cut
+            )
+
+        for variable, binning, axis, thelogx in zip(variables, binnings, axes, logxs):
+            plot_histogram(
+                variable, cut, weight_, dataset_, binning,
+                logx = thelogx,
+                _axis = axis,
+                **kwargs
+            )
+    finally:
+        for dataset in datasets:
+            dataset.clear_prefilled()
@@ -2,6 +2,7 @@ from simonplot.config.config import config
 from simonplot.plottables.PlotStuff import AbstractPlotSpec
 from simonplot.typing.Protocols import VariableProtocol, CutProtocol, UnbinnedDatasetProtocol
 from simonplot.util.common import setup_canvas, add_cms_legend, savefig, add_text, draw_legend, make_oneax
+from simonplot.util.evaluation_context import EvaluationContext, evaluate_variable
 
 from simonpy.sanitization import ensure_same_length
 
@@ -86,8 +87,12 @@ def scatter_2d_(varX: VariableProtocol, varY: VariableProtocol,
 
     dataset.ensure_columns(needed_columns)
 
-    x = varX.evaluate(dataset, cut)
-    y = varY.evaluate(dataset, cut)
+    try:
+        with EvaluationContext(dataset):
+            x = evaluate_variable(varX, dataset, cut)
+            y = evaluate_variable(varY, dataset, cut)
+    finally:
+        dataset.release_columns()
 
     xvals = ak.flatten(x, axis=None) # pyright: ignore[reportArgumentType]
     yvals = ak.flatten(y, axis=None) # pyright: ignore[reportArgumentType]
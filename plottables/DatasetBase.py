@@ -2,17 +2,28 @@ from ast import TypeVar
 import numpy as np
 import awkward as ak
 
+from simonplot.config import config
 from simonplot.cut.Cut import NoCut
+from simonplot.variable.Variable import ConstantVariable
+from simonplot.util.mask_cache import MaskCache
+from simonplot.util.column_cache import new_column_cache_owner
+from simonplot.util.evaluation_context import EvaluationContext, evaluate_variable
+from simonplot.util.hist_cache import HistCache, get_hist_cache
+from simonplot.util.quantile_sketch import QuantileSketch, merge_sketches, grid_bins, on_grid
 from simonplot.util.histplot import simon_histplot, simon_histplot_ratio, simon_histplot_arbitrary, simon_histplot_ratio_arbitrary
 
 from simonplot.typing.Protocols import BaseDatasetProtocol, HistplotMode, PrebinnedDatasetAccessProtocol, UnbinnedDatasetAccessProtocol, VariableProtocol, CutProtocol
 
 from simonpy.AbitraryBinning import ArbitraryBinning
 
-from typing import Any, List, Sequence, Tuple, Union, assert_never
+from typing import Any, Callable, List, Sequence, Tuple, Union, assert_never
 import hist
 import matplotlib.axes
 import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from abc import ABC, abstractmethod
 
@@ -85,6 +96,213 @@ def accumulate_H(H1 : Any, H2 : Any) -> Any:
     else:
         raise RuntimeError("accumulate_H: Unsupported histogram type! [neither hist.Hist nor tuple, but %s]"%type(H1))
 
+def scale_H(H : Any, scale : float) -> Any:
+    '''
+    Copy of H with all entries multiplied by scale (and variances by scale^2)
+    '''
+    if isinstance(H, hist.Hist):
+        return H * scale
+    elif isinstance(H, tuple):
+        if len(H) != 2:
+            raise RuntimeError("scale_H: Unsupported histogram type! [tuple with len != 2]")
+        return (H[0] * scale, H[1] * np.square(scale))
+    else:
+        raise RuntimeError("scale_H: Unsupported histogram type! [neither hist.Hist nor tuple, but %s]"%type(H))
+
+def rebin_indices(fine : Any, axis : Any) -> Union[np.ndarray, None]:
+    '''
+    Index of the edge of the fine axis matching each edge of axis.
+    Returns None if axis cannot be made from fine by merging bins: if either is not continuous, 
+    if the edges of axis do not line up with edges of fine, 
+    or if fine does not have both flow bins (so that nothing is lost)
+    '''
+    continuous = (hist.axis.Regular, hist.axis.Variable)
+    if not isinstance(axis, continuous) or not isinstance(fine, continuous):
+        return None
+    if not (fine.traits.underflow and fine.traits.overflow):
+        return None
+
+    fine_edges = np.asarray(fine.edges)
+    edges = np.asarray(axis.edges)
+
+    #index of the closest fine edge to each requested edge
+    idx = np.clip(np.searchsorted(fine_edges, edges), 1, len(fine_edges)-1)
+    idx = np.where(np.abs(fine_edges[idx-1] - edges) <= np.abs(fine_edges[idx] - edges), idx-1, idx)
+    tolerance = 1e-9 * (fine_edges[-1] - fine_edges[0])
+    if np.any(np.abs(fine_edges[idx] - edges) > tolerance) or np.any(np.diff(idx) <= 0):
+        return None
+    return idx
+
+def rebin_H(H : Any, axis : Any) -> Any:
+    '''
+    Copy of the 1D histogram H on the (coarser) axis, by merging bins. 
+    Entries outside of the range of axis end up in its flow bins.
+    Returns None if the edges of axis do not line up with edges of H, 
+    or if H does not have both flow bins (so that nothing is lost)
+    '''
+    if not isinstance(H, hist.Hist) or H.ndim != 1:
+        return None
+    
+    idx = rebin_indices(H.axes[0], axis)
+    if idx is None:
+        return None
+
+    #in the flow view of H, bin i is at i+1
+    #so the groups are [underflow, bins below edges[0]], [bins between consecutive edges]..., [bins above edges[-1], overflow]
+    starts = np.concatenate([[0], idx + 1])
+    view = H.view(flow=True)
+    values = np.add.reduceat(view.value, starts) # pyright: ignore[reportAttributeAccessIssue]
+    variances = np.add.reduceat(view.variance, starts) # pyright: ignore[reportAttributeAccessIssue]
+
+    start = 0 if axis.traits.underflow else 1
+    stop = len(values) if axis.traits.overflow else len(values)-1
+
+    result = hist.Hist(axis, storage=hist.storage.Weight())
+    result.view(flow=True).value = values[start:stop] # pyright: ignore[reportAttributeAccessIssue]
+    result.view(flow=True).variance = variances[start:stop] # pyright: ignore[reportAttributeAccessIssue]
+    return result
+
+def yield_of_H(H : Any) -> float:
+    if isinstance(H, hist.Hist):
+        return float(np.sum(H.values(flow=True)))
+    elif isinstance(H, tuple):
+        if len(H) != 2:
+            raise RuntimeError("yield_of_H: Unsupported histogram type! [tuple with len != 2]")
+        return float(np.sum(H[0]))
+    else:
+        raise RuntimeError("yield_of_H: Unsupported histogram type! [neither hist.Hist nor tuple, but %s]"%type(H))
+
+def fill_threads(threads : Union[int, None]) -> Union[int, None]:
+    '''
+    Number of threads to pass to hist.Hist.fill(): the given value, 
+    or histogram_fill.threads from the config if None. 
+    0 means one thread per core. Single-threaded fills are returned as None
+    '''
+    if threads is None:
+        threads = config['histogram_fill']['threads']
+    if threads == 1:
+        return None
+    return threads
+
+def range_stats(values : np.ndarray) -> Tuple[Any, Any, Any]:
+    '''
+    (min, positive min, max) of a flat non-empty array, ignoring NaNs.
+    The positive min is NaN if there are no positive values.
+    The positive min is found with a masked reduction, without copying out the positive values
+    '''
+    minval, maxval = min_max(values)
+    if minval > 0:
+        return minval, minval, maxval
+    elif not maxval > 0:
+        return minval, np.nan, maxval
+    else:
+        #the (positive) max is a valid starting point for the reduction
+        return minval, np.min(values, where=values > 0, initial=maxval), maxval
+
+def reduce_ranges(ranges : Sequence[Tuple[Any, Any, Any]]) -> Tuple[Any, Any, Any]:
+    '''
+    Combine the range_stats() of several chunks (or datasets)
+    '''
+    minvals2 = [r[1] for r in ranges]
+    if np.all(np.isnan(minvals2)):
+        minval2 = np.nan
+    else:
+        minval2 = np.nanmin(minvals2)
+
+    return (np.nanmin([r[0] for r in ranges]), 
+            minval2, 
+            np.nanmax([r[2] for r in ranges]))
+
+def constant_weight(weight : VariableProtocol) -> Union[float, None]:
+    '''
+    The value of weight if it is the same for every entry, otherwise None
+    '''
+    if type(weight) is ConstantVariable:
+        return weight.value
+    return None
+
+def make_fill_hist(axis : Any, wconst : Union[float, None]) -> hist.Hist:
+    '''
+    Empty histogram to fill. Entries with a constant weight are only counted,
+    and turned into a weighted histogram by weighted_from_counts() afterwards
+    '''
+    if wconst is None:
+        return hist.Hist(axis, storage=hist.storage.Weight())
+    else:
+        return hist.Hist(axis, storage=hist.storage.Int64())
+
+def weighted_from_counts(counts : hist.Hist, axis : Any, weight : float) -> hist.Hist:
+    '''
+    Weighted histogram equivalent to filling every entry of counts with the same weight
+    '''
+    n = counts.values(flow=True)
+    H = hist.Hist(axis, storage=hist.storage.Weight())
+    view = H.view(flow=True)
+    view.value = n * weight # pyright: ignore[reportAttributeAccessIssue]
+    view.variance = n * np.square(weight) # pyright: ignore[reportAttributeAccessIssue]
+    return H
+
+def min_max(values : np.ndarray) -> Tuple[Any, Any]:
+    '''
+    (min, max) of a flat array in a single pass, ignoring NaNs
+    Returned as numpy scalars of the same dtype as the input
+    '''
+    result = pc.min_max(pa.array(values))
+    return (np.asarray(result['min'].as_py(), dtype=values.dtype)[()],
+            np.asarray(result['max'].as_py(), dtype=values.dtype)[()])
+
+def count_categories(values : np.ndarray, weights : Union[np.ndarray, None]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    (sorted distinct integer values, sum of weights, sum of squared weights) of a flat array.
+    weights = None counts every entry with weight 1
+    Floating point values must be integers: NaNs and infinities are dropped, anything else raises a ValueError
+    Small ranges of values are counted directly with np.bincount, without sorting
+    '''
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        finite = np.isfinite(values)
+        if not np.all(finite):
+            values = values[finite]
+            if weights is not None:
+                weights = np.asarray(weights)[finite]
+        if np.any(values != np.round(values)):
+            raise ValueError("count_categories: values are not integers!")
+    values = values.astype(np.int64, copy=False)
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    lo, hi = min_max(values)
+    #as python integers, since the difference of sparse int64 values can overflow
+    if int(hi) - int(lo) < max(len(values), 1024):
+        idx = values - lo
+        categories = np.arange(lo, hi+1)
+    else:
+        categories, idx = np.unique(values, return_inverse=True)
+
+    #categories are present if they have entries, even if their weights sum to zero
+    n = np.bincount(idx, minlength=len(categories))
+    present = n > 0
+    if weights is None:
+        sumw = n[present].astype(np.float64)
+        sumw2 = sumw
+    else:
+        sumw = np.bincount(idx, weights=weights, minlength=len(categories))[present]
+        sumw2 = np.bincount(idx, weights=np.square(weights), minlength=len(categories))[present]
+
+    return categories[present], sumw, sumw2
+
+def merge_categories(parts : Sequence[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Combine several count_categories() results
+    '''
+    if len(parts) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+    
+    categories, idx = np.unique(np.concatenate([p[0] for p in parts]), return_inverse=True)
+    sumw = np.bincount(idx, weights=np.concatenate([p[1] for p in parts]), minlength=len(categories))
+    sumw2 = np.bincount(idx, weights=np.concatenate([p[2] for p in parts]), minlength=len(categories))
+    return categories, sumw, sumw2
+
 class DatasetBase(ABC):
     _key : str
 
@@ -122,6 +340,38 @@ class DatasetBase(ABC):
             if hasattr(self, 'num_rows'):
                 return self.num_rows  # pyright: ignore[reportAttributeAccessIssue]
 
+    def draw_hist(self,
+                  H : Any,
+                  axis : Any,
+                  density: bool,
+                  ax : matplotlib.axes.Axes,
+                  own_style : bool,
+                  mode : HistplotMode,
+                  _fillbetween : Union[float, None] = None,
+                  **mpl_kwargs) -> Tuple[Any, Any]:
+        '''
+        Draw an already-filled histogram H (as returned by fill_hist())
+        '''
+        if own_style:
+            mpl_kwargs['label'] = self.label
+            mpl_kwargs['color'] = self.color
+
+        if _fillbetween is not None:
+            fbtw = _fillbetween
+        elif mode != HistplotMode.ERRORBAR:
+            fbtw = 0
+        else:
+            fbtw = None
+
+        return call_histplot_function(
+            H, 
+            axis,
+            ax = ax,
+            density=density,
+            fillbetween = fbtw,
+            **mpl_kwargs
+        )
+
     def plot_hist_ratio(self,
                     H1 : Any,
                     H2 : Any,
@@ -145,48 +395,261 @@ class DatasetBase(ABC):
 class SingleDatasetBase(DatasetBase):
     _H : Any
 
+    @property
+    def mask_cache(self) -> MaskCache:
+        if not hasattr(self, '_mask_cache'):
+            self._mask_cache = MaskCache()
+        return self._mask_cache
+
+    @property
+    def column_cache_token(self) -> str:
+        '''
+        Unique key of this dataset in the process-wide column cache (see util/column_cache.py).
+        Its columns are dropped from the cache when the dataset is garbage collected
+        '''
+        if not hasattr(self, '_column_cache_token'):
+            self._column_cache_token = new_column_cache_owner(self)
+        return self._column_cache_token
+
     def estimate_yield(self, cut : CutProtocol, weight : VariableProtocol) -> float:
         needed_columns = list(set(cut.columns + weight.columns))
         
-        self.ensure_columns(needed_columns)
-        wgt = weight.evaluate(self, cut)  # pyright: ignore[reportArgumentType]
-        total_yield = np.nansum(wgt) * self._weight
+        total_yield = 0.0
+        for chunk in self.iter_chunks(needed_columns, cut):
+            with EvaluationContext(chunk):
+                wgt = evaluate_variable(weight, chunk, cut)
+            total_yield += np.nansum(wgt)
 
-        return total_yield
+        return total_yield * self._weight
 
     @abstractmethod
     def ensure_columns(self, columns: Sequence[str]):
         raise NotImplementedError()
 
+    def release_columns(self) -> None:
+        '''
+        Called when the columns of the last ensure_columns() calls are no longer needed.
+        Datasets which hold on to loaded columns outside of the column cache let go of them here
+        '''
+        pass
+
+    def iter_chunks(self, columns : Sequence[str], cut : CutProtocol):
+        '''
+        Iterate over the dataset in chunks which can each be passed to Variable.evaluate()
+        By default the whole dataset is one chunk (ie the dataset itself)
+        Streaming datasets override this to yield one chunk per record batch
+
+        The cut is passed along so that implementations can drop rows at read time.
+        It must still be evaluated on every chunk
+        '''
+        self.ensure_columns(columns)
+        yield self
+
     def get_range(self, var : VariableProtocol, cut : CutProtocol) -> Tuple[Any, Any, Any, np.dtype]:
-        needed_columns = list(set(var.columns + cut.columns))
+        prefetched = self._lookup_prefetched('_prefetched_ranges', var, cut)
+        if prefetched is not None:
+            return prefetched
         
-        self.ensure_columns(needed_columns)
-
-        v = var.evaluate(self, cut) # pyright: ignore[reportArgumentType]
-        values = ak.to_numpy(ak.flatten(v, axis=None)) # pyright: ignore[reportArgumentType]
+        return self.get_ranges([(var, cut)])[0]
+
+    def _scan_values(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]):
+        '''
+        Iterate over (index in pairs, flat numpy values of the variable) for each pair and chunk, in a single pass over the data.
+        If all the pairs share the same cut it is pushed down into the scan,
+        otherwise every cut is evaluated on the full chunks
+        '''
+        if len(pairs) == 0:
+            return
+        
+        needed_columns = set()
+        for var, cut in pairs:
+            needed_columns.update(var.columns + cut.columns)
 
-        minval = np.nanmin(values)
-        if len(values[values > 0]) == 0:
-            minval2 = np.nan
+        if all(cut is pairs[0][1] for _, cut in pairs):
+            scan_cut = pairs[0][1]
         else:
-            minval2 = np.nanmin(values[values > 0])
-            
-        maxval = np.nanmax(values)
-
-        return (minval, minval2, maxval, values.dtype)
-
-    def get_unique(self, var : VariableProtocol, cut : CutProtocol) -> np.ndarray:
-        needed_columns = list(set(var.columns + cut.columns))
+            scan_cut = NoCut()
+
+        for chunk in self.iter_chunks(list(needed_columns), scan_cut):
+            for i, (var, cut) in enumerate(pairs):
+                #one context per pair, so that we don't keep every evaluated variable in memory at once
+                #the cut masks are shared through the mask cache of the chunk
+                with EvaluationContext(chunk):
+                    v = evaluate_variable(var, chunk, cut)
+                yield i, ak.to_numpy(ak.flatten(v, axis=None)) # pyright: ignore[reportArgumentType]
+
+    def get_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[Tuple[Any, Any, Any, np.dtype]]:
+        '''
+        get_range() for each (variable, cut) in pairs, in a single pass over the data
+        '''
+        ranges = [[] for _ in pairs]
+        dtypes : List[Any] = [None for _ in pairs]
+        for i, values in self._scan_values(pairs):
+            dtypes[i] = values.dtype
+
+            if len(values) == 0:
+                continue
+
+            ranges[i].append(range_stats(values))
+
+        return [reduce_ranges(r) + (dtype,) for r, dtype in zip(ranges, dtypes)]
+
+    def prefetch_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        '''
+        Compute the ranges for pairs in a single pass (as get_ranges()),
+        and keep them around so that later get_range() calls with the same 
+        variable and cut objects don't touch the data again
+        '''
+        self._store_prefetched('_prefetched_ranges', pairs, self.get_ranges(pairs))
+
+    def get_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[QuantileSketch]:
+        '''
+        get_sketch() (without weight) for each (variable, cut) in pairs, in a single pass over the data
+        '''
+        sketches = [[] for _ in pairs]
+        for i, values in self._scan_values(pairs):
+            sketch = QuantileSketch()
+            sketch.update(values)
+            sketches[i].append(sketch)
+
+        return [merge_sketches(s) for s in sketches]
+
+    def prefetch_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        '''
+        Compute the sketches for pairs in a single pass (as get_sketches()),
+        and keep them around so that later get_sketch() calls without weight and with the same
+        variable and cut objects don't touch the data again
+        '''
+        self._store_prefetched('_prefetched_sketches', pairs, self.get_sketches(pairs))
+
+    def get_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[np.ndarray]:
+        '''
+        get_unique() for each (variable, cut) in pairs, in a single pass over the data
+        '''
+        uniques = [[] for _ in pairs]
+        for i, values in self._scan_values(pairs):
+            uniques[i].append(np.unique(values))
+
+        return [np.unique(np.concatenate(u)) for u in uniques]
+
+    def prefetch_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        '''
+        Compute the distinct values for pairs in a single pass (as get_uniques()),
+        and keep them around so that later get_unique() calls with the same
+        variable and cut objects don't touch the data again
+        '''
+        self._store_prefetched('_prefetched_uniques', pairs, self.get_uniques(pairs))
+
+    def _store_prefetched(self, name, pairs, results) -> None:
+        if not hasattr(self, name):
+            setattr(self, name, {})
+
+        for (var, cut), result in zip(pairs, results):
+            k = (id(var), var.key, id(cut), cut.key)
+            #the entry keeps the objects alive, so their id()s cannot be reused
+            getattr(self, name)[k] = (var, cut, result)
+
+    def _lookup_prefetched(self, name, var, cut) -> Any:
+        if not hasattr(self, name):
+            return None
         
-        self.ensure_columns(needed_columns)
+        entry = getattr(self, name).get((id(var), var.key, id(cut), cut.key))
+        if entry is None or entry[0] is not var or entry[1] is not cut:
+            return None
+        return entry[2]
+
+    def get_sketch(self, var : VariableProtocol, cut : CutProtocol, weight : Union[VariableProtocol, None] = None) -> QuantileSketch:
+        '''
+        Quantile sketch of the values of var, in one pass over the data.
+        Each chunk is sketched separately and the sketches are merged.
+
+        If weight is given, the sums of weights are also kept on the fine grid of util/quantile_sketch.py, 
+        so that the next fill_hist() with the same var, cut, and weight objects and a Variable axis 
+        whose edges are grid points does not touch the data again. 
+        The sums are dropped by that next fill_hist(), whether they could be used or not
+        '''
+        if weight is None:
+            prefetched = self._lookup_prefetched('_prefetched_sketches', var, cut)
+            if prefetched is not None:
+                return prefetched
+
+        needed_columns = set(var.columns + cut.columns)
+        wconst = None
+        if weight is not None:
+            needed_columns.update(weight.columns)
+            wconst = constant_weight(weight)
+
+        sketches = []
+        parts = []
+        for chunk in self.iter_chunks(list(needed_columns), cut):
+            with EvaluationContext(chunk):
+                v = ak.to_numpy(ak.flatten(evaluate_variable(var, chunk, cut), axis=None)) # pyright: ignore[reportArgumentType]
+                if weight is not None and wconst is None:
+                    wgt = ak.to_numpy(ak.flatten(evaluate_variable(weight, chunk, cut), axis=None)) # pyright: ignore[reportArgumentType]
+                else:
+                    wgt = None
+            sketch = QuantileSketch()
+            sketch.update(v)
+            sketches.append(sketch)
+            if weight is not None:
+                parts.append(count_categories(grid_bins(v), wgt))
+
+        if weight is not None:
+            bins, sumw, sumw2 = merge_categories(parts)
+            if wconst is not None:
+                sumw = sumw * wconst
+                sumw2 = sumw2 * np.square(wconst)
+
+            if not hasattr(self, '_prefilled_grids'):
+                self._prefilled_grids = {}
+
+            k = (id(var), var.key, id(cut), cut.key, id(weight), weight.key)
+            #the entry keeps the objects alive, so their id()s cannot be reused
+            self._prefilled_grids[k] = (var, cut, weight, bins, sumw, sumw2)
+
+        return merge_sketches(sketches)
+
+    def _lookup_grid(self, variable, cut, weight, axis, consume : bool = False) -> Any:
+        #unweighted histogram merged from the get_sketch() grid sums, or None
+        #consume drops the sums even if they cannot serve the axis, so that they do not pile up
+        if not hasattr(self, '_prefilled_grids'):
+            return None
+
+        k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+        entry = self._prefilled_grids.get(k)
+        if entry is None or entry[0] is not variable or entry[1] is not cut or entry[2] is not weight:
+            return None
+        if consume:
+            del self._prefilled_grids[k]
+
+        #only Variable axes are served, since they bin by comparing with the edges like the grid does
+        if not isinstance(axis, hist.axis.Variable):
+            return None
+        edges = np.asarray(axis.edges)
+        if not on_grid(edges):
+            return None
+        bins, sumw, sumw2 = entry[3:]
+
+        #in the flow view, bin i of the axis is at i+1: grid bins below the first edge go to 0 (underflow),
+        #and those at or above the last edge to len(edges) (overflow)
+        pos = np.searchsorted(grid_bins(edges), bins, side='right')
+        values = np.bincount(pos, weights=sumw, minlength=len(edges)+1)
+        variances = np.bincount(pos, weights=sumw2, minlength=len(edges)+1)
+
+        start = 0 if axis.traits.underflow else 1
+        stop = len(values) if axis.traits.overflow else len(values)-1
+
+        H = hist.Hist(axis, storage=hist.storage.Weight())
+        H.view(flow=True).value = values[start:stop] # pyright: ignore[reportAttributeAccessIssue]
+        H.view(flow=True).variance = variances[start:stop] # pyright: ignore[reportAttributeAccessIssue]
+        return H
 
-        v = var.evaluate(self, cut) # pyright: ignore[reportArgumentType]
-        values = ak.to_numpy(ak.flatten(v, axis=None)) # pyright: ignore[reportArgumentType]
-
-        unique_values = np.unique(values) 
+    def get_unique(self, var : VariableProtocol, cut : CutProtocol) -> np.ndarray:
+        prefetched = self._lookup_prefetched('_prefetched_uniques', var, cut)
+        if prefetched is not None:
+            return prefetched
 
-        return unique_values
+        return self.get_uniques([(var, cut)])[0]
 
     @property
     def is_stack(self) -> bool:
@@ -236,24 +699,29 @@ class SingleDatasetBase(DatasetBase):
                   variable: VariableProtocol, 
                   cut: CutProtocol, 
                   weight : VariableProtocol,
-                  axis : Any) -> Any:
+                  axis : Any,
+                  threads : Union[int, None] = None) -> Any:
        
-        if isinstance(self, UnbinnedDatasetAccessProtocol):
-            needed_columns = list(set(variable.columns + cut.columns + weight.columns))
-            self.ensure_columns(needed_columns)
-
-            val = variable.evaluate(self, cut)
-            wgt = weight.evaluate(self, cut)
+        prefilled = self._lookup_prefilled(variable, cut, weight, axis)
+        if prefilled is None:
+            prefilled = self._lookup_categories(variable, cut, weight, axis, consume=True)
+        if prefilled is None:
+            prefilled = self._lookup_grid(variable, cut, weight, axis, consume=True)
+        if prefilled is not None:
+            self._H = scale_H(prefilled, self._weight)
+            return self._H
+
+        cache, cachekey = self._hist_cache_key(variable, cut, weight, axis)
+        if cache is not None and cachekey is not None:
+            cached = cache.get(cachekey, axis)
+            if cached is not None:
+                self._H = cached
+                return self._H
 
-            self._H = hist.Hist(
-                axis,
-                storage=hist.storage.Weight()
-            )
-
-            self._H.fill(
-                ak.flatten(val, axis=None), 
-                weight = self._weight * ak.flatten(wgt, axis=None) 
-            )
+        if isinstance(self, UnbinnedDatasetAccessProtocol):
+            self._H = self._fill_from_master(variable, cut, weight, axis, threads)
+            if self._H is None:
+                self._H = self._fill_unbinned(variable, cut, weight, axis, threads)
 
         elif isinstance(self, PrebinnedDatasetAccessProtocol):
             cutresult = variable.evaluate(self, cut)
@@ -272,7 +740,309 @@ class SingleDatasetBase(DatasetBase):
         else:
             raise RuntimeError("fill_hist: Dataset does not implement UnbinnedDatasetAccessProtocol or PrebinnedDatasetAccessProtocol!")
         
+        if cache is not None and cachekey is not None:
+            cache.put(cachekey, self._H)
+
         return self._H
+
+    def _fill_unbinned(self,
+                       variable: VariableProtocol, 
+                       cut: CutProtocol, 
+                       weight : VariableProtocol,
+                       axis : Any,
+                       threads : Union[int, None] = None) -> hist.Hist:
+        '''
+        Fill a weighted histogram from the unbinned data, one chunk at a time
+        '''
+        threads = fill_threads(threads)
+        needed_columns = list(set(variable.columns + cut.columns + weight.columns))
+
+        #constant weights are applied after an unweighted fill
+        wconst = constant_weight(weight)
+        H = make_fill_hist(axis, wconst)
+
+        for chunk in self.iter_chunks(needed_columns, cut):
+            with EvaluationContext(chunk):
+                val = evaluate_variable(variable, chunk, cut)
+                if wconst is None:
+                    wgt = evaluate_variable(weight, chunk, cut)
+
+            if wconst is None:
+                H.fill(
+                    ak.flatten(val, axis=None), 
+                    weight = self._weight * ak.flatten(wgt, axis=None), # pyright: ignore[reportPossiblyUnboundVariable]
+                    threads = threads
+                )
+            else:
+                H.fill(
+                    ak.flatten(val, axis=None),
+                    threads = threads
+                )
+
+        if wconst is not None:
+            H = weighted_from_counts(H, axis, self._weight * wconst)
+
+        return H
+
+    @property
+    def cache_identity(self) -> Any:
+        '''
+        Picklable description of the underlying data, used to key the on-disk histogram cache. 
+        Must change whenever the data changes. 
+        None (the default) means the dataset cannot be cached
+        '''
+        return None
+
+    def _hist_cache_key(self, variable, cut, weight, axis) -> Tuple[Union[HistCache, None], Union[str, None]]:
+        cache = get_hist_cache()
+        if cache is None:
+            return None, None
+
+        identity = self.cache_identity
+        if identity is None:
+            return None, None
+
+        return cache, cache.make_key((type(self).__name__, identity), variable, cut, weight, axis, self._weight)
+
+    def fill_hists(self,
+                   specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                   cut : CutProtocol,
+                   threads : Union[int, None] = None) -> List[Any]:
+        '''
+        Fill one histogram for each (variable, weight, axis) in specs, all with the same cut,
+        in a single pass over the data. 
+        Returns the list of histograms, in the same order as specs
+        '''
+        return [scale_H(H, self._weight) for H in self._fill_hists_unweighted(specs, cut, threads)]
+
+    def prefill_hists(self,
+                      specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                      cut : CutProtocol,
+                      threads : Union[int, None] = None) -> None:
+        '''
+        Fill the histograms for specs in a single pass (as fill_hists()),
+        and keep them around so that later fill_hist() calls with the same 
+        variable, cut, weight, and axis objects don't touch the data again.
+        The dataset weight is only applied when they are retrieved,
+        so compute_weight() may still be called in between
+        '''
+        Hs = self._fill_hists_unweighted(specs, cut, threads)
+
+        if not hasattr(self, '_prefilled'):
+            self._prefilled = {}
+
+        for (variable, weight, axis), H in zip(specs, Hs):
+            k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+            #the entry keeps the objects alive, so their id()s cannot be reused
+            self._prefilled.setdefault(k, []).append((variable, cut, weight, axis, H))
+
+    def clear_prefilled(self) -> None:
+        if hasattr(self, '_prefilled'):
+            del self._prefilled
+        if hasattr(self, '_prefilled_categories'):
+            del self._prefilled_categories
+        if hasattr(self, '_prefilled_grids'):
+            del self._prefilled_grids
+        for name in ['_prefetched_ranges', '_prefetched_sketches', '_prefetched_uniques']:
+            if hasattr(self, name):
+                delattr(self, name)
+
+    def prefill_categories(self,
+                           variable : VariableProtocol,
+                           cut : CutProtocol,
+                           weight : VariableProtocol) -> np.ndarray:
+        '''
+        Count the (integer) values of variable in a single pass over the data, 
+        and keep the sums of weights per value around, so that a later fill_hist() 
+        with the same variable, cut, and weight objects and any IntCategory axis 
+        does not touch the data again. Values missing from that axis go to its overflow bin.
+        The counts are only used by the first such fill_hist(), and then dropped.
+        Returns the sorted distinct values
+        '''
+        if not isinstance(self, UnbinnedDatasetAccessProtocol):
+            raise RuntimeError("prefill_categories: Dataset does not implement UnbinnedDatasetAccessProtocol!")
+
+        needed_columns = list(set(variable.columns + cut.columns + weight.columns))
+        wconst = constant_weight(weight)
+
+        parts = []
+        for chunk in self.iter_chunks(needed_columns, cut):
+            with EvaluationContext(chunk):
+                val = ak.to_numpy(ak.flatten(evaluate_variable(variable, chunk, cut), axis=None)) # pyright: ignore[reportArgumentType]
+                if wconst is None:
+                    wgt = ak.to_numpy(ak.flatten(evaluate_variable(weight, chunk, cut), axis=None)) # pyright: ignore[reportArgumentType]
+                else:
+                    wgt = None
+            parts.append(count_categories(val, wgt))
+
+        categories, sumw, sumw2 = merge_categories(parts)
+        if wconst is not None:
+            sumw = sumw * wconst
+            sumw2 = sumw2 * np.square(wconst)
+
+        if not hasattr(self, '_prefilled_categories'):
+            self._prefilled_categories = {}
+
+        k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+        #the entry keeps the objects alive, so their id()s cannot be reused
+        self._prefilled_categories[k] = (variable, cut, weight, categories, sumw, sumw2)
+        return categories
+
+    def _lookup_categories(self, variable, cut, weight, axis, consume : bool = False) -> Any:
+        #unweighted histogram from the prefill_categories() counts, or None
+        #consume drops the counts, so that they cannot go stale or pile up
+        if not hasattr(self, '_prefilled_categories') or not isinstance(axis, hist.axis.IntCategory):
+            return None
+
+        k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+        entry = self._prefilled_categories.get(k)
+        if entry is None or entry[0] is not variable or entry[1] is not cut or entry[2] is not weight:
+            return None
+        if consume:
+            del self._prefilled_categories[k]
+        categories, sumw, sumw2 = entry[3:]
+
+        #position of each counted value on the axis, with values missing from the axis in the overflow bin
+        axis_categories = np.asarray(list(axis), dtype=np.int64)
+        found = np.zeros(len(categories), dtype=bool)
+        pos = np.full(len(categories), len(axis_categories))
+        if len(axis_categories) > 0:
+            sorter = np.argsort(axis_categories)
+            i = np.clip(np.searchsorted(axis_categories, categories, sorter=sorter), 0, len(axis_categories)-1)
+            found = axis_categories[sorter[i]] == categories
+            pos = np.where(found, sorter[i], pos)
+
+        if not np.all(found) and not axis.traits.overflow:
+            return None
+
+        H = hist.Hist(axis, storage=hist.storage.Weight())
+        nflow = len(H.view(flow=True))
+        values = np.zeros(nflow)
+        variances = np.zeros(nflow)
+        np.add.at(values, pos, sumw)
+        np.add.at(variances, pos, sumw2)
+        H.view(flow=True).value = values # pyright: ignore[reportAttributeAccessIssue]
+        H.view(flow=True).variance = variances # pyright: ignore[reportAttributeAccessIssue]
+        return H
+
+    def _lookup_prefilled(self, variable, cut, weight, axis) -> Any:
+        if not hasattr(self, '_prefilled'):
+            return None
+
+        k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+        for entry in self._prefilled.get(k, []):
+            if entry[3] is axis or entry[3] == axis:
+                return entry[4]
+
+        return None
+
+    def set_master_axis(self, variable : VariableProtocol, axis : Any) -> None:
+        '''
+        Serve histograms of variable by rebinning a fine-binned master histogram on axis, 
+        which is filled once per (cut, weight). 
+        Requested axes whose edges are a subset of the master edges are then filled without 
+        touching the data again, other axes are filled from the data as usual.
+        The master axis needs both flow bins, and is matched by the identity of the variable object.
+        Pass axis = None to stop using a master histogram for variable
+        '''
+        if not hasattr(self, '_master_axes'):
+            self._master_axes = {}
+        
+        k = (id(variable), variable.key)
+        if axis is None:
+            self._master_axes.pop(k, None)
+        else:
+            #the entry keeps the variable alive, so its id() cannot be reused
+            self._master_axes[k] = (variable, axis)
+        self.clear_master_hists()
+
+    def clear_master_hists(self) -> None:
+        if hasattr(self, '_master_hists'):
+            del self._master_hists
+
+    def _fill_from_master(self, variable, cut, weight, axis, threads=None) -> Any:
+        if not hasattr(self, '_master_axes'):
+            return None
+        
+        entry = self._master_axes.get((id(variable), variable.key))
+        if entry is None or entry[0] is not variable:
+            return None
+        master_axis = entry[1]
+
+        #don't fill the master histogram for an axis it cannot serve
+        if rebin_indices(master_axis, axis) is None:
+            return None
+
+        if not hasattr(self, '_master_hists'):
+            self._master_hists = {}
+
+        k = (id(variable), variable.key, id(cut), cut.key, id(weight), weight.key)
+        master = self._master_hists.get(k)
+        if master is None or master[0] is not cut or master[1] is not weight:
+            #the dataset weight is only applied after rebinning, so compute_weight() may still be called in between
+            master = (cut, weight, self._fill_hists_unweighted([(variable, weight, master_axis)], cut, threads)[0])
+            self._master_hists[k] = master
+
+        return scale_H(rebin_H(master[2], axis), self._weight)
+
+    def _fill_hists_unweighted(self,
+                               specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                               cut : CutProtocol,
+                               threads : Union[int, None] = None) -> List[Any]:
+        if isinstance(self, UnbinnedDatasetAccessProtocol):
+            threads = fill_threads(threads)
+
+            needed_columns = set(cut.columns)
+            for variable, weight, _ in specs:
+                needed_columns.update(variable.columns + weight.columns)
+
+            #constant weights are applied after an unweighted fill
+            wconsts = [constant_weight(weight) for _, weight, _ in specs]
+            Hs = [make_fill_hist(axis, wconst) for (_, _, axis), wconst in zip(specs, wconsts)]
+
+            for chunk in self.iter_chunks(list(needed_columns), cut):
+                #usually all the specs share the same weight, so only evaluate each weight once
+                #the cut mask is shared through the mask cache of the chunk
+                wgts = {}
+                for (variable, weight, _), wconst, H in zip(specs, wconsts, Hs):
+                    #one context per histogram, so that we don't keep every evaluated variable in memory at once
+                    with EvaluationContext(chunk):
+                        val = evaluate_variable(variable, chunk, cut)
+                        if wconst is None and id(weight) not in wgts:
+                            wgts[id(weight)] = ak.flatten(evaluate_variable(weight, chunk, cut), axis=None)
+
+                    if wconst is None:
+                        H.fill(
+                            ak.flatten(val, axis=None), 
+                            weight = wgts[id(weight)],
+                            threads = threads
+                        )
+                    else:
+                        H.fill(
+                            ak.flatten(val, axis=None),
+                            threads = threads
+                        )
+
+            return [H if wconst is None else weighted_from_counts(H, axis, wconst) 
+                    for (_, _, axis), wconst, H in zip(specs, wconsts, Hs)]
+
+        elif isinstance(self, PrebinnedDatasetAccessProtocol):
+            #nothing to share between prebinned variables
+            Hs = []
+            for variable, weight, _ in specs:
+                cutresult = variable.evaluate(self, cut)
+
+                if isinstance(cutresult, tuple) and len(cutresult) == 2:
+                    val, cov = cutresult
+                else:
+                    raise RuntimeError("fill_hists: Cut must return prebinned (val, cov) pair for a prebinned dataset!")
+
+                wgt = weight.evaluate(self, NoCut())
+                Hs.append((val * wgt, cov * np.square(wgt)))
+
+            return Hs
+        else:
+            raise RuntimeError("fill_hists: Dataset does not implement UnbinnedDatasetAccessProtocol or PrebinnedDatasetAccessProtocol!")
     
     def plot_hist(self,
                 variable: VariableProtocol, 
@@ -288,54 +1058,118 @@ class SingleDatasetBase(DatasetBase):
 
         self.fill_hist(variable, cut, weight, axis)
 
-        if own_style:
-            mpl_kwargs['label'] = self.label
-            mpl_kwargs['color'] = self.color
-
-        if _fillbetween is not None:
-            fbtw = _fillbetween
-        elif mode != HistplotMode.ERRORBAR:
-            fbtw = 0
-        else:
-            fbtw = None
-
-        artist, vals = call_histplot_function(
-            self._H, 
+        artist, vals = self.draw_hist(
+            self._H,
             axis,
+            density = density,
             ax = ax,
-            density=density,
-            fillbetween = fbtw,
+            own_style = own_style,
+            mode = mode,
+            _fillbetween = _fillbetween,
             **mpl_kwargs
         )
         return (artist, vals), self._H
     
 class DatasetStackBase(DatasetBase):
     _datasets : Sequence[BaseDatasetProtocol]
+    _max_workers : Union[int, None] = None
+
+    def set_max_workers(self, max_workers : Union[int, None]):
+        '''
+        Process the constituent datasets concurrently, in a pool of up to max_workers threads.
+        Most of the work (parquet reads, numpy kernels, histogram fills) releases the GIL.
+        Pass None to go back to processing them one after another.
+        The same dataset object must not appear twice in a stack processed concurrently
+        '''
+        self._max_workers = max_workers
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def _map_datasets(self, fn : Callable[[BaseDatasetProtocol], Any]) -> List[Any]:
+        '''
+        [fn(d) for d in self._datasets], in parallel if max_workers is set.
+        The results are always in the order of the datasets, so that reductions over them are deterministic
+        '''
+        if self._max_workers is None or self._max_workers <= 1 or len(self._datasets) <= 1:
+            return [fn(d) for d in self._datasets]
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(self._datasets))) as executor:
+            return list(executor.map(fn, self._datasets))
     
     def estimate_yield(self, cut : CutProtocol, weight : VariableProtocol) -> float:
-        return np.sum([d.estimate_yield(cut, weight) for d in self._datasets])
+        return np.sum(self._map_datasets(lambda d: d.estimate_yield(cut, weight)))
 
     def order_by_yield(self, cut : CutProtocol, weight : VariableProtocol) -> None:
-        yields = [d.estimate_yield(cut, weight) for d in self._datasets]
+        yields = self._map_datasets(lambda d: d.estimate_yield(cut, weight))
         ordered_indices = np.argsort(yields)
         self._datasets = [self._datasets[i] for i in ordered_indices]
 
+    def _order_by_filled_yield(self) -> None:
+        #same as order_by_yield(), but reusing the histograms from the last fill_hist() call
+        #NB this is the yield inside the histogram (including flow bins), so unlike estimate_yield()
+        #it leaves out entries which fall outside an axis without flow bins, or whose variable is NaN
+        yields = [yield_of_H(H) for H in self._Hs]
+        ordered_indices = np.argsort(yields)
+        self._datasets = [self._datasets[i] for i in ordered_indices]
+        self._Hs = [self._Hs[i] for i in ordered_indices]
+
     def get_unique(self, var : VariableProtocol, cut : CutProtocol) -> np.ndarray:
         unique_values = np.unique(
             np.concatenate(
-                [d.get_unique(var, cut) for d in self._datasets]
+                self._map_datasets(lambda d: d.get_unique(var, cut))
             )
         )
         return unique_values
 
+    def get_sketch(self, var : VariableProtocol, cut : CutProtocol, weight : Union[VariableProtocol, None] = None) -> QuantileSketch:
+        #fill_hist() of the stack picks up the grid sums through the constituents
+        return merge_sketches(self._map_datasets(lambda d: d.get_sketch(var, cut, weight)))
+
     def get_range(self, var : VariableProtocol, cut : CutProtocol) -> Tuple[Any, Any, Any, np.dtype]:
 
-        results = [d.get_range(var, cut) for d in self._datasets]
+        results = self._map_datasets(lambda d: d.get_range(var, cut))
         minval = np.min([r[0] for r in results])
         minval2 = np.min([r[1] for r in results])
         maxval = np.max([r[2] for r in results])
         return (minval, minval2, maxval, results[0][0].dtype)
 
+    def get_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[Tuple[Any, Any, Any, np.dtype]]:
+        #one pass over each constituent
+        allresults = self._map_datasets(lambda d: d.get_ranges(pairs))
+
+        ranges = []
+        for i in range(len(pairs)):
+            results = [r[i] for r in allresults]
+            ranges.append((np.min([r[0] for r in results]),
+                           np.min([r[1] for r in results]),
+                           np.max([r[2] for r in results]),
+                           results[0][0].dtype))
+        return ranges
+
+    def prefetch_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        #get_range() of the stack picks these up through the constituents
+        self._map_datasets(lambda d: d.prefetch_ranges(pairs))
+
+    def get_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[QuantileSketch]:
+        #one pass over each constituent
+        allresults = self._map_datasets(lambda d: d.get_sketches(pairs))
+        return [merge_sketches([r[i] for r in allresults]) for i in range(len(pairs))]
+
+    def prefetch_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        #get_sketch() of the stack picks these up through the constituents
+        self._map_datasets(lambda d: d.prefetch_sketches(pairs))
+
+    def get_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[np.ndarray]:
+        #one pass over each constituent
+        allresults = self._map_datasets(lambda d: d.get_uniques(pairs))
+        return [np.unique(np.concatenate([r[i] for r in allresults])) for i in range(len(pairs))]
+
+    def prefetch_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        #get_unique() of the stack picks these up through the constituents
+        self._map_datasets(lambda d: d.prefetch_uniques(pairs))
+
     @property
     def binning(self) -> ArbitraryBinning:
         if len(self._datasets) == 0:
@@ -382,7 +1216,8 @@ class DatasetStackBase(DatasetBase):
                   variable: VariableProtocol, 
                   cut: CutProtocol, 
                   weight : VariableProtocol,
-                  axis : Any) -> Any:
+                  axis : Any,
+                  threads : Union[int, None] = None) -> Any:
        
         if 'NormalizePerBlock' in variable.key:
             # Kinda a weird edge case
@@ -392,21 +1227,71 @@ class DatasetStackBase(DatasetBase):
             # maybe later can implement some clever reweighting of the constituent blocks
             raise RuntimeError("DatasetStack.fill_hist: Cannot fill hist with NormalizePerBlock variable on a dataset stack!")
 
-        for d in self._datasets:
-            d.fill_hist(variable, cut, weight, axis)
-
         if len(self._datasets) == 0:
             raise RuntimeError("DatasetStack.fill_hist: No datasets in stack!")
-        
-        self.H = self._datasets[0].fill_hist(variable, cut, weight, axis)
-        self.H = copy.deepcopy(self.H)
 
-        for d in self._datasets[1:]:
-            nextH = d.fill_hist(variable, cut, weight, axis)
+        #fill each constituent exactly once
+        #the constituent histograms are kept for drawing resolved stacks
+        self._Hs = self._map_datasets(lambda d: d.fill_hist(variable, cut, weight, axis, threads))
+
+        self.H = copy.deepcopy(self._Hs[0])
+        for nextH in self._Hs[1:]:
             self.H = accumulate_H(self.H, nextH)
 
         return self.H
 
+    def fill_hists(self,
+                   specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                   cut : CutProtocol,
+                   threads : Union[int, None] = None) -> List[Any]:
+        for variable, _, _ in specs:
+            if 'NormalizePerBlock' in variable.key:
+                raise RuntimeError("DatasetStack.fill_hists: Cannot fill hist with NormalizePerBlock variable on a dataset stack!")
+
+        if len(self._datasets) == 0:
+            raise RuntimeError("DatasetStack.fill_hists: No datasets in stack!")
+
+        #one pass over each constituent
+        allHs = self._map_datasets(lambda d: d.fill_hists(specs, cut, threads))
+        Hs = allHs[0]
+        for nextHs in allHs[1:]:
+            Hs = [accumulate_H(H, nextH) for H, nextH in zip(Hs, nextHs)]
+
+        return Hs
+
+    def prefill_hists(self,
+                      specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                      cut : CutProtocol,
+                      threads : Union[int, None] = None) -> None:
+        for variable, _, _ in specs:
+            if 'NormalizePerBlock' in variable.key:
+                raise RuntimeError("DatasetStack.prefill_hists: Cannot fill hist with NormalizePerBlock variable on a dataset stack!")
+
+        #fill_hist() of the stack picks these up through the constituents
+        self._map_datasets(lambda d: d.prefill_hists(specs, cut, threads))
+
+    def clear_prefilled(self) -> None:
+        for d in self._datasets:
+            d.clear_prefilled()
+
+    def prefill_categories(self,
+                           variable : VariableProtocol,
+                           cut : CutProtocol,
+                           weight : VariableProtocol) -> np.ndarray:
+        #fill_hist() of the stack picks these up through the constituents
+        return np.unique(np.concatenate(
+            self._map_datasets(lambda d: d.prefill_categories(variable, cut, weight))
+        ))
+
+    def set_master_axis(self, variable : VariableProtocol, axis : Any) -> None:
+        #fill_hist() of the stack picks these up through the constituents
+        for d in self._datasets:
+            d.set_master_axis(variable, axis)
+
+    def clear_master_hists(self) -> None:
+        for d in self._datasets:
+            d.clear_master_hists()
+
     def plot_hist(self,
                 variable: VariableProtocol, 
                 cut: CutProtocol, 
@@ -439,12 +1324,12 @@ class DatasetStackBase(DatasetBase):
             mpl_kwargs['color'] = self.color
 
         if mode == HistplotMode.STACK:
-            self.order_by_yield(cut, weight)
+            self._order_by_filled_yield()
 
             prev = fbtw
-            for d in self._datasets:
-                (artist, vals), _ = d.plot_hist(
-                    variable, cut, weight, axis,
+            for d, H in zip(self._datasets, self._Hs):
+                artist, vals = d.draw_hist(
+                    H, axis,
                     density, ax,
                     own_style=True,
                     _fillbetween = prev,
@@ -1,109 +1,873 @@
 from coffea.nanoevents import NanoEventsFactory, NanoAODSchema
+import uproot
 
 import pyarrow.parquet as pq
 import pyarrow as pa
 import pyarrow.dataset as ds
+import pyarrow.compute as pc
 
 import numpy as np
 import awkward as ak
 
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import hist
 import matplotlib.axes
 
 
 from simonpy.AbitraryBinning import ArbitraryBinning
 
-from typing import List, Union, override
+from typing import Any, List, Union, override
 
-from .DatasetBase import SingleDatasetBase, DatasetStackBase
+from .DatasetBase import SingleDatasetBase, DatasetStackBase, accumulate_H
+from simonplot.util.mask_cache import MaskCache, evaluate_cut
+from simonplot.util.file_metadata import get_file_metadata_cache
+from simonplot.util.column_cache import get_column_cache
+from simonplot.util.arrow_convert import arrow_to_numpy, numpy_to_arrow, zero_copy_convertible
+from simonplot.util.arrow_cache import ArrowCache, get_arrow_cache, enable_arrow_cache
+from simonplot.cut.arrow_filter import cut_to_arrow_filter
+from simonplot.cut.Cut import NoCut
+from simonplot.variable.Variable import BasicVariable
 from simonplot.typing.Protocols import BaseDatasetProtocol
+from simonplot.config import config
 
 class DatasetStack(DatasetStackBase):
-    def __init__(self, key : str, color : str | None, label : str, datasets : list[BaseDatasetProtocol]):
+    def __init__(self, key : str, color : str | None, label : str, datasets : list[BaseDatasetProtocol], max_workers : int | None = None):
         self._key = key
         self._color = color
         self._label = label
         self._datasets = datasets
+        self._max_workers = max_workers
         
+def _normalize_root_files(fname) -> list:
+    '''
+    [(path, treepath)] from "path:treepath", {path : treepath}, or a list of either
+    '''
+    if isinstance(fname, dict):
+        return list(fname.items())
+    elif isinstance(fname, (list, tuple)):
+        return [item for f in fname for item in _normalize_root_files(f)]
+    
+    #the last ':' separates the treepath, so that urls (root://...) keep theirs
+    path, sep, treepath = fname.rpartition(':')
+    if sep == '' or '/' in treepath:
+        raise ValueError("NanoEventsDataset: fname '%s' has no treepath! Append it after a ':' (eg 'NANO.root:Events')"%fname)
+    return [(path, treepath)]
+
+def _open_nanoevents(fname, treepath, options, entry_start=None, entry_stop=None):
+    options = dict(options)
+
+    import coffea
+    version = coffea._version.version_tuple
+    if (int(version[0]), int(version[1])) >= (2025, 11):
+        options['mode'] = 'virtual'
+    else:
+        options['delayed'] = False
+
+    return NanoEventsFactory.from_root(
+        {fname : treepath},
+        entry_start=entry_start,
+        entry_stop=entry_stop,
+        **options 
+    ).events()
+
+def _branch_name(column):
+    #NanoAOD flattens collection.field into collection_field
+    return column.replace('.', '_')
+
+def _read_branches(tree, columns, executor, entry_start=None, entry_stop=None) -> dict:
+    '''
+    Read all the columns which are stored as branches in a single call.
+    Returns {column : array} for those columns
+    '''
+    available = set(tree.keys())
+    branches = {col : _branch_name(col) for col in columns if _branch_name(col) in available}
+    if len(branches) == 0:
+        return {}
+
+    kwargs = {} if executor is None else {'decompression_executor' : executor}
+    arrays = tree.arrays(
+        list(set(branches.values())), 
+        entry_start=entry_start, 
+        entry_stop=entry_stop, 
+        library='ak', 
+        **kwargs
+    )
+    return {col : arrays[branch] for col, branch in branches.items()}
+
+def entry_ranges(boundaries, step_size : int) -> list:
+    '''
+    Split the entries into [start, stop) ranges of at most step_size entries, 
+    cutting only at the given boundaries (eg the common basket boundaries of the branches)
+    where possible. Stretches between boundaries longer than step_size are split evenly
+    '''
+    boundaries = [int(b) for b in boundaries]
+
+    ranges = []
+    start = boundaries[0]
+    for prev, boundary in zip(boundaries[:-1], boundaries[1:]):
+        if boundary - start <= step_size:
+            continue
+
+        if prev > start:
+            ranges.append((start, prev))
+            start = prev
+
+        if boundary - start > step_size:
+            nsplit = int(np.ceil((boundary - start) / step_size))
+            edges = np.linspace(start, boundary, nsplit+1).round().astype(int)
+            ranges.extend(zip(edges[:-1].tolist(), edges[1:].tolist()))
+            start = boundary
+
+    if boundaries[-1] > start:
+        ranges.append((start, boundaries[-1]))
+    return ranges
+
+class NanoEventsChunk:
+    '''
+    One entry range of one file of a NanoEventsDataset, with the branches already read.
+    Columns which are not branches are materialized from NanoEvents for just these entries.
+    Used to hand the chunks of a streaming scan to Variables and Cuts
+    '''
+    def __init__(self, fname, treepath, entry_start, entry_stop, columns : dict, options : dict):
+        self._fname = fname
+        self._treepath = treepath
+        self._entry_start = entry_start
+        self._entry_stop = entry_stop
+        self._columns = columns
+        self._options = options
+        self.mask_cache = MaskCache()
+
+    def ensure_columns(self, columns):
+        pass
+
+    def get_column(self, column_name, collection_name=None):
+        column = column_name if collection_name is None else collection_name + '.' + column_name
+        if column not in self._columns:
+            if not hasattr(self, '_events'):
+                self._events = _open_nanoevents(self._fname, self._treepath, self._options, self._entry_start, self._entry_stop)
+            if collection_name is not None:
+                self._columns[column] = ak.materialize(self._events[collection_name][column_name])
+            else:
+                self._columns[column] = ak.materialize(self._events[column_name])
+
+        return self._columns[column]
+
+    @property
+    def num_rows(self):
+        return self._entry_stop - self._entry_start
+
 class NanoEventsDataset(SingleDatasetBase):
-    def __init__(self, key : str, color : str | None, label : str, fname, **options):
+    def __init__(self, key : str, color : str | None, label : str, fname, 
+                 decompression_threads : int | None = None, 
+                 step_size : int | None = None,
+                 **options):
+        '''
+        fname is "path:treepath", a dict {path : treepath}, or a list of either (read as one dataset).
+        The files are only opened on first use.
+        Columns are read from the files in bulk by ensure_columns() and kept in the column cache
+        '''
         self._key = key
         self._color = color
         self._label = label
 
+        self._fname = fname
+        self._files = _normalize_root_files(fname)
+        self._options = options
+        self._decompression_threads = decompression_threads
+        self._step_size = step_size
+
         #suppress warnings
         NanoAODSchema.warn_missing_crossrefs = False
 
-        import coffea
-        version = coffea._version.version_tuple
-        if int(version[0]) >= 2025 and int(version[1]) >= 11 and int(version[2]) >= 0:
-            options['mode'] = 'virtual'
-        else:
-            options['delayed'] = False
+    def set_step_size(self, step_size : int | None):
+        '''
+        Enable streaming mode, reading about `step_size` entries at a time
+        (cut at basket boundaries where possible), instead of loading the full files into memory.
+        Pass None to go back to loading (and caching) the full columns
+        '''
+        self._step_size = step_size
+
+    @property
+    def step_size(self):
+        return self._step_size
+
+    @property
+    def events(self):
+        if not hasattr(self, '_events'):
+            if len(self._files) != 1:
+                raise RuntimeError("NanoEventsDataset: NanoEvents are only available for a single file! Columns which are not branches need step_size to be set for multiple files")
+            self._events = _open_nanoevents(*self._files[0], self._options)
+        return self._events
+
+    @property
+    def trees(self):
+        '''
+        The uproot TTrees (or RNTuples) of the files, for reading branches directly
+        '''
+        if not hasattr(self, '_trees'):
+            self._trees = [uproot.open(fname)[treepath] for fname, treepath in self._files]
+        return self._trees
+
+    def _executor(self) -> ThreadPoolExecutor | None:
+        threads = self._decompression_threads
+        if threads is None:
+            threads = config['nanoevents']['decompression_threads']
+        if threads == 0:
+            threads = os.cpu_count()
+
+        if threads > 1:
+            return ThreadPoolExecutor(max_workers=threads)
+        return None
 
-        self._events = NanoEventsFactory.from_root(
-            fname,
-            **options 
-        ).events()
-        
     def ensure_columns(self, columns):
-        # NanoEvents loads all columns on demand, so nothing to do here
-        pass
+        cache = get_column_cache()
+
+        #dict.fromkeys() to drop duplicates while preserving order
+        missing = [col for col in dict.fromkeys(columns) if not cache.contains(self.column_cache_token, col)]
+        if len(missing) == 0:
+            return
+
+        for col, value in self._read_branches(missing).items():
+            cache.put(self.column_cache_token, col, value)
+
+    def _read_branches(self, columns) -> dict:
+        #everything which is stored as a branch is read in a single call per file,
+        #decompressing the baskets of all the branches in parallel.
+        #Anything else (cross-references, derived quantities) is left to NanoEvents in get_column()
+        executor = self._executor()
+        try:
+            parts = [_read_branches(tree, columns, executor) for tree in self.trees]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if len(parts) == 1:
+            return parts[0]
+        return {col : ak.concatenate([part[col] for part in parts]) for col in parts[0]}
+
+    def iter_chunks(self, columns, cut):
+        if self._step_size is None:
+            yield from super().iter_chunks(columns, cut)
+            return
+
+        columns = list(dict.fromkeys(columns))
+        executor = self._executor()
+        try:
+            for (fname, treepath), tree in zip(self._files, self.trees):
+                branches = [_branch_name(col) for col in columns if _branch_name(col) in tree.keys()]
+                if len(branches) > 0 and hasattr(tree, 'common_entry_offsets'):
+                    boundaries = tree.common_entry_offsets(filter_name=branches)
+                else:
+                    #no basket boundaries to follow (or not a TTree, eg an RNTuple): fixed-size ranges
+                    boundaries = [0, tree.num_entries]
+
+                for start, stop in entry_ranges(boundaries, self._step_size):
+                    arrays = _read_branches(tree, columns, executor, start, stop)
+                    yield NanoEventsChunk(fname, treepath, start, stop, arrays, self._options)
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
     def get_column(self, column_name, collection_name=None):
         if '.' in column_name:
             raise ValueError("NanoEventsDataset.get_column: column_name '%s' contains '.'! Instead use collection_name argument."%(column_name))
         
-        if collection_name is not None:
-            return ak.materialize(self._events[collection_name][column_name])
-        else:
-            return ak.materialize(self._events[column_name])
+        column = column_name if collection_name is None else collection_name + '.' + column_name
+        cache = get_column_cache()
+        value = cache.get(self.column_cache_token, column)
+        if value is None:
+            #never loaded, or evicted from the column cache since
+            value = self._read_branches([column]).get(column)
+            if value is None and collection_name is not None:
+                value = ak.materialize(self.events[collection_name][column_name])
+            elif value is None:
+                value = ak.materialize(self.events[column_name])
+            cache.put(self.column_cache_token, column, value)
+
+        return value
+
+    @property
+    def loaded_columns(self):
+        return get_column_cache().columns(self.column_cache_token)
         
     @property
     def num_rows(self):
-        return len(self._events)
+        return sum(tree.num_entries for tree in self.trees)
+
+    @property
+    def cache_identity(self):
+        #only local files can be checked for modifications
+        identity = []
+        for fname, treepath in self._files:
+            if not os.path.isfile(fname):
+                return None
+            stat = os.stat(fname)
+            identity.append((os.path.abspath(fname), treepath, stat.st_size, stat.st_mtime_ns))
+        return tuple(identity)
     
+class ArrowTableView:
+    '''
+    Minimal unbinned dataset access over an in-memory arrow table.
+    Used to hand the record batches of a streaming scan to Variables and Cuts
+    '''
+    def __init__(self, table : pa.Table):
+        self._table = table
+        self.mask_cache = MaskCache()
+        #converted columns, so that get_column() combines the chunks only once
+        self._columns = {}
+
+    @property
+    def table(self):
+        return self._table
+
+    def extend(self, table : pa.Table):
+        '''
+        Replace the table with one holding additional columns for the same rows.
+        Cached cut masks stay valid
+        '''
+        if table.num_rows != self._table.num_rows:
+            raise RuntimeError("ArrowTableView.extend: number of rows changed!")
+        self._table = table
+        self._columns = {}
+
+    def ensure_columns(self, columns):
+        for col in columns:
+            if col not in self._table.column_names:
+                raise RuntimeError("ArrowTableView: column %s not in table!"%col)
+
+    def get_column(self, column_name, collection_name=None):
+        if collection_name is not None:
+            raise NotImplementedError("ArrowTableView does not support collection_name argument")
+
+        if column_name not in self._table.column_names:
+            raise RuntimeError("Column %s not loaded!"%column_name)
+
+        if column_name not in self._columns:
+            self._columns[column_name] = arrow_to_numpy(self._table[column_name])
+        return self._columns[column_name]
+
+    @property
+    def num_rows(self):
+        return self._table.num_rows
+
+SKIM_NUM_EVENTS_KEY = b'simonplot.num_events'
+SKIM_SUM_WEIGHTS_KEY = b'simonplot.sum_weights'
+SKIM_WEIGHT_COLUMN_KEY = b'simonplot.weight_column'
+#the default of pyarrow.parquet.write_table()
+SKIM_DEFAULT_ROW_GROUP_SIZE = 1024 * 1024
+
+def _fragment_dataset(fragments, schema, filesystem, batch_size) -> 'ParquetDataset':
+    subset = ds.FileSystemDataset(fragments, schema, ds.ParquetFileFormat(), filesystem=filesystem)
+    return ParquetDataset('', None, '', subset, batch_size=batch_size, arrow_cache=False)
+
+def _fill_fragments(fragments, schema, filesystem, batch_size, variable, cut, weight, axis, dataset_weight, threads) -> hist.Hist:
+    '''
+    Worker for ParquetDataset's parallel fill: fill the histogram for a subset of the fragments
+    '''
+    dset = _fragment_dataset(fragments, schema, filesystem, batch_size)
+    dset._weight = dataset_weight
+    return dset._fill_unbinned(variable, cut, weight, axis, threads)
+
+def _fill_fragments_unweighted(fragments, schema, filesystem, batch_size, specs, cut, threads) -> List[Any]:
+    '''
+    Worker for ParquetDataset's parallel multi-histogram fill: 
+    fill the unweighted histograms of specs for a subset of the fragments
+    '''
+    dset = _fragment_dataset(fragments, schema, filesystem, batch_size)
+    return dset._fill_hists_unweighted(specs, cut, threads)
+
 class ParquetDataset(SingleDatasetBase):
-    def __init__(self, key : str, color : str | None, label : str, path, filesystem=None):
+    def __init__(self, key : str, color : str | None, label : str, path, filesystem=None, batch_size : int | None = None, num_processes : int | None = None, arrow_cache : bool | None = None):
+        '''
+        path is a file or folder of parquet files (or an already built pyarrow dataset)
+        arrow_cache controls whether loaded columns go through the Arrow materialization cache 
+        (see util/arrow_cache.py). None uses it if it is enabled globally
+        '''
         self._key = key
         self._color = color
         self._label = label
 
-        self._dataset = ds.dataset(path, format="parquet", filesystem=filesystem)
+        if isinstance(path, ds.Dataset):
+            self._dataset = path
+        else:
+            self._dataset = ds.dataset(path, format="parquet", filesystem=filesystem)
+        self._batch_size = batch_size
+        self._num_processes = num_processes
+        self._use_arrow_cache = arrow_cache
+
+        #columns which ensure_columns() was asked for. They are kept in the column cache,
+        #and read again if they have been evicted from it
+        self._requested_columns = set()
+        #columns needed by the current pass over the data, held until it ends (see release_columns()),
+        #so that they are not evicted from the column cache by each other halfway through
+        self._pinned = {}
+
+        #skims carry the event count and sum of weights of the dataset they were made from
+        metadata = self._dataset.schema.metadata or {}
+        if SKIM_NUM_EVENTS_KEY in metadata:
+            #may have been overridden with a sum of weights, so not necessarily an integer
+            self.override_num_events(float(metadata[SKIM_NUM_EVENTS_KEY]))
+        self._sum_weights = float(metadata[SKIM_SUM_WEIGHTS_KEY]) if SKIM_SUM_WEIGHTS_KEY in metadata else None
+        self._sum_weights_column = metadata[SKIM_WEIGHT_COLUMN_KEY].decode() if SKIM_WEIGHT_COLUMN_KEY in metadata else None
+
+    def set_batch_size(self, batch_size : int | None):
+        '''
+        Enable streaming mode, reading `batch_size` rows at a time 
+        instead of loading the full table into memory. 
+        Pass None to go back to loading (and caching) the full table
+        '''
+        self._batch_size = batch_size
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    def set_num_processes(self, num_processes : int | None):
+        '''
+        Fill histograms from the files in parallel, splitting the parquet fragments 
+        across a pool of num_processes worker processes. 
+        The Variables, Cuts, and axes are pickled to the workers.
+        Columns which are already loaded into memory are filled from memory instead.
+        Pass None to go back to filling in this process
+        '''
+        self._num_processes = num_processes
+
+    @property
+    def num_processes(self):
+        return self._num_processes
+
+    def _fragment_groups(self, needed_columns) -> List[Any] | None:
+        #groups of fragments to fill in parallel, or None to fill in this process
+        if self._num_processes is None or self._num_processes <= 1 or all(self._is_loaded(col) for col in needed_columns):
+            return None
+
+        fragments = list(self._dataset.get_fragments())
+        if len(fragments) <= 1:
+            return None
+
+        #a few contiguous groups per worker, to even out differences in file size
+        ntasks = min(len(fragments), 4*self._num_processes)
+        return [[fragments[i] for i in group] for group in np.array_split(np.arange(len(fragments)), ntasks)]
+
+    def _map_fragments(self, worker, groups, *args) -> List[Any]:
+        #results of worker on each group of fragments, in the order of the groups
+        with ProcessPoolExecutor(max_workers=self._num_processes) as executor:
+            futures = [executor.submit(
+                worker,
+                group,
+                self._dataset.schema,
+                self._dataset.filesystem,
+                self._batch_size,
+                *args
+            ) for group in groups]
+            return [future.result() for future in futures]
+
+    def _fill_unbinned(self, variable, cut, weight, axis, threads=None):
+        groups = self._fragment_groups(list(set(variable.columns + cut.columns + weight.columns)))
+        if groups is None:
+            return super()._fill_unbinned(variable, cut, weight, axis, threads)
+
+        results = self._map_fragments(_fill_fragments, groups, variable, cut, weight, axis, self._weight, threads)
+
+        #merge in a fixed order, so that the result does not depend on scheduling
+        H = results[0]
+        for nextH in results[1:]:
+            H = accumulate_H(H, nextH)
+        return H
+
+    def _fill_hists_unweighted(self, specs, cut, threads=None):
+        needed_columns = set(cut.columns)
+        for variable, weight, _ in specs:
+            needed_columns.update(variable.columns + weight.columns)
+
+        groups = self._fragment_groups(list(needed_columns))
+        if groups is None:
+            return super()._fill_hists_unweighted(specs, cut, threads)
+
+        results = self._map_fragments(_fill_fragments_unweighted, groups, specs, cut, threads)
+
+        #merge in a fixed order, so that the result does not depend on scheduling
+        Hs = results[0]
+        for nextHs in results[1:]:
+            Hs = [accumulate_H(H, nextH) for H, nextH in zip(Hs, nextHs)]
+        return Hs
+
+    def iter_chunks(self, columns, cut):
+        try:
+            yield from self._iter_chunks(columns, cut)
+        finally:
+            #the pass is over
+            self.release_columns()
+
+    def _iter_chunks(self, columns, cut):
+        arrow_filter = cut_to_arrow_filter(cut, self.schema)
+
+        if self._batch_size is not None:
+            for batch in self._dataset.to_batches(columns=columns, filter=arrow_filter, batch_size=self._batch_size):
+                yield ArrowTableView(pa.Table.from_batches([batch]))
+        elif arrow_filter is None or self._arrow_cache() is not None or all(self._is_loaded(col) for col in columns):
+            #nothing to push down, or everything is already in memory anyway.
+            #With the Arrow materialization cache the full columns are read (or memory-mapped) instead,
+            #since only full columns can be materialized
+            yield from super().iter_chunks(columns, cut)
+        else:
+            yield self._filtered_view(columns, arrow_filter)
+
+    def _read_missing(self, table : pa.Table | None, columns, arrow_filter=None) -> pa.Table:
+        #only read the columns we don't already have
+        #dict.fromkeys() to drop duplicates while preserving order
+        have = [] if table is None else table.column_names
+        missing = list(dict.fromkeys(col for col in columns if col not in have))
+        if len(missing) == 0:
+            return table # pyright: ignore[reportReturnType]
+
+        #combine the chunks of the scan once, so that converting the columns does not copy them
+        newtable = self._dataset.to_table(columns=missing, filter=arrow_filter).combine_chunks()
+
+        if table is None:
+            return newtable
+        
+        for col in missing:
+            table = table.append_column(col, newtable[col])
+        return table
+
+    def _filtered_view(self, columns, arrow_filter) -> ArrowTableView:
+        #keep the view for the most recent filter around,
+        #so that repeated plots with the same cut only read new columns
+        #and can reuse the cached cut masks.
+        #It is not counted in the column cache budget: it only holds the rows passing the cut,
+        #and is replaced as soon as the dataset is used with a different cut
+        if not hasattr(self, '_filter') or not self._filter.equals(arrow_filter):
+            self._filter = arrow_filter
+            self._filtered = ArrowTableView(self._read_missing(None, columns, arrow_filter))
+        else:
+            self._filtered.extend(self._read_missing(self._filtered.table, columns, arrow_filter))
+
+        return self._filtered
             
     def ensure_columns(self, columns):
-        has_everything = True
-        if hasattr(self, '_table'):
+        '''
+        Load the columns, and hold on to them until release_columns() is called 
+        (which iter_chunks() does at the end of every pass), even if they are evicted from the column cache
+        '''
+        cache = get_column_cache()
+
+        #dict.fromkeys() to drop duplicates while preserving order
+        missing = []
+        for col in dict.fromkeys(columns):
+            if col in self._pinned:
+                continue
+            value = cache.get(self.column_cache_token, col)
+            if value is None:
+                missing.append(col)
+            else:
+                self._pinned[col] = value
+
+        self._requested_columns.update(columns)
+        if len(missing) > 0:
+            self._pinned.update(self._load_columns(missing))
+
+    def release_columns(self):
+        '''
+        Stop holding on to the columns of the last ensure_columns() calls.
+        They stay available through the column cache as long as they are not evicted from it
+        '''
+        self._pinned.clear()
+
+    def _arrow_cache(self) -> ArrowCache | None:
+        if self._use_arrow_cache is False:
+            return None
+        elif self._use_arrow_cache and get_arrow_cache() is None:
+            return enable_arrow_cache()
+        return get_arrow_cache()
+
+    def _load_columns(self, columns) -> dict:
+        '''
+        Read the columns into the column cache, as numpy (or awkward) arrays. Returns {column : values}
+        '''
+        cache = get_column_cache()
+        result = {}
+
+        #columns materialized by earlier runs are memory-mapped instead of read
+        arrow_cache = self._arrow_cache()
+        identity = self.cache_identity if arrow_cache is not None else None
+        if identity is not None:
             for col in columns:
-                if col not in self._table.column_names:
-                    has_everything = False
-                    break
+                mapped = arrow_cache.get(identity, col) # pyright: ignore[reportOptionalMemberAccess]
+                if mapped is not None:
+                    result[col] = arrow_to_numpy(mapped)
+                    self._put_materialized(col, result[col], zero_copy_convertible(mapped))
+
+        todo = [col for col in columns if col not in result]
+        if len(todo) == 0:
+            return result
+
+        table = self._dataset.to_table(columns=todo)
+        for col in todo:
+            if identity is not None:
+                mapped = arrow_cache.put(identity, col, table[col]) # pyright: ignore[reportOptionalMemberAccess]
+                result[col] = arrow_to_numpy(mapped)
+                self._put_materialized(col, result[col], zero_copy_convertible(mapped))
+            else:
+                #combine the chunks once, so that get_column() returns views instead of copies
+                result[col] = arrow_to_numpy(table[col])
+                cache.put(self.column_cache_token, col, result[col])
+        return result
+
+    def _put_materialized(self, column, values, is_view : bool) -> None:
+        #views of the memory-mapped file don't use up memory of their own,
+        #but columns which had to be converted with a copy do
+        if is_view:
+            get_column_cache().put_mapped(self.column_cache_token, column, values)
         else:
-            has_everything = False
+            get_column_cache().put(self.column_cache_token, column, values)
+
+    def _is_loaded(self, column) -> bool:
+        return column in self._pinned or get_column_cache().contains(self.column_cache_token, column)
+
+    def _column(self, column) -> Any:
+        if column not in self._requested_columns:
+            raise RuntimeError("Column %s not loaded! Call ensure_columns() first"%column)
 
-        if not has_everything:
-            self._table = self._dataset.to_table(columns=columns)
+        #ask the column cache even for held columns, so that it knows which columns are in use
+        value = get_column_cache().get(self.column_cache_token, column)
+        if value is None:
+            value = self._pinned.get(column)
+        if value is None:
+            #evicted from the column cache (or too large for it) since the pass which loaded it
+            value = self._load_columns([column])[column]
+        return value
+
+    def get_range(self, var, cut):
+        result = self._range_from_statistics_if_plain(var, cut)
+        if result is not None:
+            return result
+
+        return super().get_range(var, cut)
+
+    def get_ranges(self, pairs):
+        results = [self._range_from_statistics_if_plain(var, cut) for var, cut in pairs]
+
+        #everything the footers can't answer is done in one pass
+        todo = [i for i, result in enumerate(results) if result is None]
+        for i, result in zip(todo, super().get_ranges([pairs[i] for i in todo])):
+            results[i] = result
+
+        return results
+
+    def _range_from_statistics_if_plain(self, var, cut):
+        #for a plain column with no selection, the parquet footers already know the answer
+        if type(var) is BasicVariable and isinstance(cut, NoCut):
+            column = var.columns[0]
+            if not self._is_loaded(column):
+                return self._range_from_statistics(column)
+        return None
+
+    def _range_from_statistics(self, column):
+        '''
+        (min, positive min, max, dtype) of a column from the row group statistics
+        Only the row groups containing both positive and non-positive values need to be read 
+        (to find the positive minimum). Returns None if the statistics are not usable
+        '''
+        if column not in self.schema.names:
+            return None
+
+        atype = self.schema.field(column).type
+        if not (pa.types.is_integer(atype) or pa.types.is_floating(atype) or pa.types.is_boolean(atype)):
+            return None
+        dtype = np.dtype(atype.to_pandas_dtype())
+
+        minvals = []
+        minvals2 = []
+        maxvals = []
+        for fragment in self._dataset.get_fragments():
+            fragment.ensure_complete_metadata()
+
+            straddling = []
+            for rg in fragment.row_groups:
+                if rg.num_rows == 0:
+                    continue
+
+                stats = rg.statistics
+                if stats is None or column not in stats:
+                    return None
+                rgmin, rgmax = stats[column]['min'], stats[column]['max']
+                if rgmin is None or rgmax is None:
+                    return None
+
+                minvals.append(rgmin)
+                maxvals.append(rgmax)
+                if rgmin > 0:
+                    minvals2.append(rgmin)
+                elif rgmax > 0:
+                    straddling.append(rg.id)
+
+            if len(straddling) > 0:
+                positive = fragment.subset(row_group_ids=straddling).to_table(
+                    columns=[column], 
+                    filter=pc.field(column) > 0
+                )[column]
+                if len(positive) > 0:
+                    minvals2.append(pc.min(positive).as_py())
+
+        if len(minvals) == 0:
+            return None
+
+        def as_scalar(x):
+            return np.asarray(x, dtype=dtype)[()]
+
+        return (as_scalar(min(minvals)),
+                as_scalar(min(minvals2)) if len(minvals2) > 0 else np.nan,
+                as_scalar(max(maxvals)),
+                dtype)
+
+    @property
+    def loaded_columns(self):
+        return get_column_cache().columns(self.column_cache_token) | frozenset(self._pinned)
     
     def get_column(self, column_name, collection_name=None):
         if collection_name is not None:
             raise NotImplementedError("ParquetDataset does not support collection_name argument")
-        
-        if not hasattr(self, '_table'):
-            raise RuntimeError("ParquetDataset.ensure_columns must be called before get_column")
-        
-        if column_name not in self._table.column_names:
-            raise RuntimeError("Column %s not loaded! Call ensure_columns() first"%column_name)
 
-        return self._table[column_name].to_numpy()
+        return self._column(column_name)
     
     @property
     def num_rows(self):
-        if hasattr(self, '_table'):
-            return self._table.num_rows
+        if isinstance(self._dataset, ds.FileSystemDataset):
+            #from the file metadata cache, so that normalizing does not open every file each time
+            return sum(entry['num_rows'] for entry in self._file_metadata())
         else:
             return self._dataset.count_rows()
+
+    def sum_of_weights(self, column : str) -> float:
+        '''
+        Sum of a weight column (eg genWeight) over all the events of the dataset,
+        for normalizing by the sum of generator weights instead of the number of events:
+            dataset.override_num_events(dataset.sum_of_weights('genWeight'))
+        For skims made with weight_column = column this is the sum over the original dataset (see skim()),
+        for any other column it is the sum over the rows of the skim.
+        The per-file sums are kept in the file metadata cache
+        '''
+        if self._sum_weights is not None and column == self._sum_weights_column:
+            return self._sum_weights
+        return sum(entry['sum_weights'][column] for entry in self._file_metadata([column]))
+
+    def _file_metadata(self, weight_columns=()):
+        return get_file_metadata_cache().get(self._dataset.filesystem, self._dataset.files, weight_columns)
     
+    @property
+    def cache_identity(self):
+        infos = self._dataset.filesystem.get_file_info(self._dataset.files)
+        return (type(self._dataset.filesystem).__name__,
+                tuple((info.path, info.size, info.mtime_ns) for info in infos))
+
+    def skim(self, path : str, cut, columns,
+             weight_column : str | None = None,
+             row_group_size : int | None = None,
+             compression : str = 'zstd',
+             key : str | None = None,
+             label : str | None = None,
+             batch_size : int | None = None) -> "ParquetDataset":
+        '''
+        Evaluate the cut once and write the passing rows of the listed columns
+        to a new parquet file at path, and return it as a ParquetDataset.
+        The dataset is always streamed, batch_size rows at a time (by default the batch size
+        of this dataset, or skim.batch_size from the config), so skims of datasets 
+        larger than memory are fine. row_group_size defaults to that of pyarrow.
+
+        The original number of events (and, if weight_column is given, the sum of
+        weight_column over all the original events) are stored in the file metadata,
+        so that compute_weight() on the skim gives the same normalization as on the original.
+        Skims of skims keep the numbers of the very first dataset (the sum of weights only if
+        weight_column is None or the same column).
+        The xsec or lumi of this dataset is copied over
+        '''
+        columns = list(dict.fromkeys(columns))
+        missing = [col for col in columns if col not in self.schema.names]
+        if len(missing) > 0:
+            raise ValueError("ParquetDataset.skim: columns %s not in dataset!"%missing)
+
+        metadata = dict(self.schema.metadata or {})
+        #the pandas metadata describes columns which may not be written
+        metadata.pop(b'pandas', None)
+        metadata[SKIM_NUM_EVENTS_KEY] = str(self.num_events).encode()
+        sum_weights, sum_weights_column = self._sum_weights, self._sum_weights_column
+        if weight_column is not None and weight_column != sum_weights_column:
+            sum_weights, sum_weights_column = self.sum_of_weights(weight_column), weight_column
+        if sum_weights is not None:
+            metadata[SKIM_SUM_WEIGHTS_KEY] = repr(float(sum_weights)).encode()
+            metadata[SKIM_WEIGHT_COLUMN_KEY] = sum_weights_column.encode()
+        else:
+            metadata.pop(SKIM_SUM_WEIGHTS_KEY, None)
+            metadata.pop(SKIM_WEIGHT_COLUMN_KEY, None)
+        schema = pa.schema([self.schema.field(col) for col in columns], metadata=metadata)
+
+        if batch_size is None:
+            batch_size = self._batch_size if self._batch_size is not None else config['skim']['batch_size']
+        if row_group_size is None:
+            row_group_size = SKIM_DEFAULT_ROW_GROUP_SIZE
+
+        #write to a temporary file first, so that an interrupted skim never looks complete
+        tmppath = path + '.tmp'
+        buffered = []
+        nbuffered = 0
+        try:
+            with pq.ParquetWriter(tmppath, schema, compression=compression) as writer:
+                #read directly rather than through iter_chunks(), so that nothing is kept in memory afterwards
+                needed_columns = list(dict.fromkeys(columns + cut.columns))
+                arrow_filter = cut_to_arrow_filter(cut, self.schema)
+                for batch in self._dataset.to_batches(columns=needed_columns, filter=arrow_filter, batch_size=batch_size):
+                    chunk = ArrowTableView(pa.Table.from_batches([batch]))
+                    table = chunk.table.select(columns)
+                    mask = evaluate_cut(cut, chunk)
+                    if not isinstance(mask, slice):
+                        table = table.filter(pa.array(np.asarray(mask)))
+                    elif mask != slice(None):
+                        raise RuntimeError("ParquetDataset.skim: cut evaluated to unsupported slice %s"%mask)
+
+                    #collect the batches into full row groups
+                    buffered.append(table)
+                    nbuffered += table.num_rows
+                    if nbuffered >= row_group_size:
+                        table = pa.concat_tables(buffered)
+                        nfull = (nbuffered // row_group_size) * row_group_size
+                        writer.write_table(table.slice(0, nfull), row_group_size=row_group_size)
+                        buffered = [table.slice(nfull)]
+                        nbuffered -= nfull
+
+                if nbuffered > 0:
+                    writer.write_table(pa.concat_tables(buffered), row_group_size=row_group_size)
+            os.replace(tmppath, path)
+        except BaseException:
+            #a failed skim (eg a cut that cannot be evaluated) leaves nothing behind
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+            raise
+
+        result = ParquetDataset(
+            self._key if key is None else key,
+            self._color,
+            self._label if label is None else label,
+            path,
+            batch_size=self._batch_size
+        )
+        if hasattr(self, '_isMC'):
+            if self._isMC:
+                result.set_xsec(self._xsec)
+            else:
+                result.set_lumi(self._lumi)
+        return result
+
     #extra properties for parquetdatasets for utility
+    @property
+    def sum_weights(self):
+        '''
+        Sum of weights of the original events, for skims made with a weight_column (otherwise None)
+        '''
+        return self._sum_weights
+
     @property
     def files(self):
         return self._dataset.files
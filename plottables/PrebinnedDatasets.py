@@ -5,6 +5,9 @@ from simonpy.AbitraryBinning import ArbitraryBinning
 import numpy as np
 from typing import Sequence, Tuple
 
+import hashlib
+import pickle
+
 class PrebinnedDatasetBase(SingleDatasetBase):
     _data : np.ndarray | Tuple[np.ndarray, np.ndarray]
     _binning : ArbitraryBinning
@@ -17,6 +20,21 @@ class PrebinnedDatasetBase(SingleDatasetBase):
     def binning(self):
         return self._binning
 
+    @property
+    def cache_identity(self):
+        #the data lives in memory, so identify it by its contents
+        digest = hashlib.sha256()
+        arrays = self._data if isinstance(self._data, tuple) else (self._data,)
+        for arr in arrays:
+            arr = np.ascontiguousarray(arr)
+            digest.update(repr((arr.dtype.str, arr.shape)).encode())
+            digest.update(arr.tobytes())
+        try:
+            digest.update(pickle.dumps(self._binning))
+        except Exception:
+            return None
+        return (self.quantitytype, digest.hexdigest())
+
 class ValCovPairDataset(PrebinnedDatasetBase):
     def __init__(self, 
                  key : str, 
@@ -0,0 +1,57 @@
+'''
+Benchmark of multi-threaded histogram filling (the histogram_fill.threads config option)
+
+Fills Regular, Variable, and IntCategory axes with 10^7 to 10^9 weighted entries,
+for a range of thread counts, and prints the time and speedup over a single thread.
+The entries are filled in blocks, so the memory use does not depend on the number of entries.
+
+usage: python bench_fill_threads.py [--entries 1e7 1e8 1e9] [--threads 1 2 4 8 0] [--block 1e7]
+'''
+import argparse
+import os
+import time
+
+import numpy as np
+import hist
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--entries', type=float, nargs='+', default=[1e7, 1e8, 1e9])
+parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 0])
+parser.add_argument('--block', type=float, default=1e7)
+args = parser.parse_args()
+
+axes = {
+    'Regular' : lambda: hist.axis.Regular(100, 0, 500),
+    'Variable' : lambda: hist.axis.Variable(np.geomspace(1, 500, 101)),
+    'IntCategory' : lambda: hist.axis.IntCategory(list(range(10))),
+}
+
+block = int(args.block)
+rng = np.random.default_rng(12345)
+values = {
+    'Regular' : rng.pareto(a=3.0, size=block) * 50,
+    'Variable' : rng.pareto(a=3.0, size=block) * 50,
+    'IntCategory' : rng.integers(0, 10, size=block),
+}
+weights = rng.normal(1.0, 0.1, size=block)
+
+print("%d cores"%os.cpu_count())
+print("%-12s %12s %8s %10s %8s"%("axis", "entries", "threads", "time [s]", "speedup"))
+for name, make_axis in axes.items():
+    for entries in args.entries:
+        nblocks = max(int(entries) // block, 1)
+
+        reference = None
+        for threads in args.threads:
+            H = hist.Hist(make_axis(), storage=hist.storage.Weight())
+
+            start = time.perf_counter()
+            for _ in range(nblocks):
+                H.fill(values[name], weight=weights, threads=None if threads == 1 else threads)
+            elapsed = time.perf_counter() - start
+
+            if reference is None:
+                reference = elapsed
+            print("%-12s %12.0e %8s %10.2f %8.2f"%(
+                name, nblocks*block, 'all' if threads == 0 else threads, elapsed, reference/elapsed
+            ))
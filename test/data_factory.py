@@ -1,10 +1,26 @@
 from typing import Tuple
+import os
+import atexit
+import shutil
+import tempfile
 import hist
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import uproot
+import awkward as ak
 
 from simonplot.plottables import ValCovPairDataset, CovmatDataset
 from simonpy.AbitraryBinning import ArbitraryBinning
 
+def scratch_dir() -> str:
+    '''
+    New temporary directory, removed together with its contents when the test exits
+    '''
+    path = tempfile.mkdtemp(prefix='simonplot_test_')
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
 def synthetic_data(Nevt, key) -> Tuple[np.ndarray, np.ndarray, ArbitraryBinning]:
     H = hist.Hist(
         hist.axis.Regular(7, 30, 500, name='pt', transform=hist.axis.transform.log),
@@ -54,4 +70,72 @@ def synthetic_covdataset(Nevt, key) -> Tuple[CovmatDataset, np.ndarray]:
 
     dset = CovmatDataset(key, None, key, cov, binning)
 
-    return dset, unflat_cov
\ No newline at end of file
+    return dset, unflat_cov
+
+def synthetic_parquet(Nevt, path, nfiles=4):
+    os.makedirs(path, exist_ok=True)
+
+    rng = np.random.default_rng(12345)
+    pt = rng.pareto(a=3.0, size=Nevt) * 50
+    eta = rng.uniform(-2.5, 2.5, size=Nevt)
+    nJet = rng.integers(0, 6, size=Nevt)
+    genWeight = rng.normal(1.0, 0.1, size=Nevt)
+
+    table = pa.table({
+        'pt' : pt,
+        'eta' : eta,
+        'nJet' : nJet,
+        'genWeight' : genWeight,
+    })
+
+    step = int(np.ceil(Nevt / nfiles))
+    for i in range(nfiles):
+        pq.write_table(
+            table.slice(i*step, step), 
+            os.path.join(path, 'part%d.parquet'%i),
+            row_group_size = max(step//4, 1)
+        )
+
+    return table
+
+def synthetic_nanoaod(Nevt, fname, nbaskets=4, seed=12345):
+    '''
+    Minimal NANOAOD-like ROOT file: the event id branches (run, luminosityBlock, event), 
+    a flat branch, and a jagged Jet collection (nJet, Jet_pt, Jet_eta, Jet_phi, Jet_mass), 
+    written as a TTree in nbaskets baskets
+    '''
+    rng = np.random.default_rng(seed)
+    nJet = rng.integers(0, 6, size=Nevt)
+    pt = rng.pareto(a=3.0, size=np.sum(nJet)) * 50
+    eta = rng.uniform(-2.5, 2.5, size=np.sum(nJet))
+    phi = rng.uniform(-np.pi, np.pi, size=np.sum(nJet))
+    mass = rng.uniform(0, 20, size=np.sum(nJet))
+    genWeight = rng.normal(1.0, 0.1, size=Nevt)
+
+    step = int(np.ceil(Nevt / nbaskets))
+    with uproot.recreate(fname) as f:
+        #an explicit TTree: recent uproot writes an RNTuple for f['Events'] = {...}
+        tree = f.mktree('Events', {
+            'run' : np.uint32,
+            'luminosityBlock' : np.uint32,
+            'event' : np.uint64,
+            'genWeight' : np.float32,
+            'Jet' : 'var * {pt: float32, eta: float32, phi: float32, mass: float32}',
+        })
+        for i in range(nbaskets):
+            start, stop = i*step, min((i+1)*step, Nevt)
+            jetstart, jetstop = np.sum(nJet[:start]), np.sum(nJet[:stop])
+            tree.extend({
+                'run' : np.ones(stop - start, dtype=np.uint32),
+                'luminosityBlock' : np.full(stop - start, i + 1, dtype=np.uint32),
+                'event' : np.arange(start, stop, dtype=np.uint64),
+                'genWeight' : genWeight[start:stop].astype(np.float32),
+                'Jet' : ak.zip({
+                    'pt' : ak.unflatten(pt[jetstart:jetstop].astype(np.float32), nJet[start:stop]),
+                    'eta' : ak.unflatten(eta[jetstart:jetstop].astype(np.float32), nJet[start:stop]),
+                    'phi' : ak.unflatten(phi[jetstart:jetstop].astype(np.float32), nJet[start:stop]),
+                    'mass' : ak.unflatten(mass[jetstart:jetstop].astype(np.float32), nJet[start:stop]),
+                }),
+            })
+
+    return fname + ':Events'
@@ -0,0 +1,74 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+from simonplot.util.arrow_cache import enable_arrow_cache, disable_arrow_cache
+
+tmpdir = scratch_dir()
+table = synthetic_parquet(100000, tmpdir)
+cache = enable_arrow_cache(scratch_dir())
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(BasicVariable('eta'), 0.0)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+def make_dataset(arrow_cache=None):
+    dset = ParquetDataset('dset', None, 'dset', tmpdir, arrow_cache=arrow_cache)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Checking materialization and memory-mapped reads...")
+first = make_dataset()
+first.ensure_columns(['pt', 'eta', 'genWeight'])
+assert cache.misses == 3 and len(cache) == 3, "Columns not materialized!"
+
+second = make_dataset()
+second.ensure_columns(['pt', 'eta'])
+assert cache.hits == 2, "Materialized columns not used!"
+for col in ['pt', 'eta']:
+    assert np.array_equal(second.get_column(col), table[col].to_numpy()), "Column %s mismatch!"%col
+
+H = second.fill_hist(pt, cut, weight, axis)
+target = make_dataset(arrow_cache=False).fill_hist(pt, cut, weight, axis)
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+print("\tDone.")
+
+print("Checking invalidation...")
+fname = first.files[0]
+pq.write_table(pq.read_table(fname).slice(0, 10), fname)
+misses = cache.misses
+third = make_dataset()
+third.ensure_columns(['pt'])
+assert cache.misses == misses + 1, "Stale column used!"
+assert len(third.get_column('pt')) == 100000 - 25000 + 10, "Wrong column length!"
+print("\tDone.")
+
+print("Checking opting out...")
+len_before = len(cache)
+make_dataset(arrow_cache=False).ensure_columns(['nJet'])
+assert len(cache) == len_before, "Column materialized despite arrow_cache=False!"
+print("\tDone.")
+
+print("Checking fills with a cut on fresh datasets...")
+cache = enable_arrow_cache(scratch_dir())
+#filled with the cut pushed down into the parquet reader
+target = make_dataset(arrow_cache=False).fill_hist(pt, cut, weight, axis)
+H = make_dataset().fill_hist(pt, cut, weight, axis)
+assert cache.misses == 3 and len(cache) == 3, "Columns not materialized by a fill with a cut!"
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+
+H = make_dataset().fill_hist(pt, cut, weight, axis)
+assert cache.hits == 3 and cache.misses == 3, "Materialized columns not used by a fill with a cut!"
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+print("\tDone.")
+
+disable_arrow_cache()
+print("All tests passed!")
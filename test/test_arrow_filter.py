@@ -0,0 +1,54 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, ConstantVariable, Magnitude2dVariable
+from simonplot.cut import NoCut, EqualsCut, GreaterThanCut, LessThanCut, TwoSidedCut, AndCuts, OrCuts, NotCut, cut_to_arrow_filter
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+table = synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+eta = BasicVariable('eta')
+nJet = BasicVariable('nJet')
+r = Magnitude2dVariable(pt, eta)
+
+print("Checking translation of cut trees...")
+assert cut_to_arrow_filter(NoCut()) is None, "NoCut should not translate!"
+assert cut_to_arrow_filter(GreaterThanCut(r, 1.0)) is None, "Composite variables should not translate!"
+assert cut_to_arrow_filter(NotCut(AndCuts([GreaterThanCut(pt, 1.0), GreaterThanCut(r, 1.0)]))) is None, "NOT of partial translation should not translate!"
+assert cut_to_arrow_filter(OrCuts([GreaterThanCut(pt, 1.0), GreaterThanCut(r, 1.0)])) is None, "OR of partial translation should not translate!"
+assert cut_to_arrow_filter(AndCuts([GreaterThanCut(pt, 1.0), GreaterThanCut(r, 1.0)])) is not None, "AND should translate partially!"
+print("\tDone.")
+
+cuts = [
+    GreaterThanCut(pt, 20),
+    LessThanCut(eta, 0.5),
+    EqualsCut(nJet, 2),
+    AndCuts([GreaterThanCut(pt, 20), TwoSidedCut(eta, -1.0, 1.0)]),
+    AndCuts([GreaterThanCut(pt, 20), GreaterThanCut(r, 30)]),
+    OrCuts([GreaterThanCut(pt, 100), EqualsCut(nJet, 0)]),
+    NotCut(OrCuts([GreaterThanCut(pt, 100), EqualsCut(nJet, 0)])),
+]
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+weight = ConstantVariable(1.0)
+
+print("Checking pushed-down fills against numpy selections...")
+for batch_size in [None, 9000]:
+    dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size)
+    dset.set_lumi(1.0)
+    dset.compute_weight(1.0)
+    for cut in cuts:
+        H = dset.fill_hist(pt, cut, weight, axis)
+
+        dset_ref = ParquetDataset('ref', None, 'ref', tmpdir)
+        dset_ref.ensure_columns(['pt', 'eta', 'nJet'])
+        mask = cut.evaluate(dset_ref)
+        target = np.histogram(table['pt'].to_numpy()[mask], bins=axis.edges)[0]
+
+        assert np.allclose(H.values(), target), "Content mismatch for cut %s!"%cut.key
+        assert dset.num_events == table.num_rows, "Filtered read changed the event count!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,82 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+import hist
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable, ConstantVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import AutoIntCategoryBinning
+from simonplot.plottables.DatasetBase import count_categories, merge_categories, scale_H
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+njet = BasicVariable('nJet')
+cut = GreaterThanCut(BasicVariable('pt'), 20)
+
+def make_dataset(name='dset', batch_size=None):
+    dset = ParquetDataset(name, None, name, tmpdir, batch_size=batch_size)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Checking category counting...")
+values = np.array([5, 3, 3, 1000000, 5, 5])
+weights = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+for part in [count_categories(values, weights), merge_categories([count_categories(values[:3], weights[:3]), count_categories(values[3:], weights[3:])])]:
+    assert np.array_equal(part[0], [3, 5, 1000000]), "Wrong categories!"
+    assert np.allclose(part[1], [5.0, 12.0, 4.0]), "Wrong sums of weights!"
+    assert np.allclose(part[2], [13.0, 62.0, 16.0]), "Wrong sums of squared weights!"
+
+#sparse IDs spanning most of the int64 range
+ids = np.array([np.iinfo(np.int64).min + 1, 7, np.iinfo(np.int64).max, 7])
+part = count_categories(ids, None)
+assert np.array_equal(part[0], np.unique(ids)), "Wrong categories of sparse values!"
+assert np.array_equal(part[1], [1.0, 2.0, 1.0]), "Wrong counts of sparse values!"
+
+#non-finite values are dropped, together with their weights
+part = count_categories(np.array([1.0, np.nan, 2.0, np.inf, 1.0]), np.array([1.0, 10.0, 2.0, 20.0, 3.0]))
+assert np.array_equal(part[0], [1, 2]) and np.allclose(part[1], [4.0, 2.0]), "Non-finite values not dropped!"
+try:
+    count_categories(np.array([1.0, 1.5]), None)
+except ValueError:
+    pass
+else:
+    raise AssertionError("Non-integer values counted!")
+print("\tDone.")
+
+print("Checking single-pass auto category axes...")
+for weight in [BasicVariable('genWeight'), ConstantVariable(2.0)]:
+    for batch_size in [None, 30000]:
+        dset = make_dataset(batch_size=batch_size)
+        axis = AutoIntCategoryBinning().build_auto_axis([njet], [cut], [dset], weights=[weight])
+        assert list(axis) == sorted(axis), "Categories not sorted!"
+        assert dset._lookup_categories(njet, cut, weight, axis) is not None, "Counts not kept!"
+
+        H = dset.fill_hist(njet, cut, weight, axis)
+        target = make_dataset().fill_hist(njet, cut, weight, axis)
+        assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+        assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!" # pyright: ignore[reportArgumentType]
+        assert dset._lookup_categories(njet, cut, weight, axis) is None, "Counts not dropped after use!"
+print("\tDone.")
+
+print("Checking that categories are aligned across datasets...")
+weight = BasicVariable('genWeight')
+low = GreaterThanCut(BasicVariable('pt'), 20)
+stack = DatasetStack('stack', None, 'stack', [make_dataset('a'), make_dataset('b')])
+dset = make_dataset('c')
+axis = AutoIntCategoryBinning().build_auto_axis([njet, njet], [low, low], [stack, dset], weights=[weight, weight])
+#values missing from the axis end up in the overflow bin
+#the prefilled counts are unweighted, so scale them like fill_hist() does
+partial = hist.axis.IntCategory([3, 1])
+H = scale_H(dset._lookup_categories(njet, low, weight, partial), dset._weight)
+
+H_stack = stack.fill_hist(njet, low, weight, axis)
+H_dset = dset.fill_hist(njet, low, weight, axis)
+assert np.allclose(H_stack.values(flow=True), 2*H_dset.values(flow=True)), "Stack mismatch!"
+
+assert np.isclose(np.sum(H.values(flow=True)), np.sum(H_dset.values(flow=True))), "Entries lost!"
+assert np.isclose(H.values()[1], H_dset.values()[list(axis).index(1)]), "Categories misaligned!"
+print("\tDone.")
+
+print("All tests passed!")
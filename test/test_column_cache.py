@@ -0,0 +1,109 @@
+from data_factory import synthetic_parquet, scratch_dir
+import gc
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, ProductVariable
+from simonplot.cut import NoCut
+from simonplot.binning import BasicBinning
+from simonplot.util.column_cache import configure_column_cache, get_column_cache
+
+tmpdir = scratch_dir()
+table = synthetic_parquet(100000, tmpdir)
+colbytes = table['pt'].nbytes
+
+print("Checking LRU eviction across datasets...")
+cache = configure_column_cache(max_bytes=int(2.5*colbytes), spill=False)
+a = ParquetDataset('a', None, 'a', tmpdir)
+b = ParquetDataset('b', None, 'b', tmpdir)
+a.ensure_columns(['pt', 'eta'])
+a.get_column('pt')
+b.ensure_columns(['pt'])
+assert cache.evictions == 1, "Nothing evicted!"
+assert a.loaded_columns == {'pt', 'eta'}, "Columns of the pass not held!"
+a.release_columns()
+b.release_columns()
+assert a.loaded_columns == {'pt'}, "Not the least recently used column evicted!"
+assert cache.nbytes <= cache.max_bytes, "Budget exceeded!"
+
+#evicted columns are read again transparently
+assert np.array_equal(a.get_column('eta'), table['eta'].to_numpy()), "Evicted column mismatch!"
+assert cache.misses > 0 and cache.hits > 0, "Counters not updated!"
+print("\tDone.")
+
+print("Checking that columns are dropped with their dataset...")
+del a
+gc.collect()
+assert all(owner == b.column_cache_token for owner, _ in cache._entries), "Columns of deleted dataset kept!"
+print("\tDone.")
+
+print("Checking spilling to memory-mapped files...")
+cache = configure_column_cache(max_bytes=int(1.5*colbytes), spill=True, spill_directory=scratch_dir())
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.ensure_columns(['pt', 'eta', 'genWeight'])
+assert cache.spills == 2, "Columns not spilled!"
+assert dset.loaded_columns == {'pt', 'eta', 'genWeight'}, "Spilled columns not available!"
+dset.release_columns()
+misses = cache.misses
+for col in ['pt', 'eta', 'genWeight']:
+    assert np.array_equal(dset.get_column(col), table[col].to_numpy()), "Column %s mismatch!"%col
+assert cache.misses == misses, "Spilled columns read again!"
+print("\tDone.")
+
+print("Checking columns larger than the cache...")
+cache = configure_column_cache(max_bytes=colbytes//2, spill=False)
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.set_xsec(1.0)
+dset.compute_weight(1.0)
+reads = []
+load_columns = dset._load_columns
+def counted(columns):
+    reads.extend(columns)
+    return load_columns(columns)
+dset._load_columns = counted
+
+pt = BasicVariable('pt')
+#pt is evaluated three times in one fill
+dset.fill_hist(ProductVariable(pt, pt), NoCut(), pt, BasicBinning(20, 0, 200).build_axis(pt))
+assert reads == ['pt'], "Oversized column read more than once in one pass! %s"%reads
+assert len(cache) == 0, "Oversized column cached!"
+assert len(dset.loaded_columns) == 0, "Oversized column held after the pass!"
+print("\tDone.")
+
+print("Checking passes which need more than the whole cache...")
+eta = BasicVariable('eta')
+weight = BasicVariable('genWeight')
+variable = ProductVariable(pt, eta)
+axis = BasicBinning(20, -200, 200).build_axis(pt)
+
+def make_dataset():
+    dset = ParquetDataset('dset', None, 'dset', tmpdir)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+configure_column_cache()
+target = make_dataset().fill_hist(variable, NoCut(), weight, axis)
+
+cache = configure_column_cache(max_bytes=int(2.5*colbytes), spill=False)
+dset = make_dataset()
+reads = []
+load_columns = dset._load_columns
+dset._load_columns = counted
+
+#each column fits, but the three of them do not
+H = dset.fill_hist(variable, NoCut(), weight, axis)
+assert sorted(reads) == ['eta', 'genWeight', 'pt'], "Columns read more than once in one pass! %s"%reads
+assert np.allclose(H.values(flow=True), target.values(flow=True), rtol=1e-12, atol=0), "Values mismatch!"
+assert cache.nbytes <= cache.max_bytes, "Budget exceeded!"
+assert len(dset._pinned) == 0, "Columns held after the pass!"
+
+#direct use of the columns holds them until they are released
+dset.ensure_columns(['pt', 'eta', 'genWeight'])
+assert dset.loaded_columns == {'pt', 'eta', 'genWeight'}, "Columns not held!"
+dset.release_columns()
+assert dset.loaded_columns == get_column_cache().columns(dset.column_cache_token), "Columns held after release!"
+print("\tDone.")
+
+configure_column_cache()
+print("All tests passed!")
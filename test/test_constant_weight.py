@@ -0,0 +1,42 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+import hist
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, ConstantVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+cut = GreaterThanCut(pt, 20)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+def make_dataset(batch_size=None):
+    dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Checking fills with constant weights...")
+for batch_size in [None, 30000]:
+    dset = make_dataset(batch_size)
+    H = dset.fill_hist(pt, cut, ConstantVariable(0.5), axis)
+    assert H.storage_type is hist.storage.Weight, "Constant-weight fill not converted to weighted storage!"
+
+    dset.ensure_columns(['pt'])
+    values = dset.get_column('pt')
+    counts = np.histogram(values[values > 20], bins=axis.edges)[0]
+    w = 0.5 * dset._weight
+    assert np.allclose(H.values(), counts * w), "Values mismatch!"
+    assert np.allclose(H.variances(), counts * w * w), "Variances mismatch!" # pyright: ignore[reportOptionalOperand]
+
+    Hs = dset.fill_hists([(pt, ConstantVariable(0.5), axis), (pt, BasicVariable('genWeight'), axis)], cut)
+    assert np.allclose(Hs[0].values(flow=True), H.values(flow=True)), "fill_hists() mismatch!"
+    assert np.allclose(Hs[0].variances(flow=True), H.variances(flow=True)), "fill_hists() variances mismatch!" # pyright: ignore[reportArgumentType]
+    assert np.allclose(Hs[1].values(flow=True), dset.fill_hist(pt, cut, BasicVariable('genWeight'), axis).values(flow=True)), "Weighted spec mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,52 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, RatioVariable, DifferenceVariable, RelativeResolutionVariable, Magnitude3dVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.util.evaluation_context import EvaluationContext, evaluate_variable
+
+tmpdir = scratch_dir()
+synthetic_parquet(10000, tmpdir)
+
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.ensure_columns(['pt', 'eta', 'genWeight'])
+
+#two separate (but equal) instances of each leaf
+def tree():
+    return RatioVariable(
+        DifferenceVariable(BasicVariable('pt'), BasicVariable('eta')),
+        Magnitude3dVariable(BasicVariable('pt'), BasicVariable('eta'), BasicVariable('genWeight'))
+    )
+var = tree()
+cut = GreaterThanCut(BasicVariable('pt'), 20)
+
+print("Checking deduplication of equal sub-variables...")
+with EvaluationContext(dset) as context:
+    result = evaluate_variable(var, dset, cut)
+    #repeated evaluation of an equal tree is a single hit
+    again = evaluate_variable(tree(), dset, cut)
+assert again is result, "Equal tree was evaluated again!"
+assert getattr(dset, 'eval_context', None) is None, "Context not removed on exit!"
+
+#pt and eta appear twice but should each be evaluated once, plus the repeated tree
+assert context.hits == 3, "Shared sub-variables were not deduplicated!"
+pt, eta, w = dset.get_column('pt'), dset.get_column('eta'), dset.get_column('genWeight')
+mask = pt >= 20
+target = (eta - pt)[mask] / np.sqrt(pt**2 + eta**2 + w**2)[mask]
+assert np.allclose(result, target), "Content mismatch!"
+assert np.allclose(var.evaluate(dset, cut), target), "Content mismatch without context!"
+print("\tDone.")
+
+print("Checking that different collections are not deduplicated...")
+a = BasicVariable('x', collection_name='A')
+b = BasicVariable('x', collection_name='B')
+assert a == b, "BasicVariable __eq__ changed?"
+with EvaluationContext(dset) as context:
+    context._entries[(BasicVariable, a.key, context._cut_key(cut))] = (a, 'A')
+    assert context.evaluate(a, dset, cut) == 'A', "Cached value not reused!"
+    context._entries[(BasicVariable, b.key, context._cut_key(cut))] = (b, 'B')
+    assert context.evaluate(b, dset, cut) == 'B', "Different collections shared a value!"
+print("\tDone.")
+
+print("All tests passed!")
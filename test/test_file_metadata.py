@@ -0,0 +1,69 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from simonplot.plottables import ParquetDataset
+from simonplot.util.file_metadata import FileMetadataCache, get_file_metadata_cache, SIDECAR_NAME
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+print("Checking event counts and sums of weights...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+assert dset.num_rows == 100000, "Wrong number of rows!"
+dset2 = ParquetDataset('dset', None, 'dset', tmpdir)
+dset2.ensure_columns(['genWeight'])
+assert np.isclose(dset.sum_of_weights('genWeight'), np.sum(dset2.get_column('genWeight'))), "Wrong sum of weights!"
+assert os.path.exists(os.path.join(tmpdir, SIDECAR_NAME)), "No sidecar written!"
+print("\tDone.")
+
+print("Checking that the sidecar is used by later runs...")
+cache = FileMetadataCache()
+entries = cache.get(dset.filesystem, dset.files, ['genWeight'])
+assert cache.misses == 0 and cache.hits == len(dset.files), "Sidecar not used!"
+assert sum(entry['num_rows'] for entry in entries) == 100000, "Wrong number of rows from the sidecar!"
+
+#the sidecar must not be picked up as a parquet file
+assert ParquetDataset('dset', None, 'dset', tmpdir).num_rows == 100000, "Sidecar read as data!"
+print("\tDone.")
+
+print("Checking invalidation...")
+pq.write_table(pa.table({'pt' : np.ones(10), 'eta' : np.ones(10), 'nJet' : np.ones(10, dtype=np.int64), 'genWeight' : np.ones(10)}), dset.files[0])
+entries = cache.get(dset.filesystem, dset.files, ['genWeight'])
+assert cache.misses == 1, "Modified file not recomputed!"
+assert entries[0]['num_rows'] == 10 and entries[0]['sum_weights']['genWeight'] == 10.0, "Stale entry!"
+assert ParquetDataset('dset', None, 'dset', tmpdir).num_rows == 100000 - 25000 + 10, "Stale number of rows!"
+print("\tDone.")
+
+print("Checking normalization by the sum of weights...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.override_num_events(dset.sum_of_weights('genWeight'))
+dset.set_xsec(1.0)
+dset.compute_weight(1.0)
+assert np.isclose(dset._weight, 1000.0 / dset.sum_of_weights('genWeight')), "Wrong normalization!"
+assert get_file_metadata_cache().hits > 0, "Process-wide cache not used!"
+print("\tDone.")
+
+print("Checking concurrent use from several threads...")
+#the datasets of a stack query the cache from a thread pool
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir, nfiles=8)
+cache = FileMetadataCache()
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+columns = ['genWeight', 'pt', 'eta', 'nJet']
+with ThreadPoolExecutor(max_workers=8) as executor:
+    results = list(executor.map(lambda i: cache.get(dset.filesystem, dset.files, [columns[i % len(columns)]]), range(32)))
+assert all(sum(entry['num_rows'] for entry in entries) == 100000 for entries in results), "Wrong number of rows!"
+
+with open(os.path.join(tmpdir, SIDECAR_NAME)) as f:
+    sidecar = json.load(f)
+assert len(sidecar) == 8, "Entries missing from the sidecar!"
+assert all(sorted(entry['sum_weights']) == sorted(columns) for entry in sidecar.values()), "Sums of weights missing from the sidecar!"
+assert [fname for fname in os.listdir(tmpdir) if fname.endswith('.tmp')] == [], "Temporary sidecar left behind!"
+print("\tDone.")
+
+print("All tests passed!")
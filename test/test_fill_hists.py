@@ -0,0 +1,76 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable, ConstantVariable, RatioVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(BasicVariable('pt'), 20)
+variables = [BasicVariable('pt'), BasicVariable('eta'), RatioVariable(BasicVariable('pt'), BasicVariable('eta'))]
+axes = [BasicBinning(20, 0, 200).build_axis(variables[0]),
+        BasicBinning(20, -3, 3).build_axis(variables[1]),
+        BasicBinning(20, -100, 100).build_axis(variables[2])]
+specs = [(v, weight, a) for v, a in zip(variables, axes)]
+
+def make_dataset(name, batch_size=None):
+    dset = ParquetDataset(name, None, name, tmpdir, batch_size=batch_size)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Comparing single-pass fills against fill_hist()...")
+for batch_size in [None, 30000]:
+    dset = make_dataset('dset', batch_size)
+    Hs = dset.fill_hists(specs, cut)
+    for (v, w, a), H in zip(specs, Hs):
+        target = dset.fill_hist(v, cut, w, a)
+        assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+        assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!"
+print("\tDone.")
+
+print("Checking that the cut is only evaluated once...")
+dset = make_dataset('dset')
+dset.fill_hists(specs, cut)
+#the cut is pushed down into the scan, so the masks live on the filtered view
+assert dset._filtered.mask_cache.misses == 1, "Cut evaluated more than once!"
+print("\tDone.")
+
+print("Checking prefilled histograms on a stack...")
+stack = DatasetStack('stack', None, 'stack', [make_dataset('a'), make_dataset('b')])
+stack.prefill_hists(specs, cut)
+#the dataset weight is applied when the prefilled histograms are retrieved
+stack.compute_weight(2.0)
+reference = DatasetStack('reference', None, 'reference', [make_dataset('a'), make_dataset('b')])
+reference.compute_weight(2.0)
+for v, w, a in specs:
+    H = stack.fill_hist(v, cut, w, a)
+    target = reference.fill_hist(v, cut, w, a)
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+    assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!"
+
+#a different axis is not picked up
+H = stack.fill_hist(variables[0], cut, weight, BasicBinning(10, 0, 200).build_axis(variables[0]))
+assert H.axes[0].size == 10, "Prefilled histogram with wrong axis returned!"
+
+stack.clear_prefilled()
+for d in stack._datasets:
+    assert d._lookup_prefilled(*specs[0][:1], cut, *specs[0][1:]) is None, "Prefilled histograms not cleared!"
+print("\tDone.")
+
+print("Checking multi-threaded fills...")
+dset = make_dataset('dset')
+for v, w, a in specs:
+    H = dset.fill_hist(v, cut, w, a, threads=4)
+    target = dset.fill_hist(v, cut, w, a, threads=1)
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+    assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!"
+for H, target in zip(dset.fill_hists(specs, cut, threads=4), dset.fill_hists(specs, cut)):
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
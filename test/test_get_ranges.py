@@ -0,0 +1,82 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable, DifferenceVariable, ConstantVariable
+from simonplot.cut import GreaterThanCut, NoCut
+from simonplot.plottables.DatasetBase import range_stats
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+eta = BasicVariable('eta')
+shifted = DifferenceVariable(pt, ConstantVariable(10.0))
+cut = GreaterThanCut(pt, 20)
+
+print("Checking range statistics...")
+values = np.array([-3.0, np.nan, 2.0, 0.0, 0.5, 7.0])
+minval, minval2, maxval = range_stats(values)
+assert (minval, minval2, maxval) == (-3.0, 0.5, 7.0), "Wrong range statistics!"
+assert np.isnan(range_stats(np.array([-1.0, 0.0]))[1]), "Positive minimum of non-positive values!"
+assert range_stats(np.array([3, 1, 2]))[1] == 1, "Wrong positive minimum for positive values!"
+print("\tDone.")
+
+print("Comparing batched ranges against get_range()...")
+for batch_size in [None, 30000]:
+    for pairs in [[(pt, cut), (eta, cut), (shifted, cut)], [(pt, NoCut()), (eta, cut), (shifted, cut)]]:
+        dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size)
+        results = dset.get_ranges(pairs)
+        for (var, c), result in zip(pairs, results):
+            target = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size).get_range(var, c)
+            assert np.allclose(result[:3], target[:3], equal_nan=True), "Range mismatch!"
+            assert result[3] == target[3], "dtype mismatch!"
+print("\tDone.")
+
+print("Checking prefetched ranges...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+stack = DatasetStack('stack', None, 'stack', [dset, ParquetDataset('dset2', None, 'dset2', tmpdir)])
+pairs = [(pt, cut), (shifted, cut)]
+stack.prefetch_ranges(pairs)
+assert dset._lookup_prefetched('_prefetched_ranges', shifted, cut) is not None, "Ranges not kept!"
+for var, c in pairs:
+    #shifted has no positive values, so its positive minimum is NaN
+    assert np.allclose(stack.get_range(var, c)[:3], dset.get_range(var, c)[:3], equal_nan=True), "Stack range mismatch!"
+stack.clear_prefilled()
+assert dset._lookup_prefetched('_prefetched_ranges', shifted, cut) is None, "Prefetched ranges not cleared!"
+print("\tDone.")
+
+print("Checking batched and prefetched sketches and distinct values...")
+njet = BasicVariable('nJet')
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+stack = DatasetStack('stack', None, 'stack', [dset, ParquetDataset('dset2', None, 'dset2', tmpdir)])
+passes = []
+iter_chunks = dset.iter_chunks
+def counted(columns, c):
+    passes.append(c)
+    return iter_chunks(columns, c)
+dset.iter_chunks = counted
+
+pairs = [(pt, cut), (eta, cut), (shifted, cut)]
+stack.prefetch_sketches(pairs)
+nocut = NoCut()
+stack.prefetch_uniques([(njet, cut), (pt, nocut)])
+assert len(passes) == 2, "Not one pass per kind of prefetch! %d"%len(passes)
+for var, c in pairs:
+    sketch = stack.get_sketch(var, c)
+    target = ParquetDataset('dset', None, 'dset', tmpdir).get_sketch(var, c)
+    assert sketch.count == 2*target.count, "Sketch count mismatch!"
+    assert np.allclose(sketch.quantiles([0.1, 0.5, 0.9]), target.quantiles([0.1, 0.5, 0.9]), rtol=0.05), "Sketch quantiles mismatch!"
+assert np.array_equal(stack.get_unique(njet, cut), ParquetDataset('dset', None, 'dset', tmpdir).get_unique(njet, cut)), "Distinct values mismatch!"
+assert np.array_equal(stack.get_unique(pt, nocut), ParquetDataset('dset', None, 'dset', tmpdir).get_unique(pt, NoCut())), "Distinct values mismatch!"
+assert len(passes) == 2, "Prefetched results not used!"
+
+#with a weight the sketch also sums the weights on the fine grid, so it is not prefetched
+stack.get_sketch(pt, cut, BasicVariable('genWeight'))
+assert len(passes) == 3, "Prefetched sketch used with a weight!"
+stack.clear_prefilled()
+assert dset._lookup_prefetched('_prefetched_sketches', pt, cut) is None, "Prefetched sketches not cleared!"
+assert dset._lookup_prefetched('_prefetched_uniques', njet, cut) is None, "Prefetched distinct values not cleared!"
+print("\tDone.")
+
+print("All tests passed!")
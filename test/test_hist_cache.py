@@ -0,0 +1,89 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, RatioVariable, ConcatVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+from simonplot.util.hist_cache import enable_hist_cache, disable_hist_cache
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+cache = enable_hist_cache(scratch_dir())
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(pt, 20)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+def make_dataset():
+    dset = ParquetDataset('dset', None, 'dset', tmpdir)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Checking that a second run reads the histogram from disk...")
+H1 = make_dataset().fill_hist(pt, cut, weight, axis)
+assert cache.misses == 1 and cache.hits == 0, "Unexpected cache statistics!"
+assert len(cache) == 1, "Histogram not written to the cache!"
+
+dset = make_dataset()
+H2 = dset.fill_hist(pt, cut, weight, axis)
+assert cache.hits == 1, "Cached histogram not reused!"
+assert len(dset.loaded_columns) == 0, "Data read despite a cache hit!"
+assert np.allclose(H1.values(flow=True), H2.values(flow=True)), "Content mismatch!"
+assert np.allclose(H1.variances(flow=True), H2.variances(flow=True)), "Variance mismatch!" # pyright: ignore[reportArgumentType]
+print("\tDone.")
+
+print("Checking that relabeling the axis still hits the cache...")
+relabeled = BasicBinning(20, 0, 200).build_axis(pt)
+relabeled.label = 'something else'
+H3 = make_dataset().fill_hist(pt, cut, weight, relabeled)
+assert cache.hits == 2, "Relabeled axis missed the cache!"
+assert H3.axes[0].label == 'something else', "Stale axis label returned!"
+print("\tDone.")
+
+print("Checking that changes to the fill miss the cache...")
+dset = make_dataset()
+dset.compute_weight(2.0)
+H4 = dset.fill_hist(pt, cut, weight, axis)
+assert np.allclose(H4.values(flow=True), 2*H1.values(flow=True)), "Dataset weight ignored!"
+make_dataset().fill_hist(pt, GreaterThanCut(pt, 30), weight, axis)
+make_dataset().fill_hist(pt, cut, weight, BasicBinning(10, 0, 200).build_axis(pt))
+assert cache.hits == 2 and cache.misses == 4, "Stale histogram returned!"
+print("\tDone.")
+
+print("Checking that modified files miss the cache...")
+synthetic_parquet(1000, tmpdir)
+make_dataset().fill_hist(pt, cut, weight, axis)
+assert cache.hits == 2, "Histogram of modified files returned!"
+print("\tDone.")
+
+print("Checking that variables with the same key do not share entries...")
+gen = BasicVariable('genWeight')
+left = RatioVariable(RatioVariable(pt, gen), pt)
+right = RatioVariable(pt, RatioVariable(gen, pt))
+assert left.key == right.key
+Hleft = make_dataset().fill_hist(left, cut, weight, axis)
+Hright = make_dataset().fill_hist(right, cut, weight, axis)
+assert cache.hits == 2, "Histogram of a different expression tree returned!"
+assert not np.allclose(Hleft.values(flow=True), Hright.values(flow=True)), "Expression trees not distinguished!"
+Hleft2 = make_dataset().fill_hist(RatioVariable(RatioVariable(pt, gen), pt), cut, weight, axis)
+assert cache.hits == 3, "Equal expression tree missed the cache!"
+assert np.allclose(Hleft.values(flow=True), Hleft2.values(flow=True)), "Content mismatch!"
+print("\tDone.")
+
+print("Checking that variables opting out of key dedup are not cached...")
+before = len(cache)
+concat = ConcatVariable([pt], keyvar=pt)
+make_dataset().fill_hist(concat, cut, weight, axis)
+make_dataset().fill_hist(concat, cut, weight, axis)
+assert len(cache) == before and cache.hits == 3, "ConcatVariable cached!"
+print("\tDone.")
+
+cache.clear()
+assert len(cache) == 0, "Cache not cleared!"
+disable_hist_cache()
+
+print("All tests passed!")
@@ -0,0 +1,49 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, RatioVariable
+from simonplot.cut import GreaterThanCut, AndCuts
+from simonplot.binning import BasicBinning
+from simonplot.util.mask_cache import MaskCache
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+eta = BasicVariable('eta')
+var = RatioVariable(pt, eta)
+weight = BasicVariable('genWeight')
+cut = AndCuts([GreaterThanCut(pt, 20), GreaterThanCut(eta, 0.0)])
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+print("Checking that cut masks are reused within a fill...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.ensure_columns(['pt', 'eta', 'genWeight'])
+dset.set_lumi(1.0)
+dset.compute_weight(1.0)
+
+H = dset.fill_hist(var, cut, weight, axis)
+#two leaves of the variable and one for the weight, 
+#but the AndCuts and its two children are only evaluated once
+assert dset.mask_cache.misses == 3, "Cut evaluated more than once!"
+assert dset.mask_cache.hits == 2, "Cached mask not reused!"
+
+mask = cut.evaluate(dset)
+target = np.histogram((dset.get_column('pt')/dset.get_column('eta'))[mask], bins=axis.edges, weights=dset.get_column('genWeight')[mask])[0]
+assert np.allclose(H.values(), target), "Content mismatch!"
+print("\tDone.")
+
+print("Checking memory bound...")
+cache = MaskCache(max_bytes=250)
+cuts = [GreaterThanCut(pt, i) for i in range(3)]
+for c in cuts:
+    cache.put(c, np.ones(100, dtype=bool))
+assert len(cache) == 2, "Cache exceeded its memory bound!"
+assert cache.get(cuts[0]) is None, "Least recently used mask not evicted!"
+assert cache.get(cuts[2]) is not None, "Most recent mask evicted!"
+cache.put(cuts[0], np.ones(1000, dtype=bool))
+assert cache.get(cuts[0]) is None, "Mask larger than the bound was cached!"
+print("\tDone.")
+
+print("All tests passed!")
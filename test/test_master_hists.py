@@ -0,0 +1,85 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+import hist
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning, ExplicitBinning
+from simonplot.plottables.DatasetBase import rebin_H
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(BasicVariable('eta'), 0.0)
+master_axis = BasicBinning(1000, 0, 500).build_axis(pt)
+
+def make_dataset(name='dset'):
+    dset = ParquetDataset(name, None, name, tmpdir)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+requests = [
+    BasicBinning(20, 0, 200).build_axis(pt),
+    BasicBinning(50, 100, 300).build_axis(pt),
+    ExplicitBinning([10, 20, 50, 100, 250, 500]).build_axis(pt),
+]
+
+print("Checking rebinned master histograms against direct fills...")
+dset = make_dataset()
+dset.set_master_axis(pt, master_axis)
+reference = make_dataset()
+for axis in requests:
+    H = dset.fill_hist(pt, cut, weight, axis)
+    target = reference.fill_hist(pt, cut, weight, axis)
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+    assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!" # pyright: ignore[reportArgumentType]
+assert len(dset._master_hists) == 1, "Master histogram filled more than once!"
+print("\tDone.")
+
+print("Checking that misaligned axes are refilled...")
+misaligned = BasicBinning(30, 0.1, 200).build_axis(pt)
+assert rebin_H(dset._master_hists[next(iter(dset._master_hists))][2], misaligned) is None, "Misaligned axis rebinned!"
+H = dset.fill_hist(pt, cut, weight, misaligned)
+target = reference.fill_hist(pt, cut, weight, misaligned)
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+print("\tDone.")
+
+print("Checking that axes the master cannot serve do not fill it...")
+dset = make_dataset()
+dset.set_master_axis(pt, master_axis)
+passes = []
+fill_hists_unweighted = dset._fill_hists_unweighted
+def counted(specs, c, threads=None):
+    passes.append([axis for _, _, axis in specs])
+    return fill_hists_unweighted(specs, c, threads)
+dset._fill_hists_unweighted = counted
+
+#edges off the master edges, edges beyond the master range, and one edge off the master edges
+for axis in [misaligned, BasicBinning(20, 0, 1000).build_axis(pt), ExplicitBinning([0, 0.3, 200]).build_axis(pt)]:
+    H = dset.fill_hist(pt, cut, weight, axis)
+    target = reference.fill_hist(pt, cut, weight, axis)
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+assert len(passes) == 0, "Master histogram filled for an axis it cannot serve!"
+assert not hasattr(dset, '_master_hists'), "Master histogram kept for an axis it cannot serve!"
+
+njet = BasicVariable('nJet')
+dset.set_master_axis(njet, BasicBinning(100, -0.5, 99.5).build_axis(njet))
+dset.fill_hist(njet, cut, weight, hist.axis.IntCategory([0, 1, 2]))
+assert len(passes) == 0, "Master histogram filled for a category axis!"
+print("\tDone.")
+
+print("Checking master histograms on a stack...")
+stack = DatasetStack('stack', None, 'stack', [make_dataset('a'), make_dataset('b')])
+stack.set_master_axis(pt, master_axis)
+stack.compute_weight(2.0)
+H = stack.fill_hist(pt, cut, weight, requests[0])
+reference.compute_weight(2.0)
+target = reference.fill_hist(pt, cut, weight, requests[0])
+assert np.allclose(H.values(flow=True), 2*target.values(flow=True)), "Stack values mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
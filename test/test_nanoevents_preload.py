@@ -0,0 +1,46 @@
+from data_factory import synthetic_nanoaod, scratch_dir
+import os
+import numpy as np
+import awkward as ak
+
+from simonplot.plottables import NanoEventsDataset
+from simonplot.variable import BasicVariable, ConstantVariable
+from simonplot.cut import NoCut
+from simonplot.binning import BasicBinning
+
+fname = synthetic_nanoaod(10000, os.path.join(scratch_dir(), 'nano.root'))
+
+print("Checking lazy opening...")
+dset = NanoEventsDataset('dset', None, 'dset', fname)
+assert not hasattr(dset, '_events') and not hasattr(dset, '_trees'), "File opened at construction!"
+assert dset.num_rows == 10000, "Wrong number of rows!"
+assert not hasattr(dset, '_events'), "NanoEvents built just to count rows!"
+print("\tDone.")
+
+print("Checking bulk column reads against NanoEvents...")
+for threads in [1, 4]:
+    dset = NanoEventsDataset('dset', None, 'dset', fname, decompression_threads=threads)
+    dset.ensure_columns(['Jet.pt', 'Jet.eta', 'genWeight'])
+    assert dset.loaded_columns == {'Jet.pt', 'Jet.eta', 'genWeight'}, "Columns not read in bulk!"
+    assert not hasattr(dset, '_events'), "NanoEvents used for plain branches!"
+
+    reference = NanoEventsDataset('ref', None, 'ref', fname)
+    for column, collection in [('pt', 'Jet'), ('eta', 'Jet'), ('genWeight', None)]:
+        target = ak.materialize(reference.events[column] if collection is None else reference.events[collection][column])
+        assert ak.all(ak.flatten(dset.get_column(column, collection), axis=None) == ak.flatten(target, axis=None)), "Values mismatch!"
+        assert ak.all(ak.num(dset.get_column('pt', 'Jet')) == ak.num(reference.events['Jet']['pt'])), "Counts mismatch!"
+
+    assert dset.get_column('pt', 'Jet') is dset.get_column('pt', 'Jet'), "Column not cached!"
+print("\tDone.")
+
+print("Checking histograms...")
+genWeight = BasicVariable('genWeight')
+axis = BasicBinning(20, 0.5, 1.5).build_axis(genWeight)
+dset.set_lumi(1.0)
+dset.compute_weight(1.0)
+H = dset.fill_hist(genWeight, NoCut(), ConstantVariable(1.0), axis)
+target = np.histogram(ak.to_numpy(reference.events['genWeight']), bins=axis.edges)[0]
+assert np.allclose(H.values(), target), "Values mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,68 @@
+from data_factory import synthetic_nanoaod, scratch_dir
+import os
+import numpy as np
+import uproot
+
+from simonplot.plottables import NanoEventsDataset
+from simonplot.plottables.Datasets import entry_ranges
+from simonplot.variable import BasicVariable, ConstantVariable
+from simonplot.cut import NoCut, GreaterThanCut
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+fnames = [synthetic_nanoaod(10000, os.path.join(tmpdir, 'nano%d.root'%i), seed=i) for i in range(2)]
+
+print("Checking entry ranges...")
+ranges = entry_ranges([0, 100, 200, 300, 1000, 1050], 250)
+assert ranges[0][0] == 0 and ranges[-1][1] == 1050, "Entries lost!"
+assert all(a[1] == b[0] for a, b in zip(ranges[:-1], ranges[1:])), "Ranges not contiguous!"
+assert all(stop - start <= 250 for start, stop in ranges), "Range too long!"
+assert (200, 300) in ranges, "Basket boundaries not respected!"
+print("\tDone.")
+
+var = BasicVariable('genWeight')
+weights = [ConstantVariable(1.0), BasicVariable('genWeight')]
+cuts = [NoCut(), GreaterThanCut(BasicVariable('genWeight'), 1.0)]
+axis = BasicBinning(20, 0.5, 1.5).build_axis(var)
+
+def make_dataset(fname, step_size=None):
+    dset = NanoEventsDataset('dset', None, 'dset', fname, step_size=step_size)
+    dset.set_lumi(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Comparing streaming and in-memory fills...")
+for step_size in [1000, 3000]:
+    stream = make_dataset(fnames, step_size)
+    full = make_dataset(fnames)
+    singles = [make_dataset(fname) for fname in fnames]
+    assert stream.num_rows == 20000, "Wrong number of rows!"
+
+    for cut in cuts:
+        for weight in weights:
+            H_stream = stream.fill_hist(var, cut, weight, axis)
+            H_full = full.fill_hist(var, cut, weight, axis)
+            H_singles = singles[0].fill_hist(var, cut, weight, axis) + singles[1].fill_hist(var, cut, weight, axis)
+            assert np.allclose(H_stream.values(flow=True), H_full.values(flow=True)), "Values mismatch!"
+            assert np.allclose(H_stream.values(flow=True), H_singles.values(flow=True)), "Multiple files mismatch!"
+            assert np.allclose(H_stream.variances(flow=True), H_full.variances(flow=True)), "Variances mismatch!" # pyright: ignore[reportArgumentType]
+
+        range_stream = stream.get_range(BasicVariable('Jet.pt'), cut)
+        range_full = full.get_range(BasicVariable('Jet.pt'), cut)
+        assert np.allclose(range_stream[:3], range_full[:3]), "Range mismatch!"
+    assert len(stream.loaded_columns) == 0, "Streaming mode kept columns in memory!"
+print("\tDone.")
+
+print("Checking streaming from an RNTuple...")
+#RNTuples have no common basket boundaries, so they are read in fixed-size ranges
+rntuple = os.path.join(tmpdir, 'rntuple.root')
+genWeight = np.random.default_rng(1).normal(1.0, 0.1, size=10000).astype(np.float32)
+with uproot.recreate(rntuple) as f:
+    f['Events'] = {'genWeight' : genWeight}
+stream = make_dataset(rntuple + ':Events', 3000)
+H = stream.fill_hist(var, NoCut(), ConstantVariable(1.0), axis)
+target = np.histogram(genWeight, bins=axis.edges)[0]
+assert np.allclose(H.values(), target), "RNTuple values mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
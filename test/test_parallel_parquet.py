@@ -0,0 +1,66 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, RatioVariable, ConstantVariable
+from simonplot.cut import GreaterThanCut, AndCuts
+from simonplot.binning import BasicBinning
+
+#the workers may import this module, so only run the checks in the main process
+if __name__ == '__main__':
+    tmpdir = scratch_dir()
+    synthetic_parquet(100000, tmpdir, nfiles=8)
+
+    pt = BasicVariable('pt')
+    eta = BasicVariable('eta')
+    var = RatioVariable(pt, eta)
+    weight = BasicVariable('genWeight')
+    cut = AndCuts([GreaterThanCut(pt, 20), GreaterThanCut(eta, 0.0)])
+    axis = BasicBinning(20, -100, 100).build_axis(var)
+
+    def make_dataset(batch_size=None, num_processes=None):
+        dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size, num_processes=num_processes)
+        dset.set_xsec(1.0)
+        dset.compute_weight(1.0)
+        return dset
+
+    unit = ConstantVariable(1.0)
+
+    #the partial sums are added up in a different order than in a serial fill
+    def assert_same(H1, H2, what):
+        assert np.allclose(H1.values(flow=True), H2.values(flow=True), rtol=1e-12, atol=0), "%s content mismatch!"%what
+        assert np.allclose(H1.variances(flow=True), H2.variances(flow=True), rtol=1e-12, atol=0), "%s variance mismatch!"%what # pyright: ignore[reportArgumentType]
+
+    print("Comparing fragment-parallel fills against serial fills...")
+    H_serial = make_dataset().fill_hist(var, cut, weight, axis)
+    #with a unit weight the unweighted fill holds the raw counts
+    N_serial = make_dataset()._fill_hists_unweighted([(var, unit, axis)], cut)[0]
+    for batch_size in [None, 5000]:
+        dset = make_dataset(batch_size, num_processes=3)
+        H_parallel = dset.fill_hist(var, cut, weight, axis)
+        N_parallel = dset._fill_hists_unweighted([(var, unit, axis)], cut)[0]
+        assert len(dset.loaded_columns) == 0, "Parallel fill loaded columns in the parent process!"
+        assert np.array_equal(N_serial.values(flow=True), N_parallel.values(flow=True)), "Count mismatch!"
+        assert_same(H_serial, H_parallel, "fill_hist()")
+    print("\tDone.")
+
+    print("Comparing fragment-parallel multi-histogram fills against serial fills...")
+    specs = [(var, weight, axis), (pt, unit, BasicBinning(20, 0, 200).build_axis(pt))]
+    Hs_serial = make_dataset().fill_hists(specs, cut)
+    dset = make_dataset(num_processes=3)
+    Hs_parallel = dset.fill_hists(specs, cut)
+    assert len(dset.loaded_columns) == 0, "Parallel fill loaded columns in the parent process!"
+    assert_same(Hs_serial[0], Hs_parallel[0], "fill_hists()")
+    assert_same(Hs_serial[1], Hs_parallel[1], "fill_hists()")
+
+    dset.prefill_hists(specs, cut)
+    assert_same(H_serial, dset.fill_hist(var, cut, weight, axis), "prefill_hists()")
+
+    dset = make_dataset(num_processes=3)
+    dset.set_master_axis(var, BasicBinning(200, -100, 100).build_axis(var))
+    H_master = dset.fill_hist(var, cut, weight, axis)
+    assert len(dset.loaded_columns) == 0, "Parallel master fill loaded columns in the parent process!"
+    assert_same(H_serial, H_master, "Master histogram")
+    print("\tDone.")
+
+    print("All tests passed!")
@@ -0,0 +1,50 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import numpy as np
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+paths = []
+for i in range(6):
+    path = os.path.join(tmpdir, 'sample%d'%i)
+    synthetic_parquet(20000*(i+1), path)
+    paths.append(path)
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(pt, 20)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+def make_stack(max_workers):
+    dsets = []
+    for i, path in enumerate(paths):
+        dset = ParquetDataset('sample%d'%i, None, 'sample%d'%i, path)
+        dset.set_xsec(1.0 + i)
+        dsets.append(dset)
+    stack = DatasetStack('stack', None, 'stack', dsets, max_workers=max_workers)
+    stack.compute_weight(1.0)
+    return stack
+
+print("Comparing parallel stack against serial stack...")
+serial = make_stack(None)
+parallel = make_stack(4)
+
+H_serial = serial.fill_hist(pt, cut, weight, axis)
+H_parallel = parallel.fill_hist(pt, cut, weight, axis)
+assert np.array_equal(H_serial.values(flow=True), H_parallel.values(flow=True)), "Content mismatch!"
+assert np.array_equal(H_serial.variances(flow=True), H_parallel.variances(flow=True)), "Variance mismatch!" # pyright: ignore[reportArgumentType]
+
+assert serial.estimate_yield(cut, weight) == parallel.estimate_yield(cut, weight), "Yield mismatch!"
+assert serial.get_range(pt, cut)[:3] == parallel.get_range(pt, cut)[:3], "Range mismatch!"
+assert np.array_equal(serial.get_unique(BasicVariable('nJet'), cut), parallel.get_unique(BasicVariable('nJet'), cut)), "Unique values mismatch!"
+
+Hs_serial = serial.fill_hists([(pt, weight, axis)], cut)
+Hs_parallel = parallel.fill_hists([(pt, weight, axis)], cut)
+assert np.array_equal(Hs_serial[0].values(flow=True), Hs_parallel[0].values(flow=True)), "fill_hists() mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
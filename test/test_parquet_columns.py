@@ -0,0 +1,80 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable
+from simonplot.cut import NoCut, GreaterThanCut
+from simonplot.binning import BasicBinning
+from simonplot.util.column_cache import get_column_cache
+
+tmpdir = scratch_dir()
+table = synthetic_parquet(100000, tmpdir)
+
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+
+print("Checking incremental column loading...")
+dset.ensure_columns(['pt'])
+assert dset.loaded_columns == {'pt'}, "Wrong loaded columns!"
+
+dset.ensure_columns(['pt', 'eta', 'eta'])
+assert dset.loaded_columns == {'pt', 'eta'}, "Wrong loaded columns!"
+loaded_eta = get_column_cache().get(dset.column_cache_token, 'eta')
+
+#subset of what is loaded should not trigger any I/O
+dset.ensure_columns(['eta'])
+assert get_column_cache().get(dset.column_cache_token, 'eta') is loaded_eta, "Column was reloaded although already loaded!"
+
+dset.ensure_columns(['genWeight', 'pt'])
+assert dset.loaded_columns == {'pt', 'eta', 'genWeight'}, "Wrong loaded columns!"
+
+for col in ['pt', 'eta', 'genWeight']:
+    assert np.array_equal(dset.get_column(col), table[col].to_numpy()), "Column %s content mismatch!"%col
+print("\tDone.")
+
+print("Checking ranges from parquet statistics...")
+dset.ensure_columns(['nJet'])
+for col in ['pt', 'eta', 'nJet', 'genWeight']:
+    dset_stats = ParquetDataset('stats', None, 'stats', tmpdir)
+    range_stats = dset_stats.get_range(BasicVariable(col), NoCut())
+    assert col not in dset_stats.loaded_columns, "Statistics range should not load the column!"
+
+    #with the column loaded the range is computed from the data
+    range_data = dset.get_range(BasicVariable(col), NoCut())
+    assert np.allclose(range_stats[:3], range_data[:3]), "Range mismatch for %s!"%col
+    assert range_stats[3] == range_data[3], "Dtype mismatch for %s!"%col
+print("\tDone.")
+
+print("Checking incremental reads with a pushed-down cut...")
+class CountingDataset:
+    #pyarrow dataset which records the columns of every read
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self.reads = []
+
+    def to_table(self, columns=None, **kwargs):
+        self.reads.append(sorted(columns))
+        return self._dataset.to_table(columns=columns, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._dataset, name)
+
+cut = GreaterThanCut(BasicVariable('eta'), 0.0)
+weight = BasicVariable('genWeight')
+pushdown = ParquetDataset('pushdown', None, 'pushdown', tmpdir, arrow_cache=False)
+pushdown._dataset = CountingDataset(pushdown._dataset)
+reference = ParquetDataset('reference', None, 'reference', tmpdir, arrow_cache=False)
+reference.ensure_columns(['pt', 'eta', 'nJet', 'genWeight'])
+for dset_ in [pushdown, reference]:
+    dset_.set_xsec(1.0)
+    dset_.compute_weight(1.0)
+
+for col, axis in [('pt', BasicBinning(20, 0, 200)), ('nJet', BasicBinning(10, -0.5, 9.5))]:
+    var = BasicVariable(col)
+    H = pushdown.fill_hist(var, cut, weight, axis.build_axis(var))
+    target = reference.fill_hist(var, cut, weight, axis.build_axis(var))
+    assert np.array_equal(H.values(flow=True), target.values(flow=True)), "Values mismatch for %s!"%col
+assert pushdown._dataset.reads == [['eta', 'genWeight', 'pt'], ['nJet']], "Columns read again! %s"%pushdown._dataset.reads
+assert len(pushdown.loaded_columns) == 0, "Full columns loaded despite the pushed-down cut!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,48 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, ConstantVariable, RatioVariable
+from simonplot.cut import NoCut, GreaterThanCut, TwoSidedCut, AndCuts
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+var = BasicVariable('pt')
+weights = [ConstantVariable(1.0), BasicVariable('genWeight')]
+cuts = [
+    NoCut(),
+    GreaterThanCut(BasicVariable('pt'), 20),
+    AndCuts([GreaterThanCut(BasicVariable('pt'), 20), TwoSidedCut(BasicVariable('eta'), -1.0, 1.0)])
+]
+axis = BasicBinning(20, 0, 200).build_axis(var)
+
+dset_full = ParquetDataset('full', None, 'full', tmpdir)
+dset_stream = ParquetDataset('stream', None, 'stream', tmpdir, batch_size=7000)
+dset_full.set_xsec(1.0)
+dset_stream.set_xsec(1.0)
+dset_full.compute_weight(1.0)
+dset_stream.compute_weight(1.0)
+
+print("Comparing streaming and in-memory fills...")
+for cut in cuts:
+    for weight in weights:
+        H_full = dset_full.fill_hist(var, cut, weight, axis)
+        H_stream = dset_stream.fill_hist(var, cut, weight, axis)
+        assert np.allclose(H_full.values(flow=True), H_stream.values(flow=True)), "Values mismatch!"
+        assert np.allclose(H_full.variances(flow=True), H_stream.variances(flow=True)), "Variances mismatch!"
+
+        assert np.isclose(dset_full.estimate_yield(cut, weight), dset_stream.estimate_yield(cut, weight)), "Yield mismatch!"
+
+    range_full = dset_full.get_range(RatioVariable(var, BasicVariable('eta')), cut)
+    range_stream = dset_stream.get_range(RatioVariable(var, BasicVariable('eta')), cut)
+    assert np.allclose(range_full[:3], range_stream[:3]), "Range mismatch!"
+    assert range_full[3] == range_stream[3], "Dtype mismatch!"
+
+    unique_full = dset_full.get_unique(BasicVariable('nJet'), cut)
+    unique_stream = dset_stream.get_unique(BasicVariable('nJet'), cut)
+    assert np.array_equal(unique_full, unique_stream), "Unique values mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,108 @@
+from data_factory import synthetic_parquet, scratch_dir
+import numpy as np
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable, ConstantVariable
+from simonplot.cut import NoCut
+from simonplot.binning import QuantileAutoBinning, BasicBinning, ExplicitBinning
+from simonplot.util.quantile_sketch import QuantileSketch, merge_sketches, on_grid
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+cut = NoCut()
+
+print("Checking merged sketches against exact quantiles...")
+rng = np.random.default_rng(12345)
+values = rng.normal(size=1000000)
+sketches = []
+for chunk in np.array_split(values, 17):
+    sketch = QuantileSketch(k=1000)
+    sketch.update(chunk)
+    sketches.append(sketch)
+merged = merge_sketches(sketches)
+qs = np.array([0.01, 0.1, 0.5, 0.9, 0.99])
+assert merged.count == len(values), "Wrong count!"
+assert len(merged) < 10000, "Sketch is not bounded!"
+#compare in rank, which is what the sketch guarantees
+ranks = np.searchsorted(np.sort(values), merged.quantiles(qs)) / len(values)
+assert np.all(np.abs(ranks - qs) < 0.005), "Quantiles too far off!"
+assert merged.quantiles([0.0])[0] == np.min(values) and merged.quantiles([1.0])[0] == np.max(values), "Extremes not exact!"
+print("\tDone.")
+
+print("Checking quantile auto binning...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=30000)
+axis = QuantileAutoBinning(0.01, 0.99).build_auto_axis([pt], [cut], [dset])
+dset.set_batch_size(None)
+dset.ensure_columns(['pt'])
+sorted_pt = np.sort(dset.get_column('pt'))
+def ranks(edges):
+    return np.searchsorted(sorted_pt, edges) / len(sorted_pt)
+assert np.allclose(ranks(axis.edges[[0, -1]]), [0.01, 0.99], atol=0.005), "Range does not follow the quantiles!"
+assert axis.edges[-1] < np.max(dset.get_column('pt')), "Outliers not clipped!"
+assert 10 <= len(axis.edges)-1 <= 150, "Number of bins out of bounds!"
+
+logaxis = QuantileAutoBinning().build_auto_axis([pt], [cut], [dset], transform='log')
+assert logaxis.edges[0] > 0, "Log axis starts at non-positive value!"
+
+intaxis = QuantileAutoBinning(0.0, 1.0).build_auto_axis([BasicVariable('nJet')], [cut], [dset])
+assert np.allclose(intaxis.edges, np.arange(-0.5, 6.0)), "Integer axis not one bin per value!"
+
+stack = DatasetStack('stack', None, 'stack', [dset, ParquetDataset('dset2', None, 'dset2', tmpdir)])
+stackaxis = QuantileAutoBinning(0.01, 0.99, nbins=20).build_auto_axis([pt], [cut], [stack])
+assert len(stackaxis.edges) == 21, "nbins not respected!"
+assert np.allclose(ranks(stackaxis.edges[[0, -1]]), [0.01, 0.99], atol=0.005), "Stack range does not follow the quantiles!"
+print("\tDone.")
+
+print("Checking that the histograms come from the sketch pass...")
+weight = BasicVariable('genWeight')
+def make_dataset(name='dset', batch_size=None):
+    dset = ParquetDataset(name, None, name, tmpdir, batch_size=batch_size)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+def count_chunks(dset):
+    #number of passes over the data, counted through iter_chunks()
+    dset.passes = 0
+    iter_chunks = dset.iter_chunks
+    def counted(*args, **kwargs):
+        dset.passes += 1
+        return iter_chunks(*args, **kwargs)
+    dset.iter_chunks = counted
+    return dset
+
+for var, wgt, transform in [(pt, weight, None), (pt, ConstantVariable(2.0), 'log'), (BasicVariable('nJet'), weight, None)]:
+    for batch_size in [None, 30000]:
+        dset = count_chunks(make_dataset(batch_size=batch_size))
+        axis = QuantileAutoBinning().build_auto_axis([var], [cut], [dset], transform=transform, weights=[wgt])
+        assert on_grid(axis.edges), "Edges not on the grid!"
+        H = dset.fill_hist(var, cut, wgt, axis)
+        assert dset.passes == 1, "Histogram not filled in the sketch pass!"
+
+        target = make_dataset().fill_hist(var, cut, wgt, axis)
+        assert np.allclose(H.values(flow=True), target.values(flow=True), rtol=1e-12, atol=0), "Values mismatch!"
+        assert np.allclose(H.variances(flow=True), target.variances(flow=True), rtol=1e-12, atol=0), "Variances mismatch!" # pyright: ignore[reportArgumentType]
+
+        #the grid sums are only used once
+        dset.fill_hist(var, cut, wgt, axis)
+        assert dset.passes == 2, "Grid sums reused!"
+
+#sums which cannot serve the axis are dropped by the fill as well
+dset = make_dataset()
+for other in [BasicBinning(20, 0, 200).build_axis(pt), ExplicitBinning([0.1, 20.1, 200.1]).build_axis(pt)]:
+    dset.get_sketch(pt, cut, weight)
+    assert len(dset._prefilled_grids) == 1, "Grid sums not kept!"
+    dset.fill_hist(pt, cut, weight, other)
+    assert len(dset._prefilled_grids) == 0, "Unused grid sums kept!"
+
+a, b = count_chunks(make_dataset('a')), count_chunks(make_dataset('b'))
+stack = DatasetStack('stack', None, 'stack', [a, b])
+axis = QuantileAutoBinning().build_auto_axis([pt], [cut], [stack], weights=[weight])
+H_stack = stack.fill_hist(pt, cut, weight, axis)
+assert a.passes == 1 and b.passes == 1, "Stack constituents read twice!"
+assert np.allclose(H_stack.values(flow=True), 2*make_dataset().fill_hist(pt, cut, weight, axis).values(flow=True), rtol=1e-12, atol=0), "Stack mismatch!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -0,0 +1,96 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import numpy as np
+import pyarrow.parquet as pq
+
+from simonplot.plottables import ParquetDataset
+from simonplot.variable import BasicVariable, RatioVariable
+from simonplot.cut import GreaterThanCut, NoCut
+from simonplot.binning import BasicBinning
+
+tmpdir = scratch_dir()
+synthetic_parquet(100000, tmpdir)
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(pt, 50)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+def make_dataset(batch_size=None):
+    dset = ParquetDataset('dset', None, 'dset', tmpdir, batch_size=batch_size)
+    dset.set_xsec(1.0)
+    dset.compute_weight(1.0)
+    return dset
+
+print("Checking skims against the original dataset...")
+for batch_size in [None, 30000]:
+    dset = make_dataset(batch_size)
+    path = os.path.join(scratch_dir(), 'skim.parquet')
+    skim = dset.skim(path, cut, ['pt', 'genWeight'], weight_column='genWeight', row_group_size=5000)
+    assert not hasattr(dset, '_filtered') and len(dset.loaded_columns) == 0, "Skim kept data in memory!"
+
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.schema.names == ['pt', 'genWeight'], "Wrong columns written!"
+    assert all(metadata.row_group(i).num_rows == 5000 for i in range(metadata.num_row_groups-1)), "Wrong row group size!"
+
+    assert skim.num_events == 100000, "Original number of events not carried over!"
+    dset.ensure_columns(['genWeight'])
+    assert np.isclose(skim.sum_weights, np.sum(dset.get_column('genWeight'))), "Wrong sum of weights!" # pyright: ignore[reportArgumentType]
+    assert skim.num_rows < 100000, "Cut not applied!"
+
+    skim.compute_weight(1.0)
+    H = skim.fill_hist(pt, NoCut(), weight, axis)
+    target = make_dataset().fill_hist(pt, cut, weight, axis)
+    assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+    assert np.allclose(H.variances(flow=True), target.variances(flow=True)), "Variances mismatch!" # pyright: ignore[reportArgumentType]
+print("\tDone.")
+
+print("Checking streamed skims with a cut which cannot be pushed down...")
+ratio_cut = GreaterThanCut(RatioVariable(pt, BasicVariable('eta')), 10)
+dset = make_dataset()
+path = os.path.join(scratch_dir(), 'skim_ratio.parquet')
+skim_ratio = dset.skim(path, ratio_cut, ['pt', 'genWeight'], batch_size=7000)
+assert len(dset.loaded_columns) == 0, "Skim loaded full columns!"
+skim_ratio.compute_weight(1.0)
+H = skim_ratio.fill_hist(pt, NoCut(), weight, axis)
+target = make_dataset().fill_hist(pt, ratio_cut, weight, axis)
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+print("\tDone.")
+
+print("Checking skims of skims...")
+tighter = GreaterThanCut(pt, 100)
+path = os.path.join(scratch_dir(), 'skim2.parquet')
+skim2 = skim.skim(path, tighter, ['pt', 'genWeight'])
+assert skim2.num_events == 100000, "Original number of events lost!"
+assert np.isclose(skim2.sum_weights, skim.sum_weights), "Sum of weights lost!" # pyright: ignore[reportArgumentType]
+skim2.compute_weight(1.0)
+H = skim2.fill_hist(pt, NoCut(), weight, axis)
+target = make_dataset().fill_hist(pt, tighter, weight, axis)
+assert np.allclose(H.values(flow=True), target.values(flow=True)), "Values mismatch!"
+
+#the stored sum only stands for the weight column it was made from
+assert np.isclose(skim2.sum_of_weights('genWeight'), skim.sum_weights), "Stored sum of weights not used!" # pyright: ignore[reportArgumentType]
+skim2.ensure_columns(['pt'])
+assert np.isclose(skim2.sum_of_weights('pt'), np.sum(skim2.get_column('pt'))), "Stored sum of weights used for another column!" # pyright: ignore[reportArgumentType]
+print("\tDone.")
+
+print("Checking skims with a non-integer number of events...")
+dset = make_dataset()
+dset.override_num_events(1234.5)
+path = os.path.join(scratch_dir(), 'skim3.parquet')
+skim3 = dset.skim(path, cut, ['pt'])
+assert skim3.num_events == 1234.5, "Number of events not carried over!"
+print("\tDone.")
+
+print("Checking that failed skims leave no files behind...")
+outdir = scratch_dir()
+try:
+    make_dataset().skim(os.path.join(outdir, 'skim4.parquet'), GreaterThanCut(BasicVariable('nonexistent'), 0), ['pt'])
+except Exception:
+    pass
+else:
+    raise AssertionError("Skim with a missing column succeeded!")
+assert os.listdir(outdir) == [], "Temporary file left behind!"
+print("\tDone.")
+
+print("All tests passed!")
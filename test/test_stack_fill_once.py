@@ -0,0 +1,70 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from simonplot.plottables import ParquetDataset, DatasetStack
+from simonplot.variable import BasicVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.binning import BasicBinning
+from simonplot.typing.Protocols import HistplotMode
+
+tmpdir = scratch_dir()
+
+pt = BasicVariable('pt')
+weight = BasicVariable('genWeight')
+cut = GreaterThanCut(pt, 20)
+axis = BasicBinning(20, 0, 200).build_axis(pt)
+
+fill_calls = {}
+
+def count_fills(dset):
+    fill_unbinned = dset._fill_unbinned
+    def counted(*args, **kwargs):
+        fill_calls[dset.key] += 1
+        return fill_unbinned(*args, **kwargs)
+    fill_calls[dset.key] = 0
+    dset._fill_unbinned = counted
+
+dsets = []
+for i in range(4):
+    path = os.path.join(tmpdir, 'sample%d'%i)
+    synthetic_parquet(20000*(i+1), path)
+    dset = ParquetDataset('sample%d'%i, None, 'sample%d'%i, path)
+    #the largest sample gets the smallest cross section, so the stack order differs from the input order
+    dset.set_xsec(4.0 - i)
+    count_fills(dset)
+    dsets.append(dset)
+
+stack = DatasetStack('stack', None, 'stack', dsets)
+stack.compute_weight(1.0)
+
+print("Testing that a stack fill fills each constituent once...")
+H = stack.fill_hist(pt, cut, weight, axis)
+assert all(n == 1 for n in fill_calls.values()), "Constituents filled more than once! %s"%fill_calls
+
+Hsum = dsets[0].fill_hist(pt, cut, weight, axis).copy()
+for d in dsets[1:]:
+    Hsum += d.fill_hist(pt, cut, weight, axis)
+assert np.allclose(H.values(flow=True), Hsum.values(flow=True), rtol=1e-12, atol=0), "Stack is not the sum of its constituents!"
+print("\tDone.")
+
+print("Testing that STACK ordering uses the filled histograms...")
+for k in fill_calls:
+    fill_calls[k] = 0
+
+fig, ax = plt.subplots()
+stack.plot_hist(pt, cut, weight, axis, density=False, ax=ax, own_style=True, mode=HistplotMode.STACK)
+plt.close(fig)
+assert all(n == 1 for n in fill_calls.values()), "STACK drawing refilled the constituents! %s"%fill_calls
+
+yields = [np.sum(d._H.values(flow=True)) for d in stack._datasets]
+assert np.all(np.diff(yields) >= 0), "Stack not ordered by yield!"
+assert [d.key for d in stack._datasets] != [d.key for d in dsets], "Stack order unchanged!"
+for d, Hd in zip(stack._datasets, stack._Hs):
+    assert Hd is d._H, "Constituent histograms out of order!"
+print("\tDone.")
+
+print("All tests passed!")
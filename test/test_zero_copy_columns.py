@@ -0,0 +1,62 @@
+from data_factory import synthetic_parquet, scratch_dir
+import os
+import numpy as np
+import awkward as ak
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from simonplot.plottables import ParquetDataset
+from simonplot.plottables.Datasets import ArrowTableView
+from simonplot.variable import BasicVariable
+from simonplot.cut import GreaterThanCut
+from simonplot.util.arrow_convert import arrow_to_numpy, numpy_to_arrow
+
+tmpdir = scratch_dir()
+table = synthetic_parquet(100000, tmpdir)
+
+print("Checking that columns are combined once and returned without copies...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir)
+dset.ensure_columns(['pt', 'nJet'])
+for col in ['pt', 'nJet']:
+    first = dset.get_column(col)
+    assert first is dset.get_column(col), "Column %s converted again!"%col
+    assert first.flags.c_contiguous, "Column %s not contiguous!"%col
+    assert not first.flags.writeable, "Shared column %s is writeable!"%col
+    assert np.array_equal(first, table[col].to_numpy()), "Column %s mismatch!"%col
+print("\tDone.")
+
+print("Checking columns of the rows passing a pushed-down cut...")
+dset = ParquetDataset('dset', None, 'dset', tmpdir, arrow_cache=False)
+view = next(dset.iter_chunks(['pt', 'eta'], GreaterThanCut(BasicVariable('eta'), 0.0)))
+assert isinstance(view, ArrowTableView), "Cut not pushed down!"
+first = view.get_column('pt')
+assert first is view.get_column('pt'), "Column converted again!"
+assert np.shares_memory(first, view.table['pt'].chunk(0).to_numpy()), "Column copied out of the table!"
+assert np.array_equal(first, table['pt'].to_numpy()[table['eta'].to_numpy() > 0]), "Column mismatch!"
+
+view = next(dset.iter_chunks(['pt', 'eta', 'nJet'], GreaterThanCut(BasicVariable('eta'), 0.0)))
+assert np.shares_memory(view.get_column('nJet'), view.table['nJet'].chunk(0).to_numpy()), "Added column copied out of the table!"
+print("\tDone.")
+
+print("Checking conversions...")
+values = pa.chunked_array([pa.array(np.arange(5.0))])
+assert np.shares_memory(arrow_to_numpy(values), values.chunk(0).to_numpy()), "Single chunk copied!"
+
+with_nulls = arrow_to_numpy(pa.chunked_array([pa.array([1.0, None]), pa.array([3.0])]))
+assert np.array_equal(with_nulls, [1.0, np.nan, 3.0], equal_nan=True), "Nulls not converted to NaN!"
+assert np.array_equal(numpy_to_arrow(np.arange(3.0), pa.float64()).to_numpy(), np.arange(3.0)), "Round trip failed!"
+print("\tDone.")
+
+print("Checking list columns...")
+listdir = scratch_dir()
+jagged = pa.array([[1.0, 2.0], [], [3.0]] * 1000, type=pa.list_(pa.float64()))
+pq.write_table(pa.table({'x' : jagged, 'n' : pa.array([2, 0, 1] * 1000)}), os.path.join(listdir, 'part0.parquet'), row_group_size=700)
+dset = ParquetDataset('lists', None, 'lists', listdir)
+dset.ensure_columns(['x'])
+x = dset.get_column('x')
+assert isinstance(x, ak.Array), "List column not returned as an awkward array!"
+assert ak.all(ak.num(x) == np.array([2, 0, 1] * 1000)), "Wrong list lengths!"
+assert np.array_equal(ak.flatten(x).to_numpy(), np.tile([1.0, 2.0, 3.0], 1000)), "Wrong list contents!"
+print("\tDone.")
+
+print("All tests passed!")
@@ -118,7 +118,8 @@ class AutoBinningProtocol(BaseBinningProtocol, Protocol):
                         variables: Sequence[VariableProtocol], 
                         cuts: Sequence[CutProtocol], 
                         datasets: Sequence["BaseDatasetProtocol"], 
-                        transform: Union[str, None]=None) -> hist.axis.AxesMixin:
+                        transform: Union[str, None]=None,
+                        weights: Union[Sequence[VariableProtocol], None]=None) -> hist.axis.AxesMixin:
         ...
 
 @runtime_checkable 
@@ -153,6 +154,27 @@ class BaseDatasetProtocol(Protocol):
     def get_unique(self, var : VariableProtocol, cut : CutProtocol) -> np.ndarray:
         ...
 
+    def get_sketch(self, var : VariableProtocol, cut : CutProtocol, weight : VariableProtocol | None = None) -> Any:
+        ...
+
+    def get_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[Tuple[Any, Any, Any, np.dtype]]:
+        ...
+
+    def prefetch_ranges(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        ...
+
+    def get_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[Any]:
+        ...
+
+    def prefetch_sketches(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        ...
+
+    def get_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> List[np.ndarray]:
+        ...
+
+    def prefetch_uniques(self, pairs : Sequence[Tuple[VariableProtocol, CutProtocol]]) -> None:
+        ...
+
     def get_range(self, var : VariableProtocol, cut : CutProtocol) -> Tuple[Any, Any, Any, np.dtype]:
         ...
 
@@ -210,7 +232,35 @@ class BaseDatasetProtocol(Protocol):
                   variable: VariableProtocol, 
                   cut: CutProtocol, 
                   weight : VariableProtocol,
-                  axis : Any) -> Any:
+                  axis : Any,
+                  threads : Union[int, None] = None) -> Any:
+        ...
+
+    def fill_hists(self,
+                   specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                   cut : CutProtocol,
+                   threads : Union[int, None] = None) -> List[Any]:
+        ...
+
+    def prefill_hists(self,
+                      specs : Sequence[Tuple[VariableProtocol, VariableProtocol, Any]],
+                      cut : CutProtocol,
+                      threads : Union[int, None] = None) -> None:
+        ...
+
+    def clear_prefilled(self) -> None:
+        ...
+
+    def prefill_categories(self,
+                           variable : VariableProtocol,
+                           cut : CutProtocol,
+                           weight : VariableProtocol) -> np.ndarray:
+        ...
+
+    def set_master_axis(self, variable : VariableProtocol, axis : Any) -> None:
+        ...
+
+    def clear_master_hists(self) -> None:
         ...
 
     def plot_hist(self,
@@ -226,6 +276,17 @@ class BaseDatasetProtocol(Protocol):
                        **mpl_kwargs) -> Tuple[Tuple[Any, Any], Any]:
         ...
 
+    def draw_hist(self,
+                  H : Any,
+                  axis : Any,
+                  density: bool,
+                  ax : matplotlib.axes.Axes,
+                  own_style : bool,
+                  mode : HistplotMode,
+                  _fillbetween : Union[float, None] = None,
+                  **mpl_kwargs) -> Tuple[Any, Any]:
+        ...
+
     def plot_hist_ratio(self,
                     H1 : Any,
                     H2 : Any,
@@ -268,7 +329,8 @@ class PrebinnedDatasetAccessProtocol(Protocol):
         ...
 
 class UnbinnedDatasetProtocol(BaseDatasetProtocol, UnbinnedDatasetAccessProtocol, Protocol):
-    pass
+    def release_columns(self) -> None:
+        ...
 
 class PrebinnedDatasetProtocol(BaseDatasetProtocol, PrebinnedDatasetAccessProtocol, Protocol):
     @property
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any
+
+import pyarrow as pa
+
+from simonplot.config import config
+
+class ArrowCache:
+    '''
+    On-disk cache of decoded parquet columns, stored as uncompressed Arrow IPC (Feather v2) files,
+    one file per column. Later runs memory-map the files instead of decompressing and
+    decoding the parquet files again, so reading a cached column is nearly free.
+
+    Entries are keyed by the dataset identity (see ParquetDataset.cache_identity, which contains
+    the sizes and modification times of the source files) and the column name,
+    so modifying the source files makes their entries unreachable. Stale entries are
+    not removed automatically; clear() the cache (or delete the directory) to reclaim the space.
+    '''
+    def __init__(self, directory : str | None = None):
+        if directory is None:
+            directory = config['arrow_cache']['directory']
+        self._directory = directory
+        os.makedirs(self._directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _path(self, identity, column : str) -> str:
+        key = hashlib.sha256(pickle.dumps((identity, column))).hexdigest()
+        return os.path.join(self._directory, key + '.arrow')
+
+    def get(self, identity, column : str) -> pa.ChunkedArray | None:
+        '''
+        The memory-mapped column, or None if it is not cached
+        '''
+        try:
+            table = pa.ipc.open_file(pa.memory_map(self._path(identity, column), 'r')).read_all()
+        except (OSError, pa.ArrowInvalid):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return table['column']
+
+    def put(self, identity, column : str, values : pa.ChunkedArray) -> pa.ChunkedArray:
+        '''
+        Store the column, and return it memory-mapped from the cache file
+        '''
+        #a single contiguous chunk, so that the mapped column converts to numpy without copying
+        table = pa.table({'column' : values.combine_chunks()})
+
+        #write to a temporary file and move it into place,
+        #so that an interrupted run never leaves a truncated entry behind
+        fd, tmppath = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            with pa.OSFile(tmppath, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmppath, self._path(identity, column))
+        except BaseException:
+            os.remove(tmppath)
+            raise
+
+        return pa.ipc.open_file(pa.memory_map(self._path(identity, column), 'r')).read_all()['column']
+
+    def clear(self) -> None:
+        for fname in os.listdir(self._directory):
+            if fname.endswith('.arrow'):
+                os.remove(os.path.join(self._directory, fname))
+
+    def __len__(self):
+        return len([fname for fname in os.listdir(self._directory) if fname.endswith('.arrow')])
+
+_arrow_cache : ArrowCache | None = None
+#whether _arrow_cache has been set up (from the config, or explicitly)
+_arrow_cache_configured = False
+
+def enable_arrow_cache(directory : str | None = None) -> ArrowCache:
+    '''
+    Turn on the Arrow materialization cache for ParquetDatasets, stored in directory
+    (by default arrow_cache.directory from the config)
+    '''
+    global _arrow_cache, _arrow_cache_configured
+    _arrow_cache = ArrowCache(directory)
+    _arrow_cache_configured = True
+    return _arrow_cache
+
+def disable_arrow_cache() -> None:
+    global _arrow_cache, _arrow_cache_configured
+    _arrow_cache = None
+    _arrow_cache_configured = True
+
+def get_arrow_cache() -> ArrowCache | None:
+    '''
+    The active Arrow materialization cache, or None if it is disabled
+    '''
+    global _arrow_cache, _arrow_cache_configured
+    if not _arrow_cache_configured:
+        if config['arrow_cache']['enabled']:
+            _arrow_cache = ArrowCache()
+        _arrow_cache_configured = True
+    return _arrow_cache
@@ -0,0 +1,49 @@
+from typing import Any
+
+import numpy as np
+import awkward as ak
+import pyarrow as pa
+
+def arrow_to_numpy(values : pa.ChunkedArray | pa.Array) -> Any:
+    '''
+    Numpy (or awkward) array of an arrow column, sharing the arrow buffers where the type allows it.
+
+    The chunks are combined into one contiguous array first (a copy only if there is more than one chunk).
+    Integer and floating point columns without nulls are then returned as a zero-copy view.
+    Nested columns (lists, structs) are returned as awkward arrays built on the arrow buffers.
+    Anything else (booleans, nulls, strings) has to be converted with a copy.
+    The result is read-only, since it is shared between everyone reading the column
+    '''
+    if isinstance(values, pa.ChunkedArray):
+        values = values.chunk(0) if values.num_chunks == 1 else values.combine_chunks()
+
+    if _is_nested(values.type):
+        return ak.from_arrow(values)
+
+    if zero_copy_convertible(values):
+        return values.to_numpy(zero_copy_only=True)
+
+    result = values.to_numpy(zero_copy_only=False)
+    result.flags.writeable = False
+    return result
+
+def zero_copy_convertible(values : pa.ChunkedArray | pa.Array) -> bool:
+    '''
+    Whether arrow_to_numpy() returns a view of the arrow buffers (rather than a copy)
+    '''
+    atype = values.type
+    if _is_nested(atype):
+        return True
+    return values.null_count == 0 and (pa.types.is_integer(atype) or pa.types.is_floating(atype))
+
+def _is_nested(atype : pa.DataType) -> bool:
+    return pa.types.is_list(atype) or pa.types.is_large_list(atype) or pa.types.is_fixed_size_list(atype) or pa.types.is_struct(atype)
+
+def numpy_to_arrow(values : Any, atype : pa.DataType | None = None) -> pa.Array:
+    '''
+    Inverse of arrow_to_numpy(): an arrow array of the given type (zero-copy for primitive numpy arrays)
+    '''
+    if isinstance(values, ak.Array):
+        result = ak.to_arrow(values, extensionarray=False)
+        return result if atype is None else result.cast(atype)
+    return pa.array(np.asarray(values), type=atype)
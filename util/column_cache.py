@@ -0,0 +1,211 @@
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+import pyarrow as pa
+import awkward as ak
+
+from simonplot.config import config
+from simonplot.util.arrow_convert import arrow_to_numpy, numpy_to_arrow
+
+class ColumnCache:
+    '''
+    Process-wide bounded LRU cache of the columns loaded by all the datasets,
+    so that a long session with many datasets does not grow without bound.
+
+    Entries are keyed by (owner, column), where owner is a unique token of the dataset
+    (see SingleDatasetBase.column_cache_token). Values are numpy or awkward arrays.
+    When the total size exceeds max_bytes the least recently used columns are evicted.
+    If spilling is enabled, evicted columns are written to an uncompressed Arrow IPC file
+    in spill_directory instead, and memory-mapped back when they are next used
+    (memory-mapped columns do not count towards max_bytes).
+    Columns larger than max_bytes are never kept in memory: put() returns False for them (and warns once).
+    Datasets hold on to the columns of the pass over the data in progress themselves
+    (see ParquetDataset.release_columns()), so evictions only take effect between passes.
+
+    Only the loaded columns are accounted for. Tables read with a pushed-down filter
+    (see ParquetDataset._filtered_view) are held by their dataset outside of the cache.
+    '''
+    def __init__(self, max_bytes : int | None = None, spill : bool | None = None, spill_directory : str | None = None):
+        if max_bytes is None:
+            max_bytes = config['column_cache']['max_bytes']
+        if spill is None:
+            spill = config['column_cache']['spill']
+        if spill_directory is None:
+            spill_directory = config['column_cache']['spill_directory']
+        self._max_bytes = max_bytes
+        self._spill = spill
+        self._spill_directory = spill_directory
+
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        #(owner, column) -> (path, memory-mapped value). The path is None for files which are not ours
+        self._spilled = {}
+        #datasets in a stack are filled from several threads at once
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+        self._warned_oversized = False
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def get(self, owner : str, column : str) -> Any:
+        with self._lock:
+            k = (owner, column)
+            if k in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(k)
+                return self._entries[k]
+            elif k in self._spilled:
+                self.hits += 1
+                return self._spilled[k][1]
+
+            self.misses += 1
+            return None
+
+    def put(self, owner : str, column : str, value : Any) -> bool:
+        '''
+        Add a column. Returns False if it was not kept, because it is larger than max_bytes and spilling is off
+        '''
+        with self._lock:
+            k = (owner, column)
+            self._discard(k)
+
+            nbytes = value.nbytes
+            if nbytes > self._max_bytes:
+                if self._spill:
+                    self._spill_entry(k, value)
+                    return True
+                if not self._warned_oversized:
+                    print("WARNING: column %s (%d bytes) is larger than column_cache.max_bytes (%d bytes) and is not cached. Raise max_bytes or enable spilling to keep such columns between plots"%(column, nbytes, self._max_bytes))
+                    self._warned_oversized = True
+                return False
+
+            self._entries[k] = value
+            self._nbytes += nbytes
+
+            while self._nbytes > self._max_bytes:
+                evicted_k, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+                if self._spill:
+                    self._spill_entry(evicted_k, evicted)
+            return True
+
+    def put_mapped(self, owner : str, column : str, value : Any) -> None:
+        '''
+        Add a column which is memory-mapped from a file owned by someone else
+        (eg the Arrow materialization cache). It does not count towards max_bytes and is never evicted
+        '''
+        with self._lock:
+            k = (owner, column)
+            self._discard(k)
+            self._spilled[k] = (None, value)
+
+    def contains(self, owner : str, column : str) -> bool:
+        with self._lock:
+            return (owner, column) in self._entries or (owner, column) in self._spilled
+
+    def columns(self, owner : str) -> frozenset:
+        with self._lock:
+            return frozenset(column for o, column in list(self._entries) + list(self._spilled) if o == owner)
+
+    def _spill_entry(self, k, value) -> None:
+        if self._spill_directory is None:
+            self._spill_directory = tempfile.mkdtemp(prefix='simonplot_spill_')
+        os.makedirs(self._spill_directory, exist_ok=True)
+
+        if isinstance(value, ak.Array):
+            table = ak.to_arrow_table(value)
+        else:
+            table = pa.table({'column' : numpy_to_arrow(value)})
+
+        path = os.path.join(self._spill_directory, '%s.arrow'%uuid.uuid4().hex)
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        mapped = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        if isinstance(value, ak.Array):
+            mapped = ak.from_arrow(mapped)
+        else:
+            mapped = arrow_to_numpy(mapped['column'])
+
+        self._spilled[k] = (path, mapped)
+        self.spills += 1
+
+    def _discard(self, k) -> None:
+        if k in self._entries:
+            self._nbytes -= self._entries.pop(k).nbytes
+        if k in self._spilled:
+            path, _ = self._spilled.pop(k)
+            if path is None:
+                return
+            #on some platforms a file which is still mapped cannot be removed
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def drop(self, owner : str) -> None:
+        '''
+        Forget all the columns of one owner
+        '''
+        with self._lock:
+            for k in [k for k in list(self._entries) + list(self._spilled) if k[0] == owner]:
+                self._discard(k)
+
+    def clear(self) -> None:
+        with self._lock:
+            for k in list(self._entries) + list(self._spilled):
+                self._discard(k)
+
+    def __len__(self):
+        return len(self._entries) + len(self._spilled)
+
+_column_cache : ColumnCache | None = None
+
+def get_column_cache() -> ColumnCache:
+    '''
+    The process-wide column cache
+    '''
+    global _column_cache
+    if _column_cache is None:
+        _column_cache = ColumnCache()
+    return _column_cache
+
+def configure_column_cache(max_bytes : int | None = None, spill : bool | None = None, spill_directory : str | None = None) -> ColumnCache:
+    '''
+    Replace the process-wide column cache (dropping everything it holds)
+    with one with the given settings (by default those from the config)
+    '''
+    global _column_cache
+    if _column_cache is not None:
+        _column_cache.clear()
+    _column_cache = ColumnCache(max_bytes, spill, spill_directory)
+    return _column_cache
+
+def new_column_cache_owner(obj : Any) -> str:
+    '''
+    A unique owner token for obj, whose columns are dropped from the cache when obj is garbage collected
+    '''
+    owner = uuid.uuid4().hex
+    weakref.finalize(obj, _drop_owner, owner)
+    return owner
+
+def _drop_owner(owner : str) -> None:
+    if _column_cache is not None:
+        _column_cache.drop(owner)
@@ -0,0 +1,70 @@
+from typing import Any
+
+class EvaluationContext:
+    '''
+    Memoizes Variable evaluations on one dataset, so that sub-variables shared
+    within (or between) expression trees are only computed once per (dataset, cut).
+    Use as a context manager around the top-level evaluations:
+
+        with EvaluationContext(dataset):
+            val = evaluate_variable(variable, dataset, cut)
+            wgt = evaluate_variable(weight, dataset, cut)
+
+    Equal sub-variables are deduplicated when they have the same type, the same key,
+    and compare equal with __eq__. Variables whose key and __eq__ do not fully
+    describe their value (eg ConcatVariable) opt out by setting `_dedup_by_key = False`,
+    and are then only shared by identity.
+    The memoized values are dropped when the context exits.
+    '''
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._entries = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        self._previous = getattr(self._dataset, 'eval_context', None)
+        if self._previous is None:
+            self._dataset.eval_context = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._previous is None:
+            self._dataset.eval_context = None
+        self._entries.clear()
+        return False
+
+    @staticmethod
+    def _cut_key(cut):
+        #cuts that read no columns (eg the NoCut() instances built inside every leaf cut)
+        #all give the same result for the same type and key
+        if len(cut.columns) == 0:
+            return (type(cut), cut.key)
+        return (id(cut), cut.key)
+
+    def evaluate(self, variable, dataset, cut) -> Any:
+        if getattr(variable, '_dedup_by_key', False):
+            k = (type(variable), variable.key, self._cut_key(cut))
+        else:
+            k = (id(variable), self._cut_key(cut))
+
+        entry = self._entries.get(k)
+        if entry is not None and (entry[0] is variable or entry[0] == variable):
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = variable.evaluate(dataset, cut)
+        #the entry keeps the variable alive, so its id() cannot be reused while cached
+        self._entries[k] = (variable, value)
+        return value
+
+def evaluate_variable(variable, dataset, cut) -> Any:
+    '''
+    variable.evaluate(dataset, cut), going through the active EvaluationContext of the dataset if there is one
+    '''
+    context = getattr(dataset, 'eval_context', None)
+    if context is None:
+        return variable.evaluate(dataset, cut)
+    return context.evaluate(variable, dataset, cut)
@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Sequence
+
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+
+from simonplot.config import config
+
+SIDECAR_NAME = '.simonplot_metadata.json'
+
+class FileMetadataCache:
+    '''
+    Cache of per-file metadata of parquet files: the number of rows,
+    and the sums of weight columns (eg genWeight) over all the rows.
+
+    Entries are kept in memory for the whole process, and for local files also in a
+    JSON sidecar file (SIDECAR_NAME) next to the parquet files, so that later runs
+    do not need to open the files at all. An entry is only used while the size
+    and modification time of its file are unchanged.
+    '''
+    def __init__(self, sidecar : bool | None = None):
+        if sidecar is None:
+            sidecar = config['file_metadata']['sidecar']
+        self._sidecar = sidecar
+
+        #(filesystem type, path) -> {'size', 'mtime_ns', 'num_rows', 'sum_weights'}
+        self._entries : Dict[Any, Dict[str, Any]] = {}
+        #directories whose sidecar has already been read
+        self._read_sidecars = set()
+        #the datasets of a stack are filled from several threads at once,
+        #and they may share files or directories
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filesystem, paths : Sequence[str], weight_columns : Sequence[str] = ()) -> List[Dict[str, Any]]:
+        '''
+        Metadata of each file: a dict with 'num_rows', and 'sum_weights' (a dict from
+        weight column to the sum of that column over the file, for all of weight_columns)
+        '''
+        with self._lock:
+            local = isinstance(filesystem, pafs.LocalFileSystem)
+            infos = filesystem.get_file_info(list(paths))
+
+            result = []
+            dirty = set()
+            for path, info in zip(paths, infos):
+                #local paths may be relative to the working directory
+                key = (type(filesystem).__name__, os.path.abspath(path) if local else path)
+                if local and self._sidecar:
+                    self._read_sidecar(os.path.dirname(key[1]))
+
+                entry = self._entries.get(key)
+                computed = False
+                if entry is None or entry['size'] != info.size or entry['mtime_ns'] != info.mtime_ns:
+                    entry = {
+                        'size' : info.size,
+                        'mtime_ns' : info.mtime_ns,
+                        'num_rows' : pq.read_metadata(path, filesystem=filesystem).num_rows,
+                        'sum_weights' : {},
+                    }
+                    self._entries[key] = entry
+                    computed = True
+
+                missing = [col for col in weight_columns if col not in entry['sum_weights']]
+                if len(missing) > 0:
+                    table = pq.read_table(path, columns=missing, filesystem=filesystem)
+                    for col in missing:
+                        entry['sum_weights'][col] = float(pc.sum(table[col]).as_py() or 0.0)
+                    computed = True
+
+                if computed:
+                    dirty.add(os.path.dirname(key[1]))
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                result.append(entry)
+
+            if local and self._sidecar:
+                for directory in dirty:
+                    self._write_sidecar(directory)
+
+            return result
+
+    def _read_sidecar(self, directory : str) -> None:
+        if directory in self._read_sidecars:
+            return
+        self._read_sidecars.add(directory)
+
+        try:
+            with open(os.path.join(directory, SIDECAR_NAME), 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for fname, entry in entries.items():
+            self._entries.setdefault(('LocalFileSystem', os.path.join(directory, fname)), entry)
+
+    def _write_sidecar(self, directory : str) -> None:
+        entries = {}
+        for (fstype, path), entry in self._entries.items():
+            if fstype == 'LocalFileSystem' and os.path.dirname(path) == directory:
+                entries[os.path.basename(path)] = entry
+
+        #write to a temporary file and move it into place, so that concurrent jobs
+        #never read a truncated sidecar. Read-only directories just don't get one.
+        #The leading '.' keeps pyarrow's dataset discovery from picking the file up
+        try:
+            fd, tmppath = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f, indent=1)
+            os.replace(tmppath, os.path.join(directory, SIDECAR_NAME))
+        except BaseException:
+            os.remove(tmppath)
+            raise
+
+    def clear(self) -> None:
+        '''
+        Forget the in-memory entries (the sidecar files are left alone)
+        '''
+        with self._lock:
+            self._entries.clear()
+            self._read_sidecars.clear()
+
+_file_metadata_cache : FileMetadataCache | None = None
+
+def get_file_metadata_cache() -> FileMetadataCache:
+    '''
+    The process-wide file metadata cache
+    '''
+    global _file_metadata_cache
+    if _file_metadata_cache is None:
+        _file_metadata_cache = FileMetadataCache()
+    return _file_metadata_cache
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any
+
+import numpy as np
+import hist
+
+from simonplot.config import config
+
+class HistCache:
+    '''
+    On-disk cache of filled histograms (hist.Hist objects, or prebinned (val, cov) tuples),
+    persistent across runs, so that re-making a plot after a cosmetic change does not refill it.
+
+    Entries are keyed by the dataset identity (see SingleDatasetBase.cache_identity),
+    the structure of the variable, cut, and weight (the type and attributes of every node of
+    their expression trees), the bin edges of the axis, and the dataset weight.
+    Fills involving a variable which opts out of key-based dedup (`_dedup_by_key = False`,
+    eg CorrectionlibVariable, whose value depends on an external file) are not cached at all.
+
+    Only the bin contents are stored. On a hit the histogram is rebuilt with the requested axis,
+    so axis labels are never stale.
+    '''
+    def __init__(self, directory : str | None = None):
+        if directory is None:
+            directory = config['hist_cache']['directory']
+        self._directory = directory
+        os.makedirs(self._directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def make_key(self, identity, variable, cut, weight, axis, dataset_weight) -> str | None:
+        '''
+        Key for one fill, or None if the axis or one of the expression trees cannot be described
+        '''
+        axis_token = _axis_token(axis)
+        if axis_token is None:
+            return None
+
+        node_tokens = [_node_token(node) for node in (variable, cut, weight)]
+        if any(t is None for t in node_tokens):
+            return None
+
+        token = (identity,
+                 *node_tokens,
+                 axis_token,
+                 float(dataset_weight))
+        return hashlib.sha256(pickle.dumps(token)).hexdigest()
+
+    def _path(self, key : str) -> str:
+        return os.path.join(self._directory, key + '.pkl')
+
+    def get(self, key : str, axis : Any) -> Any:
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if entry[0] == 'hist':
+            H = hist.Hist(axis, storage=hist.storage.Weight())
+            H.view(flow=True)[...] = entry[1]
+            return H
+        else:
+            return (entry[1], entry[2])
+
+    def put(self, key : str, H : Any) -> None:
+        if isinstance(H, hist.Hist):
+            entry = ('hist', np.asarray(H.view(flow=True)))
+        elif isinstance(H, tuple) and len(H) == 2:
+            entry = ('prebinned', H[0], H[1])
+        else:
+            raise RuntimeError("HistCache.put: Unsupported histogram type! [neither hist.Hist nor tuple, but %s]"%type(H))
+
+        #write to a temporary file and move it into place,
+        #so that an interrupted run never leaves a truncated entry behind
+        fd, tmppath = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, self._path(key))
+        except BaseException:
+            os.remove(tmppath)
+            raise
+
+    def clear(self) -> None:
+        for fname in os.listdir(self._directory):
+            if fname.endswith('.pkl'):
+                os.remove(os.path.join(self._directory, fname))
+
+    def __len__(self):
+        return len([fname for fname in os.listdir(self._directory) if fname.endswith('.pkl')])
+
+def _axis_token(axis) -> Any:
+    #only what affects the bin contents, so that relabeling an axis still hits the cache
+    if isinstance(axis, (hist.axis.IntCategory, hist.axis.StrCategory)):
+        return (type(axis).__name__, tuple(axis), repr(axis.traits))
+    elif isinstance(axis, hist.axis.AxesMixin):
+        return (type(axis).__name__, np.asarray(axis.edges).tobytes(), repr(axis.traits))
+
+    try:
+        return (type(axis).__name__, pickle.dumps(axis))
+    except Exception:
+        return None
+
+#attributes which only change how a variable or cut is drawn, not what it evaluates to
+_COSMETIC_ATTRIBUTES = frozenset(['_label', '_centerline'])
+
+def _node_token(node) -> Any:
+    #token of a variable, cut, or one of their attributes, or None if it cannot be described
+    if isinstance(node, (type(None), bool, int, float, complex, str, bytes)):
+        return (type(node).__name__, node)
+    elif isinstance(node, (list, tuple)):
+        tokens = tuple(_node_token(n) for n in node)
+        return None if any(t is None for t in tokens) else (type(node).__name__, tokens)
+    elif isinstance(node, np.ndarray):
+        return ('ndarray', node.dtype.str, node.shape, node.tobytes())
+    elif isinstance(node, np.ufunc):
+        return ('ufunc', node.__name__)
+    elif hasattr(node, 'key') and hasattr(node, 'columns'):
+        #a variable or cut: its type plus the tokens of its attributes (which include its children).
+        #The key alone is ambiguous, eg Ratio(Ratio(a, b), c) and Ratio(a, Ratio(b, c)) share one
+        if not getattr(node, '_dedup_by_key', True):
+            return None
+        attributes = []
+        for name, value in sorted(vars(node).items()):
+            if name in _COSMETIC_ATTRIBUTES:
+                continue
+            t = _node_token(value)
+            if t is None:
+                return None
+            attributes.append((name, t))
+        return (type(node).__module__, type(node).__qualname__, tuple(attributes))
+
+    try:
+        return (type(node).__name__, pickle.dumps(node))
+    except Exception:
+        return None
+
+_hist_cache : HistCache | None = None
+#whether _hist_cache has been set up (from the config, or explicitly)
+_hist_cache_configured = False
+
+def enable_hist_cache(directory : str | None = None) -> HistCache:
+    '''
+    Turn on the on-disk histogram cache, stored in directory
+    (by default hist_cache.directory from the config)
+    '''
+    global _hist_cache, _hist_cache_configured
+    _hist_cache = HistCache(directory)
+    _hist_cache_configured = True
+    return _hist_cache
+
+def disable_hist_cache() -> None:
+    global _hist_cache, _hist_cache_configured
+    _hist_cache = None
+    _hist_cache_configured = True
+
+def get_hist_cache() -> HistCache | None:
+    '''
+    The active histogram cache, or None if caching is disabled
+    '''
+    global _hist_cache, _hist_cache_configured
+    if not _hist_cache_configured:
+        if config['hist_cache']['enabled']:
+            _hist_cache = HistCache()
+        _hist_cache_configured = True
+    return _hist_cache
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+import awkward as ak
+
+from simonplot.config import config
+
+class MaskCache:
+    '''
+    Bounded LRU cache of evaluated cut masks for one dataset (or one chunk of a dataset)
+
+    Entries are keyed by the identity of the cut object together with its key,
+    so that mutating a cut (eg with set_collection_name) does not return a stale mask.
+    The cut object is kept alive by the entry, so its id() cannot be reused while cached.
+    '''
+    def __init__(self, max_bytes : int | None = None):
+        if max_bytes is None:
+            max_bytes = config['mask_cache']['max_bytes']
+        self._max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cut) -> Any:
+        entry = self._entries.get((id(cut), cut.key))
+        if entry is None or entry[0] is not cut:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end((id(cut), cut.key))
+        return entry[1]
+
+    def put(self, cut, mask) -> None:
+        nbytes = mask.nbytes
+        if nbytes > self._max_bytes:
+            return
+
+        if isinstance(mask, np.ndarray):
+            #cached masks are shared between callers, so nobody may modify them in place
+            mask.flags.writeable = False
+
+        k = (id(cut), cut.key)
+        if k in self._entries:
+            self._nbytes -= self._entries.pop(k)[1].nbytes
+
+        self._entries[k] = (cut, mask)
+        self._nbytes += nbytes
+
+        while self._nbytes > self._max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+def evaluate_cut(cut, dataset) -> Any:
+    '''
+    cut.evaluate(dataset), going through the mask cache of the dataset if it has one
+    '''
+    cache = getattr(dataset, 'mask_cache', None)
+
+    #cuts which don't read any columns (NoCut, prebinned operations) are not worth caching
+    if cache is None or len(cut.columns) == 0:
+        return cut.evaluate(dataset)
+
+    mask = cache.get(cut)
+    if mask is None:
+        mask = cut.evaluate(dataset)
+        #only cache boolean masks
+        if isinstance(mask, ak.Array) or (isinstance(mask, np.ndarray) and mask.dtype == np.bool_):
+            cache.put(cut, mask)
+
+    return mask
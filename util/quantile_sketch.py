@@ -0,0 +1,174 @@
+from typing import Any, List, Sequence
+
+import numpy as np
+
+from simonplot.config import config
+
+class QuantileSketch:
+    '''
+    Mergeable streaming sketch of a distribution (KLL), for approximate quantiles in bounded memory.
+
+    Values are kept in a hierarchy of compactors. An item at level h stands for 2^h input values.
+    When a level grows beyond its capacity it is sorted and every other item is promoted to the next level.
+    Sketches of different chunks (or datasets) can be merged, and give the same accuracy
+    as a single sketch of all the values: the rank error is roughly 1/k.
+    The exact count, minimum, maximum, and positive minimum are tracked on the side.
+    '''
+    def __init__(self, k : int | None = None):
+        if k is None:
+            k = config['quantile_binning']['sketch_size']
+        self._k = k
+        self._levels : List[np.ndarray] = []
+        #alternates the offset of the compactions, so that the promoted items are unbiased
+        self._parity = 0
+
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.min_positive = np.inf
+        self.dtype : np.dtype | None = None
+
+    def update(self, values : np.ndarray) -> None:
+        values = np.asarray(values).ravel()
+        if self.dtype is None:
+            self.dtype = values.dtype
+
+        values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+        if len(values) == 0:
+            return
+
+        values = values.astype(np.float64, copy=False)
+        self.count += len(values)
+        self.min = min(self.min, np.min(values))
+        self.max = max(self.max, np.max(values))
+        positive = values[values > 0]
+        if len(positive) > 0:
+            self.min_positive = min(self.min_positive, np.min(positive))
+
+        self._add(0, values)
+        self._compress()
+
+    def merge(self, other : "QuantileSketch") -> "QuantileSketch":
+        if other.dtype is not None and self.dtype is None:
+            self.dtype = other.dtype
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.min_positive = min(self.min_positive, other.min_positive)
+
+        for h, items in enumerate(other._levels):
+            self._add(h, items)
+        self._compress()
+        return self
+
+    def _add(self, h : int, items : np.ndarray) -> None:
+        while len(self._levels) <= h:
+            self._levels.append(np.zeros(0))
+        self._levels[h] = np.concatenate([self._levels[h], items])
+
+    def _capacity(self, h : int) -> int:
+        #lower levels get geometrically smaller capacities
+        depth = len(self._levels) - 1 - h
+        return max(int(np.ceil(self._k * np.power(2/3, depth))), 2)
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self._levels):
+            items = self._levels[h]
+            if len(items) > self._capacity(h):
+                items = np.sort(items)
+                #an odd item out stays at this level
+                keep = items[:len(items) % 2]
+                items = items[len(items) % 2:]
+                promoted = items[self._parity::2]
+                self._parity = 1 - self._parity
+
+                self._levels[h] = keep
+                self._add(h+1, promoted)
+            h += 1
+
+    def _items(self, positive : bool = False):
+        items = np.concatenate(self._levels) if len(self._levels) > 0 else np.zeros(0)
+        weights = np.concatenate([np.full(len(level), 2.0**h) for h, level in enumerate(self._levels)]) if len(self._levels) > 0 else np.zeros(0)
+        if positive:
+            items, weights = items[items > 0], weights[items > 0]
+        order = np.argsort(items)
+        return items[order], weights[order]
+
+    def quantiles(self, qs : Sequence[float], positive : bool = False) -> np.ndarray:
+        '''
+        Approximate quantiles of the values (only of the positive values if positive is True).
+        The quantiles 0 and 1 are the exact minimum and maximum
+        '''
+        items, weights = self._items(positive)
+        if len(items) == 0:
+            return np.full(len(qs), np.nan)
+
+        cdf = (np.cumsum(weights) - 0.5*weights) / np.sum(weights)
+        result = np.interp(qs, cdf, items)
+
+        low = self.min_positive if positive else self.min
+        qs = np.asarray(qs)
+        result = np.where(qs <= 0, low, result)
+        result = np.where(qs >= 1, self.max, result)
+        return result
+
+    def __len__(self):
+        return sum(len(level) for level in self._levels)
+
+def merge_sketches(sketches : Sequence[QuantileSketch]) -> QuantileSketch:
+    result = QuantileSketch()
+    for sketch in sketches:
+        result.merge(sketch)
+    return result
+
+#The fine grid is a fixed set of edges which does not depend on the data, so that it can be filled
+#before the range of the data is known: each power of two is split into 2^grid_bits equal parts
+#(the floating point numbers whose mantissa ends in 52-grid_bits zero bits), mirrored for negative values.
+#The grid bins are numbered in increasing order, by dropping the low mantissa bits of
+#an integer which orders the floating point numbers like their values
+_MAGNITUDE_BITS = np.int64(0x7FFFFFFFFFFFFFFF)
+_SIGN_BIT = np.int64(np.iinfo(np.int64).min)
+
+def _grid_shift(bits : int | None) -> int:
+    if bits is None:
+        bits = config['quantile_binning']['grid_bits']
+    return 52 - bits
+
+def grid_bins(values : np.ndarray, bits : int | None = None) -> np.ndarray:
+    '''
+    Index of the fine grid bin of each value. NaNs are put with +inf, above every finite value
+    (like hist does with its overflow bin)
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    #+0.0 turns -0.0 into 0.0
+    values = np.where(np.isnan(values), np.inf, values) + 0.0
+    order = values.view(np.int64)
+    order = np.where(order < 0, -(order & _MAGNITUDE_BITS), order)
+    return order >> _grid_shift(bits)
+
+def grid_edges(bins : np.ndarray, bits : int | None = None) -> np.ndarray:
+    '''
+    Lower edge of each fine grid bin (the inverse of grid_bins() on the grid points)
+    '''
+    order = np.asarray(bins, dtype=np.int64) << _grid_shift(bits)
+    order = np.where(order < 0, (-order) | _SIGN_BIT, order)
+    return order.view(np.float64)
+
+def snap_to_grid(edges : np.ndarray, bits : int | None = None) -> np.ndarray:
+    '''
+    The closest fine grid point to each of the (finite) edges
+    '''
+    edges = np.asarray(edges, dtype=np.float64)
+    bins = grid_bins(edges, bits)
+    low = grid_edges(bins, bits)
+    high = grid_edges(bins + 1, bits)
+    return np.where(edges - low <= high - edges, low, high)
+
+def on_grid(edges : np.ndarray, bits : int | None = None) -> bool:
+    '''
+    Whether all the edges are fine grid points
+    '''
+    edges = np.asarray(edges, dtype=np.float64)
+    return bool(np.all(np.isfinite(edges)) and np.array_equal(grid_edges(grid_bins(edges, bits), bits), edges))
@@ -1,6 +1,7 @@
 from .Variable import UFuncVariable, SumVariable, DifferenceVariable
 from .VariableBase import VariableBase
 from simonplot.typing.Protocols import VariableProtocol
+from simonplot.util.evaluation_context import evaluate_variable
 
 from simonpy.coordinates import xyz_to_eta_phi
 
@@ -22,8 +23,8 @@ class RelativeResolutionVariable(VariableBase):
         return list(set(self._gen.columns + self._reco.columns))
     
     def evaluate(self, dataset, cut):
-        gen = self._gen.evaluate(dataset, cut)
-        reco = self._reco.evaluate(dataset, cut)
+        gen = evaluate_variable(self._gen, dataset, cut)
+        reco = evaluate_variable(self._reco, dataset, cut)
         return (reco - gen) / gen
 
     @property
@@ -75,7 +76,7 @@ class Magnitude3dVariable(VariableBase):
         ))  
     
     def evaluate(self, dataset, cut):
-        return self._rvar.evaluate(dataset, cut)
+        return evaluate_variable(self._rvar, dataset, cut)
     
     @property
     def key(self):
@@ -123,14 +124,14 @@ class Magnitude2dVariable(VariableBase):
         ))  
     
     def evaluate(self, dataset, cut):
-        return self._rvar.evaluate(dataset, cut)
+        return evaluate_variable(self._rvar, dataset, cut)
     
     @property
     def key(self):
         return "sqrt(%s^2 + %s^2)"%(self._xvar.key, self._yvar.key)
 
     def __eq__(self, other):
-        if type(other) is not Magnitude3dVariable:
+        if type(other) is not Magnitude2dVariable:
             return False
         return (self._xvar == other._xvar and
                 self._yvar == other._yvar)
@@ -171,7 +172,7 @@ class Distance3dVariable(VariableBase):
         ))  
     
     def evaluate(self, dataset, cut):
-        return self.magnitude_var.evaluate(dataset, cut)
+        return evaluate_variable(self.magnitude_var, dataset, cut)
     
     @property
     def key(self):
@@ -233,9 +234,9 @@ class EtaFromXYZVariable(VariableBase):
         self._z.set_collection_name(collection_name)
 
     def evaluate(self, dataset, cut):
-        xval = self._x.evaluate(dataset, cut)
-        yval = self._y.evaluate(dataset, cut)
-        zval = self._z.evaluate(dataset, cut)
+        xval = evaluate_variable(self._x, dataset, cut)
+        yval = evaluate_variable(self._y, dataset, cut)
+        zval = evaluate_variable(self._z, dataset, cut)
 
         return xyz_to_eta_phi(xval, yval, zval)[0]
     
@@ -262,7 +263,7 @@ class PhiFromXYZVariable(VariableBase):
         return "PHI(%s_%s_%s)" % (self._x.key, self._y.key, self._z.key)
     
     def __eq__(self, other):
-        if type(other) is not EtaFromXYZVariable:
+        if type(other) is not PhiFromXYZVariable:
             return False
         
         return (self._x == other._x and 
@@ -275,8 +276,8 @@ class PhiFromXYZVariable(VariableBase):
         self._z.set_collection_name(collection_name)
 
     def evaluate(self, dataset, cut):
-        xval = self._x.evaluate(dataset, cut)
-        yval = self._y.evaluate(dataset, cut)
-        zval = self._z.evaluate(dataset, cut)
+        xval = evaluate_variable(self._x, dataset, cut)
+        yval = evaluate_variable(self._y, dataset, cut)
+        zval = evaluate_variable(self._z, dataset, cut)
 
         return xyz_to_eta_phi(xval, yval, zval)[1]
\ No newline at end of file
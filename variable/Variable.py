@@ -1,6 +1,9 @@
 import copy
 
 from simonplot.config import lookup_axis_label
+from simonplot.util.mask_cache import evaluate_cut
+from simonplot.util.evaluation_context import evaluate_variable
+from .fused import evaluate_fused, fused_arithmetic_enabled, NUMEXPR_UFUNCS
 from .VariableBase import VariableBase
 
 from typing import List, Sequence, assert_never, override
@@ -25,15 +28,21 @@ class ConstantVariable(VariableBase):
     def columns(self):
         return []
     
+    @property
+    def value(self):
+        return self._value
+
     def evaluate(self, dataset, cut):
-        mask = cut.evaluate(dataset)
+        mask = evaluate_cut(cut, dataset)
         if isinstance(mask, ak.Array):
             val = ak.ones_like(mask) * self._value
+        elif isinstance(mask, np.ndarray) and mask.dtype == np.bool_:
+            #only allocate the selected entries
+            return np.full(np.count_nonzero(mask), self._value)
         elif isinstance(mask, np.ndarray):
             val = np.ones_like(mask) * self._value
         elif isinstance(mask, slice):
-            val = np.array([self._value])
-            val = np.repeat(val, dataset.num_rows)
+            return np.full(len(range(*mask.indices(dataset.num_rows))), self._value)
         else: 
             assert_never(mask)
 
@@ -76,7 +85,7 @@ class BasicVariable(VariableBase):
             return [self._collection_name + "." + self._name]
 
     def evaluate(self, dataset, cut):
-        mask = cut.evaluate(dataset)
+        mask = evaluate_cut(cut, dataset)
         val = dataset.get_column(self._name, self._collection_name)
         return val[mask]
     
@@ -121,8 +130,8 @@ class AkNumVariable(VariableBase):
         return False
     
     def evaluate(self, dataset, cut):
-        val = self._var.evaluate(dataset, cut)
-        mask = cut.evaluate(dataset)
+        val = evaluate_variable(self._var, dataset, cut)
+        mask = evaluate_cut(cut, dataset)
         return ak.num(val[mask])
     
     @property
@@ -156,7 +165,19 @@ class RatioVariable(VariableBase):
         return list(set(self._num.columns + self._denom.columns))
 
     def evaluate(self, dataset, cut):
-        return self._num.evaluate(dataset, cut) / self._denom.evaluate(dataset, cut)
+        if fused_arithmetic_enabled():
+            return evaluate_fused(self, dataset, cut)
+        return self._apply(evaluate_variable(self._num, dataset, cut), evaluate_variable(self._denom, dataset, cut))
+
+    @property
+    def _fused_operands(self):
+        return [self._num, self._denom]
+
+    def _fused_expression(self, num, denom):
+        return '(%s / %s)'%(num, denom)
+
+    def _apply(self, num, denom):
+        return num / denom
 
     @property
     def key(self):
@@ -190,7 +211,19 @@ class ProductVariable(VariableBase):
         return self._var1.columns + self._var2.columns
 
     def evaluate(self, dataset, cut):
-        return self._var1.evaluate(dataset, cut) * self._var2.evaluate(dataset, cut)
+        if fused_arithmetic_enabled():
+            return evaluate_fused(self, dataset, cut)
+        return self._apply(evaluate_variable(self._var1, dataset, cut), evaluate_variable(self._var2, dataset, cut))
+
+    @property
+    def _fused_operands(self):
+        return [self._var1, self._var2]
+
+    def _fused_expression(self, var1, var2):
+        return '(%s * %s)'%(var1, var2)
+
+    def _apply(self, var1, var2):
+        return var1 * var2
 
     @property
     def key(self):
@@ -224,7 +257,19 @@ class DifferenceVariable(VariableBase):
         return list(set(self._var1.columns + self._var2.columns))
 
     def evaluate(self, dataset, cut):
-        return self._var2.evaluate(dataset, cut) - self._var1.evaluate(dataset, cut)
+        if fused_arithmetic_enabled():
+            return evaluate_fused(self, dataset, cut)
+        return self._apply(evaluate_variable(self._var1, dataset, cut), evaluate_variable(self._var2, dataset, cut))
+
+    @property
+    def _fused_operands(self):
+        return [self._var1, self._var2]
+
+    def _fused_expression(self, var1, var2):
+        return '(%s - %s)'%(var2, var1)
+
+    def _apply(self, var1, var2):
+        return var2 - var1
 
     @property
     def key(self):
@@ -258,7 +303,19 @@ class SumVariable(VariableBase):
         return list(set(self._var1.columns + self._var2.columns))
 
     def evaluate(self, dataset, cut):
-        return self._var1.evaluate(dataset, cut) + self._var2.evaluate(dataset, cut)
+        if fused_arithmetic_enabled():
+            return evaluate_fused(self, dataset, cut)
+        return self._apply(evaluate_variable(self._var1, dataset, cut), evaluate_variable(self._var2, dataset, cut))
+
+    @property
+    def _fused_operands(self):
+        return [self._var1, self._var2]
+
+    def _fused_expression(self, var1, var2):
+        return '(%s + %s)'%(var1, var2)
+
+    def _apply(self, var1, var2):
+        return var1 + var2
 
     @property
     def key(self):
@@ -274,19 +331,36 @@ class SumVariable(VariableBase):
         self._var2.set_collection_name(collection_name)
 
 class CorrectionlibVariable(VariableBase):
+    #key does not identify the correction file
+    _dedup_by_key = False
+
     def __init__(self, var_l : Sequence[VariableProtocol], path : str, key : str):
         self._vars = []
         for var in var_l:
             self._vars.append(var)
 
+        self._path = path
+        self._csetkey = key
+        self._load()
+
+    def _load(self):
         from correctionlib import CorrectionSet
-        cset = CorrectionSet.from_file(path)
-        if key not in list(cset.keys()):
-            print("Error: Correctionlib key '%s' not found in %s"%(key, path))
+        cset = CorrectionSet.from_file(self._path)
+        if self._csetkey not in list(cset.keys()):
+            print("Error: Correctionlib key '%s' not found in %s"%(self._csetkey, self._path))
             print("Available keys: %s"%list(cset.keys()))
             raise ValueError("Correctionlib key not found")
-        self._eval = cset[key].evaluate
-        self._csetkey = key
+        self._eval = cset[self._csetkey].evaluate
+
+    #the correctionlib evaluator cannot be pickled, so reload it from the file instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_eval']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load()
 
     @property
     def _natural_centerline(self):
@@ -306,7 +380,7 @@ class CorrectionlibVariable(VariableBase):
     def evaluate(self, dataset, cut):
         args = []
         for var in self._vars:
-            args.append(var.evaluate(dataset, cut))
+            args.append(evaluate_variable(var, dataset, cut))
 
         return self._eval(*args)
 
@@ -352,7 +426,22 @@ class UFuncVariable(VariableBase):
         return self._var.columns
 
     def evaluate(self, dataset, cut):
-        return self._ufunc(self._var.evaluate(dataset, cut))
+        if self._fused_operands is not None and fused_arithmetic_enabled():
+            return evaluate_fused(self, dataset, cut)
+        return self._apply(evaluate_variable(self._var, dataset, cut))
+
+    @property
+    def _fused_operands(self):
+        #ufuncs numexpr does not know about are leaves of the fused tree
+        if self._ufunc not in NUMEXPR_UFUNCS:
+            return None
+        return [self._var]
+
+    def _fused_expression(self, var):
+        return NUMEXPR_UFUNCS[self._ufunc]%var
+
+    def _apply(self, var):
+        return self._ufunc(var)
 
     @property
     def key(self):
@@ -411,6 +500,9 @@ class RateVariable(VariableBase):
 '''
 
 class ConcatVariable(VariableBase):
+    #key and __eq__ only look at the keyvar
+    _dedup_by_key = False
+
     def __init__(self, vars : Sequence[VariableProtocol], keyvar : VariableProtocol | None = None):
         self._vars = vars
         if keyvar is None:
@@ -448,7 +540,7 @@ class ConcatVariable(VariableBase):
     def evaluate(self, dataset, cut):
         arrays = []
         for var in self._vars:
-            arrays.append(var.evaluate(dataset, cut))
+            arrays.append(evaluate_variable(var, dataset, cut))
         
         return ak.concatenate(arrays)
     
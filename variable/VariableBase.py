@@ -7,6 +7,9 @@ class VariableBase(ABC):
     '''
     Base class for `Variable`s, implementing basic common functionality
     '''
+    #whether equal (same type, key, and __eq__) instances may share evaluations in an EvaluationContext
+    _dedup_by_key = True
+
     @property
     @abstractmethod
     def _natural_centerline(self):
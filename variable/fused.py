@@ -0,0 +1,89 @@
+import numpy as np
+
+from typing import Any
+
+from simonplot.config import config
+from simonplot.util.evaluation_context import evaluate_variable
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+#numexpr spelling of the numpy ufuncs it can fuse
+NUMEXPR_UFUNCS = {
+    np.sqrt : 'sqrt(%s)',
+    np.square : '(%s**2)',
+    np.absolute : 'abs(%s)',
+    np.negative : '(-%s)',
+    np.exp : 'exp(%s)',
+    np.expm1 : 'expm1(%s)',
+    np.log : 'log(%s)',
+    np.log10 : 'log10(%s)',
+    np.log1p : 'log1p(%s)',
+    np.sin : 'sin(%s)',
+    np.cos : 'cos(%s)',
+    np.tan : 'tan(%s)',
+    np.arcsin : 'arcsin(%s)',
+    np.arccos : 'arccos(%s)',
+    np.arctan : 'arctan(%s)',
+    np.sinh : 'sinh(%s)',
+    np.cosh : 'cosh(%s)',
+    np.tanh : 'tanh(%s)',
+    np.arcsinh : 'arcsinh(%s)',
+    np.arccosh : 'arccosh(%s)',
+    np.arctanh : 'arctanh(%s)',
+}
+
+def fused_arithmetic_enabled() -> bool:
+    return numexpr is not None and config['fused_arithmetic']['enabled']
+
+def _is_flat(value) -> bool:
+    #numexpr only handles plain numeric numpy arrays
+    #bool arithmetic has different semantics in numpy, so leave it alone
+    return isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in 'iuf'
+
+def evaluate_fused(variable, dataset, cut) -> Any:
+    '''
+    Evaluate a tree of arithmetic Variables (Sum, Difference, Product, Ratio, UFunc) in one pass.
+
+    The arithmetic nodes declare their operands with `_fused_operands`,
+    their numexpr expression with `_fused_expression()`,
+    and the plain numpy/awkward operation with `_apply()`.
+    Everything else in the tree is a leaf, evaluated as usual (through the EvaluationContext).
+    If all the leaves are flat numpy arrays, the whole tree is computed by numexpr
+    without intermediate arrays. Otherwise (eg jagged awkward arrays),
+    the tree is computed node-by-node from the already evaluated leaves
+    '''
+    leaves = []
+    def build(node):
+        operands = getattr(node, '_fused_operands', None)
+        if operands is None:
+            for i, leaf in enumerate(leaves):
+                if leaf is node:
+                    return 'v%d'%i
+            leaves.append(node)
+            return 'v%d'%(len(leaves)-1)
+
+        return node._fused_expression(*[build(op) for op in operands])
+
+    expression = build(variable)
+    values = [evaluate_variable(leaf, dataset, cut) for leaf in leaves]
+
+    if all(_is_flat(val) for val in values):
+        local_dict = {'v%d'%i : val for i, val in enumerate(values)}
+        try:
+            return numexpr.evaluate(expression, local_dict=local_dict) # pyright: ignore[reportOptionalMemberAccess]
+        except (TypeError, ValueError, KeyError, NotImplementedError):
+            #dtype combinations numexpr does not support
+            pass
+
+    def apply(node):
+        operands = getattr(node, '_fused_operands', None)
+        if operands is None:
+            for leaf, val in zip(leaves, values):
+                if leaf is node:
+                    return val
+        return node._apply(*[apply(op) for op in operands]) # pyright: ignore[reportOptionalIterable]
+
+    return apply(variable)